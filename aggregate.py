@@ -0,0 +1,195 @@
+import pathlib
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from catalog import TrackCatalog, library_time_secs
+from krobble import krobble_weights
+from periods import Period
+
+delim_category = '\t'
+dt_fmt = r'%Y-%m-%d_%H-%M'
+
+REPORT_FILES = ('track_stats.csv', 'artist_stats.csv', 'album_stats.csv')
+
+STAT_COLUMNS = ['play_count', 'time_played', 'krobbles']
+ARTIST_STATS_COLUMNS = ['artist'] + STAT_COLUMNS
+ALBUM_STATS_COLUMNS = ['artist', 'album'] + STAT_COLUMNS
+
+
+def accumulate_plays(mus_lib_df: pd.DataFrame, match_indices: np.ndarray,
+                     krobble_weights: np.ndarray = None) -> pd.DataFrame:
+	# match_indices holds one library index label per matched scrobble, repeats are repeat listens. krobble_weights
+	# lines up with it, one weight per scrobble, and plain play counts are used without it
+	positions = mus_lib_df.index.get_indexer(np.asarray(match_indices, dtype=np.int64))
+	found = positions >= 0
+	positions = positions[found]
+
+	play_count = np.bincount(positions, minlength=len(mus_lib_df))
+	weights = None if krobble_weights is None else np.asarray(krobble_weights, dtype=np.float64)[found]
+	krobbles = np.bincount(positions, weights=weights, minlength=len(mus_lib_df)).astype(np.float64)
+
+	# a shallow copy, the library columns are shared with the caller's frame and only the stat columns are new
+	mus_lib_df = mus_lib_df.copy(deep=False)
+	mus_lib_df['play_count'] = play_count
+	mus_lib_df['time_played'] = play_count * library_time_secs(mus_lib_df)
+	mus_lib_df['krobbles'] = krobbles
+	return mus_lib_df
+
+
+def library_krobble_weights(mus_lib_df: pd.DataFrame, match_indices: np.ndarray, timestamps: np.ndarray,
+                            **options) -> np.ndarray:
+	# krobble_weights with the track lengths and track ids looked up from the library, options go straight through
+	positions = mus_lib_df.index.get_indexer(np.asarray(match_indices, dtype=np.int64))
+	return krobble_weights(timestamps, positions, library_time_secs(mus_lib_df)[positions], **options)
+
+
+def group_stats(keys: np.ndarray, listens_df: pd.DataFrame) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+	# STAT_COLUMNS summed per distinct key, the keys come back sorted. a groupby over one int array rather than a
+	# bincount, so the sums come out of the same compensated summation as before
+	grouped = listens_df[STAT_COLUMNS].groupby(keys, sort=True).sum()
+	return grouped.index.to_numpy(), {column: grouped[column].to_numpy() for column in STAT_COLUMNS}
+
+
+def _stats_frame(names: Dict[str, np.ndarray], sums: Dict[str, np.ndarray], period_ids: np.ndarray = None):
+	stats_df = pd.DataFrame(dict(names, **sums))
+
+	if period_ids is not None:
+		stats_df.insert(0, 'period', period_ids)
+
+	return stats_df
+
+
+# listens_df holds the stats of the played library rows, rows is where each one sits in the library and the catalog.
+# period_ids puts the period of every row in front of the other keys, build_period_reports sorts and groups every
+# period in one go that way
+
+def track_stats(mus_lib_df: pd.DataFrame, catalog: TrackCatalog, rows: np.ndarray, listens_df: pd.DataFrame = None,
+                period_ids: np.ndarray = None) -> pd.DataFrame:
+	# the library rows are only taken once they are in order, with the columns of listens_df set on them
+	order = catalog.track_order(rows, period_ids)
+	track_df = mus_lib_df.iloc[rows[order]].reset_index(drop=True)
+
+	for column in [] if listens_df is None else listens_df.columns:
+		track_df[column] = listens_df[column].to_numpy()[order]
+
+	return track_df
+
+
+def artist_stats(listens_df: pd.DataFrame, catalog: TrackCatalog, rows: np.ndarray,
+                 period_ids: np.ndarray = None) -> pd.DataFrame:
+	n_artists = max(len(catalog.artists), 1)
+	keys = catalog.track_artist[rows].astype(np.int64)
+	groups, sums = group_stats(keys if period_ids is None else period_ids * n_artists + keys, listens_df)
+	return _stats_frame({'artist': catalog.artists[groups % n_artists]}, sums,
+	                    None if period_ids is None else groups // n_artists)
+
+
+def album_stats(listens_df: pd.DataFrame, catalog: TrackCatalog, rows: np.ndarray,
+                period_ids: np.ndarray = None) -> pd.DataFrame:
+	# albums must be attached to an artist, there are several albums titled exactly the same
+	n_albums = max(len(catalog.album_artist), 1)
+	keys = catalog.track_album[rows].astype(np.int64)
+	groups, sums = group_stats(keys if period_ids is None else period_ids * n_albums + keys, listens_df)
+	albums = groups % n_albums
+	return _stats_frame({'artist': catalog.artists[catalog.album_artist[albums]],
+	                     'album': catalog.album_names[catalog.album_name[albums]]}, sums,
+	                    None if period_ids is None else groups // n_albums)
+
+
+def build_reports(mus_lib_df: pd.DataFrame, match_indices: np.ndarray, krobble_weights: np.ndarray = None,
+                  catalog: TrackCatalog = None) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+	# the catalog is built from mus_lib_df when the caller doesn't have one for it already
+	catalog = catalog or TrackCatalog(mus_lib_df)
+	mus_lib_df = accumulate_plays(mus_lib_df, match_indices, krobble_weights)
+
+	# filter down to only tracks in the time range.
+	rows = np.flatnonzero(mus_lib_df['play_count'].to_numpy())
+	listens_df = mus_lib_df[STAT_COLUMNS].iloc[rows]
+
+	return (mus_lib_df, track_stats(mus_lib_df, catalog, rows), artist_stats(listens_df, catalog, rows),
+	        album_stats(listens_df, catalog, rows))
+
+
+def build_period_reports(mus_lib_df: pd.DataFrame, match_indices: np.ndarray, timestamps: np.ndarray,
+                         krobble_weights: np.ndarray, periods: List[Period],
+                         catalog: TrackCatalog = None) -> Dict[Period, Tuple[pd.DataFrame, pd.DataFrame,
+                                                                             pd.DataFrame]]:
+	# (track, artist, album) reports for every period out of one set of matched scrobbles. periods of one kind never
+	# overlap, so each kind is a single searchsorted over the timestamps and a single bincount over
+	# (period, library row) pairs. the played cells of every period then go through one sort and two groupbys
+	# together instead of once per period
+	catalog = catalog or TrackCatalog(mus_lib_df)
+	positions = catalog.positions(match_indices)
+	timestamps = np.asarray(timestamps, dtype=np.int64)
+	weights = np.ones(len(positions)) if krobble_weights is None else np.asarray(krobble_weights, dtype=np.float64)
+	n_tracks = len(mus_lib_df)
+	all_periods, period_ids, rows, play_counts, krobbles = [], [], [], [], []
+
+	for kind in dict.fromkeys(p.kind for p in periods):
+		kind_periods = sorted((p for p in periods if p.kind == kind), key=lambda p: p.time_from)
+		starts = np.array([p.time_from for p in kind_periods], dtype=np.int64)
+		ends = np.array([p.time_to for p in kind_periods], dtype=np.int64)
+
+		bucket = np.searchsorted(starts, timestamps, side='right') - 1
+		inside = (bucket >= 0) & (positions >= 0)
+		inside[inside] = timestamps[inside] <= ends[bucket[inside]]
+
+		cells = bucket[inside] * n_tracks + positions[inside]
+		size = len(kind_periods) * n_tracks
+		cell_counts = np.bincount(cells, minlength=size)
+		cell_krobbles = np.bincount(cells, weights=weights[inside], minlength=size)
+
+		played = np.flatnonzero(cell_counts)
+		period_ids.append(played // n_tracks + len(all_periods))
+		rows.append(played % n_tracks)
+		play_counts.append(cell_counts[played])
+		krobbles.append(cell_krobbles[played])
+		all_periods.extend(kind_periods)
+
+	rows = np.concatenate(rows or [np.empty(0, dtype=np.int64)])
+	play_count = np.concatenate(play_counts or [np.empty(0, dtype=np.int64)])
+
+	period_ids = np.concatenate(period_ids or [np.empty(0, dtype=np.int64)]).astype(np.int64)
+	listens_df = pd.DataFrame({
+		'play_count': play_count,
+		'time_played': play_count * catalog.time_secs[rows],
+		'krobbles': np.concatenate(krobbles or [np.empty(0)]),
+		'period': period_ids,
+	})
+
+	stats = [track_stats(mus_lib_df, catalog, rows, listens_df, period_ids),
+	         artist_stats(listens_df, catalog, rows, period_ids), album_stats(listens_df, catalog, rows, period_ids)]
+	reports = {}
+
+	for stats_df in stats:
+		# everything is sorted by period first, so each period is one contiguous slice
+		bounds = np.searchsorted(stats_df['period'].to_numpy(), np.arange(len(all_periods) + 1))
+		stats_df.drop(columns='period', inplace=True)
+
+		for i, period in enumerate(all_periods):
+			reports.setdefault(period, []).append(stats_df.iloc[bounds[i]:bounds[i + 1]].reset_index(drop=True))
+
+	return {period: tuple(period_reports) for period, period_reports in reports.items()}
+
+
+def write_reports(out_dir: pathlib.Path, track_df: pd.DataFrame, artist_df: pd.DataFrame, album_df: pd.DataFrame):
+	out_dir.mkdir(parents=True, exist_ok=True)
+
+	for stats_filename, stats_df in zip(REPORT_FILES, (track_df, artist_df, album_df)):
+		stats_df.to_csv(path_or_buf=out_dir.joinpath(stats_filename),
+		                sep=delim_category,
+		                header=True,
+		                index=False,
+		                mode='w',
+		                encoding='utf-8',
+		                date_format=dt_fmt,
+		                )
+
+
+def write_period_reports(out_dir: pathlib.Path, reports: Dict[Period, Tuple[pd.DataFrame, pd.DataFrame,
+                                                                            pd.DataFrame]]):
+	# one folder per period next to the whole range reports, e.g. 2021-01, 2021-Q1, 2021
+	for period, (track_df, artist_df, album_df) in reports.items():
+		write_reports(out_dir.joinpath(period.label), track_df, artist_df, album_df)
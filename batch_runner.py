@@ -0,0 +1,207 @@
+import concurrent.futures
+import contextlib
+import multiprocessing
+import os
+import pathlib
+from collections import namedtuple
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from aggregate import build_period_reports, build_reports, library_krobble_weights, write_period_reports, \
+	write_reports
+from catalog import TrackCatalog
+from corrections import CorrectionStore
+from cube import AggregateCube, cube_file_for, synced_range
+from dir_snapshot import DirectorySnapshot
+from fetcher import API_RATE_LIMIT, TokenBucket, iter_recent_tracks, pooled_session
+from fuzzy_index import LibraryFuzzyIndex
+from http_cache import ResponseCache
+from instrumentation import COUNTERS, MemorySampler, RunReport, count
+from matcher import LibraryMatcher, ScrobbleAccumulator, UNMATCHED, expand_matches, unmatched_timestamps
+from resolution import auto_resolve, write_review
+from scrobble_store import ScrobbleStore
+from timeseries import build_timeseries_reports, write_timeseries_reports
+
+# time_from and time_to are inclusive unix timestamps, out_dir is where this user's reports go and periods are the
+# extra per-period reports written inside it
+UserJob = namedtuple('UserJob', 'username, time_from, time_to, out_dir, periods', defaults=((),))
+
+# everything the workers share. it is built once in the parent, with fork the workers read the parent's copy
+# (copy on write) and with spawn it gets pickled once per worker process, never once per user. the corrections are
+# only read in the workers, what they learn goes back to the parent with the results
+SharedLibrary = namedtuple('SharedLibrary', 'mus_lib_df, catalog, matcher, snapshot, corrections, settings')
+
+_shared: Optional[SharedLibrary] = None
+_fuzzy_index: Optional[LibraryFuzzyIndex] = None
+
+
+def _init_worker(shared: SharedLibrary):
+	global _shared
+	_shared = shared
+
+
+def run_user(job: UserJob) -> dict:
+	global _fuzzy_index
+	mus_lib_df, catalog, matcher, snapshot, corrections, settings = _shared
+
+	if _fuzzy_index is None:
+		_fuzzy_index = LibraryFuzzyIndex(snapshot.library_dir, snapshot)
+
+	# a worker runs several users one after the other, the counters start over for each
+	COUNTERS.clear()
+	run_report = RunReport({'username': job.username, 'time_from': job.time_from, 'time_to': job.time_to})
+	run_report.begin('fetch')
+
+	# the token bucket is per process, so each worker gets its share of the api rate limit
+	store = ScrobbleStore(settings['scrobble_db'])
+	cache = ResponseCache(settings['http_cache'], settings['http_cache_size']) if settings['http_cache'] else None
+
+	try:
+		if not settings['offline']:
+			session = pooled_session(settings['fetch_workers'])
+			bucket = TokenBucket(API_RATE_LIMIT / settings['processes'], 1)
+			store.sync(job.username,
+			           lambda f, t: iter_recent_tracks(session, settings['api_key'], job.username, f, t,
+			                                           settings['api_root'], settings['fetch_workers'], bucket,
+			                                           cache=cache),
+			           job.time_from)
+
+		accumulator = ScrobbleAccumulator()
+
+		for chunk in store.iter_scrobbles(job.username, job.time_from, job.time_to):
+			accumulator.add(chunk)
+
+		cube_range = synced_range(store, job.username, job.time_from, job.time_to)
+
+	finally:
+		store.close()
+
+		if cache is not None:
+			cache.close()
+
+	run_report.begin('match')
+	keys, counts, timestamps = accumulator.collapse()
+	match_indices, match_statuses = matcher.resolve(keys)
+	count('scrobbles', len(accumulator))
+	count('distinct_tracks', len(keys))
+
+	# nobody to ask in a worker, same rules as --batch
+	unmatched = {key: i for i, key in enumerate(keys) if match_statuses[i] == UNMATCHED}
+	accepted, pending = auto_resolve(_fuzzy_index, unmatched, settings['confidence'], corrections)
+	found_rows, learned = [], []
+
+	for key, filepath in accepted.items():
+		if (match_index := matcher.index_of_filepath(filepath)) < 0:
+			pending[key] = [(1.0, filepath)]
+			continue
+
+		artist, album, title = key
+		found_rows.append({'filepath': filepath, 'album': album, 'artist': artist, 'title': title})
+		learned.append((key, pathlib.Path(filepath).parts))
+		match_indices[unmatched[key]] = match_index
+
+	run_report.begin('aggregate')
+	matched_indices, matched_timestamps = expand_matches(match_indices, counts, timestamps)
+
+	if settings['cube_dir'] is not None and cube_range is not None:
+		# scrobbles queued for review stay pending in the cube until a run matches them
+		cube = AggregateCube.load(cube_file_for(settings['cube_dir'], job.username), job.username)
+		cube.add(mus_lib_df, matched_indices, matched_timestamps, *cube_range,
+		         unmatched_timestamps(match_indices, match_statuses, timestamps))
+		cube.save()
+
+	weights = library_krobble_weights(mus_lib_df, matched_indices, matched_timestamps, now=job.time_to,
+	                                  **settings['krobble_options'])
+	_, track_df, artist_df, album_df = build_reports(mus_lib_df, matched_indices, weights, catalog)
+
+	run_report.begin('write')
+	write_reports(job.out_dir, track_df, artist_df, album_df)
+
+	if job.periods:
+		write_period_reports(job.out_dir, build_period_reports(mus_lib_df, matched_indices, matched_timestamps,
+		                                                       weights, job.periods, catalog))
+
+	if settings['timeseries'] is not None:
+		windows, top_n = settings['timeseries']
+		write_timeseries_reports(job.out_dir.joinpath('timeseries'),
+		                         build_timeseries_reports(mus_lib_df, matched_indices, matched_timestamps, windows, top_n))
+
+	queued = write_review(pending, job.out_dir.joinpath('review.csv')) if pending else 0
+	run_report.write(job.out_dir)
+
+	return {'username': job.username, 'scrobbles': len(accumulator), 'tracks': len(keys),
+	        'accepted': len(found_rows), 'queued': queued, 'found_rows': found_rows, 'corrections': learned,
+	        'out_dir': str(job.out_dir)}
+
+
+def run_user_jobs(jobs: List[UserJob]) -> List[dict]:
+	# all the ranges of one user, one after the other. they share the user's cube file and sync rows in the store, two
+	# workers on the same user would save over each other's cube
+	results = []
+
+	for job in jobs:
+		try:
+			results.append(run_user(job))
+
+		except Exception as E:
+			results.append({'username': job.username, 'error': str(E), 'found_rows': [], 'corrections': []})
+
+	return results
+
+
+def run_users(jobs: List[UserJob], mus_lib_df: pd.DataFrame, lost_and_found_df: pd.DataFrame,
+              ignore_list_df: pd.DataFrame, snapshot: DirectorySnapshot, corrections: CorrectionStore, settings: Dict,
+              processes: int = None, memory: MemorySampler = None) -> List[dict]:
+	global _shared
+	user_jobs: Dict[str, List[UserJob]] = {}
+
+	for job in jobs:
+		user_jobs.setdefault(job.username, []).append(job)
+
+	processes = min(processes or os.cpu_count() or 1, len(user_jobs)) or 1
+	settings = dict(settings, processes=processes)
+
+	# the library, its catalog, its lookup tables and the lists are only ever built here, once for every user
+	shared = SharedLibrary(mus_lib_df, TrackCatalog(mus_lib_df),
+	                       LibraryMatcher(mus_lib_df, lost_and_found_df, ignore_list_df), snapshot, corrections,
+	                       settings)
+
+	if 'fork' in multiprocessing.get_all_start_methods():
+		_shared = shared
+		context, initializer, initargs = multiprocessing.get_context('fork'), None, ()
+		# workers are forked as jobs get submitted, the memory sampler thread must not be halfway through a sample
+		# (holding a lock the child would inherit held) at any of them
+		paused = memory.paused() if memory is not None else contextlib.nullcontext()
+	else:
+		context, initializer, initargs = multiprocessing.get_context('spawn'), _init_worker, (shared,)
+		paused = contextlib.nullcontext()
+
+	results = []
+
+	with paused, concurrent.futures.ProcessPoolExecutor(max_workers=processes, mp_context=context,
+	                                                    initializer=initializer, initargs=initargs) as pool:
+		futures = {pool.submit(run_user_jobs, user_job_list): user_job_list for user_job_list in user_jobs.values()}
+
+		for future in concurrent.futures.as_completed(futures):
+			try:
+				user_results = future.result()
+
+			except Exception as E:
+				# the worker itself went down, none of its ranges got a result
+				user_results = [{'username': job.username, 'error': str(E), 'found_rows': [], 'corrections': []}
+				                for job in futures[future]]
+
+			for result in user_results:
+				if 'error' in result:
+					print(result['username'], 'failed:', result['error'])
+
+				else:
+					print(result['username'], result['scrobbles'], 'scrobbles,', result['tracks'], 'distinct tracks,',
+					      result['accepted'], 'accepted automatically,', result['queued'],
+					      'queued for review, reports in', result['out_dir'])
+
+				results.append(result)
+
+	_shared = None
+	return results
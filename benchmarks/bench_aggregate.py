@@ -0,0 +1,31 @@
+import pathlib
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from aggregate import build_reports
+from catalog import TrackCatalog
+from synthetic import synthetic_library
+
+
+if __name__ == '__main__':
+	library_df = synthetic_library(60_000)
+	rng = np.random.default_rng(0)
+
+	start = time.perf_counter()
+	catalog = TrackCatalog(library_df)
+	print(f'catalog of {len(catalog)} tracks: {time.perf_counter() - start:.3f}s, {len(catalog.artists)} artists, '
+	      f'{len(catalog.album_artist)} albums')
+
+	for n_scrobbles in (10_000, 100_000, 1_000_000):
+		match_indices = rng.integers(0, len(library_df), n_scrobbles)
+
+		start = time.perf_counter()
+		_, track_df, artist_df, album_df = build_reports(library_df, match_indices, catalog=catalog)
+		elapsed = time.perf_counter() - start
+
+		print(f'aggregate {n_scrobbles:>8} scrobbles: {elapsed:.3f}s '
+		      f'({len(track_df)} tracks, {len(album_df)} albums, {len(artist_df)} artists)')
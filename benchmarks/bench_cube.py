@@ -0,0 +1,74 @@
+import pathlib
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from aggregate import build_reports
+from cube import AggregateCube, cube_file_for, rank_change, top
+from dates import local_buckets
+from synthetic import synthetic_library
+
+# a year's top albums out of ten years of history, from the cube against aggregating the year's scrobbles again
+
+YEARS = 10
+N_SCROBBLES = 1_000_000
+START = 1_300_000_000
+
+
+def best_of(repeat: int, f):
+	best, result = float('inf'), None
+
+	for _ in range(repeat):
+		start = time.perf_counter()
+		result = f()
+		best = min(best, time.perf_counter() - start)
+
+	return best, result
+
+
+if __name__ == '__main__':
+	library_df = synthetic_library(60_000)
+	rng = np.random.default_rng(0)
+	end = START + YEARS * 365 * 86400
+	timestamps = np.sort(rng.integers(START, end, N_SCROBBLES))
+	track_ids = library_df.index.to_numpy()[rng.integers(0, len(library_df), N_SCROBBLES)]
+
+	with tempfile.TemporaryDirectory() as tmp:
+		cube_file = cube_file_for(pathlib.Path(tmp), 'user')
+		cube = AggregateCube.load(cube_file, 'user')
+
+		# built a year at a time, like report runs over consecutive years would
+		start = time.perf_counter()
+		edges = np.linspace(START, end, YEARS + 1).astype(np.int64)
+
+		for time_from, time_to in zip(edges[:-1], edges[1:] - 1):
+			cube.add(library_df, track_ids, timestamps, int(time_from), int(time_to))
+
+		cube.save()
+		print(f'build: {time.perf_counter() - start:.3f}s, {len(cube)} (track, day) cells, '
+		      f'{cube_file.stat().st_size / 2 ** 20:.1f} MiB on disk')
+
+		load_secs, cube = best_of(3, lambda: AggregateCube.load(cube_file, 'user'))
+		print(f'load: {load_secs:.3f}s')
+
+	days = local_buckets(timestamps, 'day', cube.timezone_name)
+	first_day, last_day = int(days[-1]) - 364, int(days[-1])
+	in_year = days >= first_day
+
+	rebuild_secs, (_, _, _, album_df) = best_of(3, lambda: build_reports(library_df, track_ids[in_year],
+	                                                                        np.ones(int(in_year.sum()))))
+	query_secs, top_df = best_of(3, lambda: top(cube, 'albums', first_day, last_day, 50))
+	change_secs, _ = best_of(3, lambda: rank_change(cube, 'albums', (first_day, last_day),
+	                                                (first_day - 365, first_day - 1), 50))
+
+	expected = album_df.sort_values(['play_count', 'artist', 'album'], ascending=[False, True, True]).head(50)
+	same = (expected['album'].tolist() == top_df['album'].tolist()
+	        and expected['play_count'].tolist() == top_df['play_count'].tolist())
+	print(f'top 50 albums of the last year: {query_secs * 1000:.1f} ms from the cube, {rebuild_secs * 1000:.1f} ms '
+	      f'rebuilt from scrobbles, {"same" if same else "DIFFERENT"} albums')
+	print(f'rank change against the year before: {change_secs * 1000:.1f} ms')
+	sys.exit(0 if same else 1)
@@ -0,0 +1,27 @@
+import pathlib
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from dates import BUCKETS, convert_timestamp_to_local_datetime, local_buckets
+from synthetic import synthetic_listening
+
+
+def per_scrobble_hours(timestamps) -> list:
+	# what bucketing looked like one datetime at a time
+	return [convert_timestamp_to_local_datetime(t).hour for t in timestamps.tolist()]
+
+
+if __name__ == '__main__':
+	for n_scrobbles in (100_000, 1_000_000):
+		timestamps, _ = synthetic_listening(n_scrobbles, 1)
+
+		for bucket in BUCKETS:
+			start = time.perf_counter()
+			local_buckets(timestamps, bucket)
+			print(f'{n_scrobbles:>8} scrobbles {bucket:>8}: {(time.perf_counter() - start) * 1000:8.1f}ms')
+
+		start = time.perf_counter()
+		per_scrobble_hours(timestamps)
+		print(f'{n_scrobbles:>8} scrobbles hour, one at a time: {(time.perf_counter() - start) * 1000:8.1f}ms')
@@ -0,0 +1,35 @@
+import pathlib
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+import mock_lastfm
+from fetcher import TokenBucket, fetch_recent_tracks, pooled_session
+from lastfm_api import get_recent_tracks, new_session
+
+
+if __name__ == '__main__':
+	history = mock_lastfm.synthetic_history(20_000)
+
+	for latency in (0.05, 0.2):
+		# the old one-page-at-a-time walk has no retries, so it gets a mock that never fails
+		server = mock_lastfm.serve(mock_lastfm.MockLastFM(history, latency=latency))
+		start = time.perf_counter()
+		scrobbles = get_recent_tracks(new_session(), 'key', 'user', api_root=mock_lastfm.api_root(server))
+		print(f'sequential, {latency * 1000:.0f} ms latency: {time.perf_counter() - start:.2f}s, {len(scrobbles)} scrobbles')
+		server.shutdown()
+
+		server = mock_lastfm.serve(mock_lastfm.MockLastFM(history, latency=latency, fail_rate=0.02))
+		api_root = mock_lastfm.api_root(server)
+
+		for workers in (4, 8):
+			# the real limit is 5/s, the mock has no limit so this only shows the concurrency
+			bucket = TokenBucket(rate=50, capacity=workers)
+			start = time.perf_counter()
+			scrobbles = fetch_recent_tracks(pooled_session(workers), 'key', 'user', api_root=api_root, workers=workers,
+			                                bucket=bucket, backoff=0.01)
+			print(f'{workers} workers, {latency * 1000:.0f} ms latency: {time.perf_counter() - start:.2f}s, '
+			      f'{len(scrobbles)} scrobbles, {len(set(scrobbles))} unique')
+
+		server.shutdown()
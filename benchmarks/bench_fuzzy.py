@@ -0,0 +1,38 @@
+import difflib
+import pathlib
+import random
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from fuzzy_index import TrigramIndex
+from synthetic import misspell, synthetic_names
+
+
+if __name__ == '__main__':
+	rng = random.Random(1)
+
+	for n_names in (1_000, 5_000, 20_000):
+		names = synthetic_names(n_names)
+		truth = [rng.choice(names) for _ in range(200)]
+		queries = [misspell(name, rng) for name in truth]
+
+		start = time.perf_counter()
+		index = TrigramIndex(names)
+		build = time.perf_counter() - start
+
+		start = time.perf_counter()
+		indexed = [index.close_matches(q, 1)[0] for q in queries]
+		indexed_time = (time.perf_counter() - start) / len(queries)
+
+		sample = queries[:20]
+		start = time.perf_counter()
+		scanned = [difflib.get_close_matches(q, names, 500, 0)[0] for q in sample]
+		scan_time = (time.perf_counter() - start) / len(sample)
+
+		indexed_right = sum(a == b for a, b in zip(indexed, truth))
+		scanned_right = sum(a == b for a, b in zip(scanned, truth))
+		print(f'{n_names:>6} names: build {build * 1000:.0f} ms, '
+		      f'indexed {indexed_time * 1000:.3f} ms/query ({indexed_right}/{len(truth)} right), '
+		      f'get_close_matches {scan_time * 1000:.1f} ms/query ({scanned_right}/{len(sample)} right)')
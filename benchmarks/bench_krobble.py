@@ -0,0 +1,30 @@
+import pathlib
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from aggregate import build_reports
+from krobble import SCHEMES, krobble_weights
+from synthetic import synthetic_library, synthetic_listening
+
+
+if __name__ == '__main__':
+	library_df = synthetic_library(60_000)
+	durations = library_df['time_secs'].to_numpy(dtype=np.float64)
+
+	for n_scrobbles in (100_000, 1_000_000):
+		timestamps, track_ids = synthetic_listening(n_scrobbles, len(library_df))
+
+		for schemes in [[scheme] for scheme in SCHEMES] + [list(SCHEMES)]:
+			start = time.perf_counter()
+			weights = krobble_weights(timestamps, track_ids, durations[track_ids], schemes=schemes)
+			elapsed = time.perf_counter() - start
+			print(f'krobbles {n_scrobbles:>8} scrobbles {"+".join(schemes):>25}: {elapsed * 1000:8.1f}ms '
+			      f'(total {weights.sum():,.0f})')
+
+		start = time.perf_counter()
+		build_reports(library_df, track_ids, weights)
+		print(f'reports  {n_scrobbles:>8} scrobbles with krobbles: {time.perf_counter() - start:.3f}s')
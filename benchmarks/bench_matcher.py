@@ -0,0 +1,46 @@
+import pathlib
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from matcher import LibraryMatcher
+from synthetic import synthetic_library, synthetic_scrobbles
+
+
+def scan_match(mus_lib_df: pd.DataFrame, scrobbles: list) -> list:
+	# the old per-scrobble boolean mask
+	indices = []
+
+	for artist, album, title in scrobbles:
+		rows = mus_lib_df.loc[(mus_lib_df['artist'] == artist) &
+		                      (mus_lib_df['album'] == album) &
+		                      (mus_lib_df['title'] == title)]
+		indices.append(rows.index.values[0] if len(rows) == 1 else -1)
+
+	return indices
+
+
+def time_it(f, *args) -> float:
+	start = time.perf_counter()
+	f(*args)
+	return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+	library_df = synthetic_library(60_000)
+
+	start = time.perf_counter()
+	matcher = LibraryMatcher(library_df)
+	print(f'build index, 60000 tracks: {time.perf_counter() - start:.3f}s')
+
+	for n_scrobbles in (10_000, 50_000, 100_000, 200_000):
+		scrobbles = synthetic_scrobbles(library_df, n_scrobbles)
+		elapsed = time_it(matcher.resolve, scrobbles)
+		print(f'resolve {n_scrobbles:>7} scrobbles: {elapsed:.3f}s ({1e6 * elapsed / n_scrobbles:.2f} us/scrobble)')
+
+	scrobbles = synthetic_scrobbles(library_df, 200)
+	elapsed = time_it(scan_match, library_df, scrobbles)
+	print(f'old .loc scan, 200 scrobbles: {elapsed:.3f}s ({1e6 * elapsed / 200:.2f} us/scrobble)')
@@ -0,0 +1,45 @@
+import datetime as dt
+import pathlib
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from aggregate import build_period_reports, build_reports
+from catalog import TrackCatalog
+from periods import split_range
+from synthetic import synthetic_library, synthetic_listening
+
+
+def utc_timestamp(d: dt.datetime) -> int:
+	return int(d.replace(tzinfo=dt.timezone.utc).timestamp())
+
+
+if __name__ == '__main__':
+	library_df = synthetic_library(60_000)
+	catalog = TrackCatalog(library_df)
+	periods = split_range(dt.datetime(2020, 9, 13), dt.datetime(2021, 9, 12, 23, 59, 59), ['month', 'year'],
+	                      utc_timestamp)
+
+	for n_scrobbles in (100_000, 1_000_000):
+		timestamps, track_ids = synthetic_listening(n_scrobbles, len(library_df))
+		weights = np.ones(n_scrobbles)
+
+		start = time.perf_counter()
+		build_reports(library_df, track_ids, weights, catalog)
+		single = time.perf_counter() - start
+
+		start = time.perf_counter()
+		for period in periods:
+			inside = (timestamps >= period.time_from) & (timestamps <= period.time_to)
+			build_reports(library_df, track_ids[inside], weights[inside], catalog)
+		one_by_one = time.perf_counter() - start
+
+		start = time.perf_counter()
+		build_period_reports(library_df, track_ids, timestamps, weights, periods, catalog)
+		bucketed = time.perf_counter() - start
+
+		print(f'{n_scrobbles:>8} scrobbles, {len(periods)} periods: whole range {single:.3f}s, '
+		      f'one report per period {one_by_one:.3f}s, one bucketing pass {bucketed:.3f}s')
@@ -0,0 +1,76 @@
+import argparse
+import collections
+import pathlib
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+
+# -X importtime total for main.py --help, in milliseconds
+HELP_BUDGET_MS = 200
+
+# none of these should load unless a run can prompt (tkinter, msg_box, lost_tracks), talks to last.fm through pylast
+# or reads tags with eyed3
+OFFLINE_FORBIDDEN = ('tkinter', 'msg_box', 'lost_tracks', 'pylast', 'ftfy', 'eyed3', 'requests_cache')
+
+
+def import_times(command: List[str], cwd: pathlib.Path) -> Dict[str, int]:
+	# module -> its own import time in microseconds, from python -X importtime
+	result = subprocess.run([sys.executable, '-X', 'importtime'] + command, cwd=cwd, capture_output=True, text=True)
+	times = {}
+
+	for line in result.stderr.splitlines():
+		if not line.startswith('import time:') or 'self [us]' in line:
+			continue
+
+		self_us, _, module = line[len('import time:'):].split('|')
+		times[module.strip()] = int(self_us)
+
+	return times
+
+
+def wall_time(command: List[str], cwd: pathlib.Path, repeat: int) -> float:
+	best = float('inf')
+
+	for _ in range(repeat):
+		start = time.perf_counter()
+		subprocess.run([sys.executable] + command, cwd=cwd, capture_output=True)
+		best = min(best, time.perf_counter() - start)
+
+	return best
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Startup time of main.py --help and of the offline report imports.')
+	parser.add_argument('-repeat', type=int, default=5)
+	args = parser.parse_args()
+
+	# an empty working directory, so nothing can lean on a KEY_FILE.txt or USER_INFO.txt being there
+	with tempfile.TemporaryDirectory() as tmp:
+		cwd = pathlib.Path(tmp)
+		help_times = import_times([str(ROOT.joinpath('main.py')), '--help'], cwd)
+		help_ms = sum(help_times.values()) / 1000
+		print(f'--help: {help_ms:.0f} ms of imports (budget {HELP_BUDGET_MS} ms), '
+		      f'{wall_time([str(ROOT.joinpath("main.py")), "--help"], cwd, args.repeat) * 1000:.0f} ms wall')
+
+		offline_times = import_times(['-c', f'import sys; sys.path.insert(0, {str(ROOT)!r}); import cli, pipeline'], cwd)
+		print(f'report run: {sum(offline_times.values()) / 1000:.0f} ms of imports before the first stage')
+
+		packages = collections.Counter()
+
+		for module, us in offline_times.items():
+			packages[module.split('.')[0]] += us
+
+		for package, us in packages.most_common(5):
+			print(f'{package:>12}: {us / 1000:6.1f} ms')
+
+	loaded = sorted(m for m in offline_times if m.split('.')[0] in OFFLINE_FORBIDDEN)
+	failed = help_ms > HELP_BUDGET_MS or loaded
+
+	if loaded:
+		print('loaded on the way to a report run:', ', '.join(loaded))
+
+	sys.exit(1 if failed else 0)
@@ -0,0 +1,24 @@
+import pathlib
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from storage import open_store
+from synthetic import synthetic_library
+
+
+if __name__ == '__main__':
+	library_df = synthetic_library(60_000)
+	library_df['track_num'] = '(1, 10)'
+
+	with tempfile.TemporaryDirectory() as tmp:
+		for suffix in ('.csv', '.feather', '.parquet'):
+			store = open_store(pathlib.Path(tmp).joinpath('music_library' + suffix))
+			store.write(library_df)
+
+			start = time.perf_counter()
+			df = store.read()
+			elapsed = time.perf_counter() - start
+			print(f'{suffix:>8} read, {len(df)} rows: {1000 * elapsed:.1f} ms')
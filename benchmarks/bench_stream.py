@@ -0,0 +1,51 @@
+import pathlib
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from lastfm_api import Scrobble
+from matcher import ScrobbleAccumulator
+from scrobble_store import ScrobbleStore
+
+
+def fill_store(store: ScrobbleStore, n_scrobbles: int, n_tracks: int = 20_000):
+	store.add('user', (Scrobble(1_600_000_000 + i * 200, f'artist {i % n_tracks // 40}', f'album {i % n_tracks // 10}',
+	                            f'title {i % n_tracks}') for i in range(n_scrobbles)), 0, 2 ** 40)
+
+
+def measure(f):
+	tracemalloc.start()
+	start = time.perf_counter()
+	f()
+	elapsed = time.perf_counter() - start
+	_, peak = tracemalloc.get_traced_memory()
+	tracemalloc.stop()
+	return elapsed, peak / 2 ** 20
+
+
+if __name__ == '__main__':
+	with tempfile.TemporaryDirectory() as tmp:
+		store = ScrobbleStore(pathlib.Path(tmp).joinpath('scrobbles.sqlite'))
+		fill_store(store, 1_000_000)
+
+		def whole_list():
+			accumulator = ScrobbleAccumulator()
+			accumulator.add(store.scrobbles('user', 0, 2 ** 40))
+			accumulator.collapse()
+
+		def streamed():
+			accumulator = ScrobbleAccumulator()
+
+			for chunk in store.iter_scrobbles('user', 0, 2 ** 40):
+				accumulator.add(chunk)
+
+			accumulator.collapse()
+
+		for name, f in (('whole list', whole_list), ('streamed', streamed)):
+			elapsed, peak = measure(f)
+			print(f'{name:>10}: {elapsed:.2f}s, peak {peak:.0f} MiB')
+
+		store.close()
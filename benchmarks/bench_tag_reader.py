@@ -0,0 +1,45 @@
+import logging
+import pathlib
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+import tag_reader
+from synthetic import write_synthetic_library
+
+
+def eyed3_path(filepaths: list) -> int:
+	# what load_library used to do, every AudioFile kept until the log is written
+	import eyed3
+	tracks = [eyed3.load(x) for x in filepaths]
+	return len(tracks)
+
+
+def streaming_path(filepaths: list) -> int:
+	return sum(1 for _ in tag_reader.iter_track_records(filepaths))
+
+
+def measure(f, filepaths: list):
+	tracemalloc.start()
+	start = time.perf_counter()
+	f(filepaths)
+	elapsed = time.perf_counter() - start
+	_, peak = tracemalloc.get_traced_memory()
+	tracemalloc.stop()
+	return elapsed, peak
+
+
+if __name__ == '__main__':
+	logging.getLogger('eyed3').setLevel(logging.ERROR)
+
+	with tempfile.TemporaryDirectory() as tmp:
+		for n_artists in (10, 50, 200):
+			root = pathlib.Path(tmp).joinpath(str(n_artists))
+			filepaths = write_synthetic_library(root, n_artists)
+
+			for name, f in (('eyed3', eyed3_path), ('streaming', streaming_path)):
+				elapsed, peak = measure(f, filepaths)
+				print(f'{name:>9} {len(filepaths):>6} files: {elapsed:.3f}s, peak {peak / 2 ** 20:.1f} MiB')
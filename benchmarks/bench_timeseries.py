@@ -0,0 +1,24 @@
+import pathlib
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from timeseries import build_timeseries_reports
+from synthetic import synthetic_library
+
+
+if __name__ == '__main__':
+	library_df = synthetic_library(60_000)
+	rng = np.random.default_rng(0)
+
+	for years, n_scrobbles in ((1, 100_000), (5, 1_000_000), (10, 1_000_000)):
+		timestamps = np.sort(rng.integers(1_300_000_000, 1_300_000_000 + years * 365 * 86400, n_scrobbles))
+		track_ids = library_df.index.to_numpy()[rng.integers(0, len(library_df), n_scrobbles)]
+
+		start = time.perf_counter()
+		reports = build_timeseries_reports(library_df, track_ids, timestamps)
+		print(f'{years:>2} years {n_scrobbles:>8} scrobbles: {time.perf_counter() - start:.3f}s',
+		      ', '.join(f'{name} {len(df)} rows' for name, df in reports.items()))
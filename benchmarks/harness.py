@@ -0,0 +1,164 @@
+import argparse
+import contextlib
+import datetime as dt
+import io
+import json
+import os
+import pathlib
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+import mock_lastfm
+import pipeline
+from cli import build_parser
+from dates import convert_timestamp_to_local_datetime
+from fetcher import TokenBucket, iter_recent_tracks, pooled_session
+from instrumentation import COUNTERS, RunReport
+from scrobble_store import ScrobbleStore
+from synthetic import catalog_history, synthetic_catalog, write_catalog
+
+# main.py's whole run on a generated library, after syncing a mock last.fm into the scrobble store. the stage times,
+# peak memory and counters come out of the run's own run report. results go to a json file per commit so two commits
+# can be compared with -compare
+
+# name -> (artists, albums per artist, tracks per album, scrobbles)
+SCALES = {
+	'small': (20, 3, 10, 5_000),
+	'medium': (100, 4, 10, 50_000),
+	'large': (400, 5, 10, 200_000),
+}
+
+RESULTS_DIR = pathlib.Path(__file__).resolve().parent.joinpath('results')
+
+
+def current_commit() -> str:
+	try:
+		return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+		                      cwd=pathlib.Path(__file__).resolve().parent, check=True).stdout.strip()
+	except (OSError, subprocess.CalledProcessError):
+		return 'unknown'
+
+
+def sync_history(root: pathlib.Path, history: list) -> float:
+	# the fetcher and the store sync main.py uses, without the api rate limit, this measures the client side
+	server = mock_lastfm.serve(mock_lastfm.MockLastFM(history))
+	start = time.perf_counter()
+
+	try:
+		store = ScrobbleStore(root.joinpath('scrobbles.sqlite'))
+		session = pooled_session(4)
+		store.sync('user', lambda f, t: iter_recent_tracks(session, 'key', 'user', f, t,
+		                                                   mock_lastfm.api_root(server), 4, TokenBucket(1e6, 100)),
+		           history[0][0], now=history[-1][0] + 300)
+		store.close()
+
+	finally:
+		server.shutdown()
+
+	return time.perf_counter() - start
+
+
+def run_scale(root: pathlib.Path, n_artists: int, albums_per_artist: int, tracks_per_album: int, n_scrobbles: int,
+              workers: int = None) -> dict:
+	catalog = synthetic_catalog(n_artists, albums_per_artist, tracks_per_album)
+	library_dir = root.joinpath('library')
+	write_catalog(library_dir, catalog)
+	history = catalog_history(catalog, n_scrobbles)
+	sync_secs = sync_history(root, history)
+
+	# every scrobble falls inside the range, nobody gets asked anything and the store is only read
+	first_day, last_day = (convert_timestamp_to_local_datetime(history[i][0]).strftime('%Y-%m-%d') for i in (0, -1))
+	argv = ['-dr', first_day, last_day, '-periods', 'month', '-username', 'user', '--offline', '--batch',
+	        '--no-http-cache', '-library-dir', str(library_dir)]
+
+	for option, name in (('-library-log', 'music_library.feather'), ('-scrobble-db', 'scrobbles.sqlite'),
+	                     ('-lost-and-found-log', 'lost_and_found.csv'), ('-ignore-list', 'ignore_list.csv'),
+	                     ('-review-file', 'review.csv'), ('-corrections-file', 'corrections.json'),
+	                     ('-state-file', 'state.json'), ('-cube-dir', 'cubes')):
+		argv += [option, str(root.joinpath(name))]
+
+	if workers is not None:
+		argv += ['-index-workers', str(workers)]
+
+	COUNTERS.clear()
+	run_report = RunReport()
+	cwd = os.getcwd()
+
+	# the reports go into the working directory
+	try:
+		os.chdir(root)
+
+		with contextlib.redirect_stdout(io.StringIO()):
+			pipeline.run(build_parser().parse_args(argv), run_report)
+
+	finally:
+		os.chdir(cwd)
+
+	return {
+		'seconds': {'sync': round(sync_secs, 4),
+		            **{name: round(stage['wall_secs'], 4) for name, stage in run_report.stages.items()}},
+		'peak_memory_mb': {name: round(stage['peak_memory_mb'], 1) for name, stage in run_report.stages.items()},
+		'counts': dict(sorted(COUNTERS.items())),
+	}
+
+
+def compare(old: dict, new: dict):
+	print(f'{old["commit"]} -> {new["commit"]}')
+
+	for scale, result in new['scales'].items():
+		if scale not in old['scales']:
+			continue
+
+		for stage, seconds in result['seconds'].items():
+			before = old['scales'][scale]['seconds'].get(stage)
+
+			if before:
+				print(f'{scale:>8} {stage:>10}: {before:8.3f}s -> {seconds:8.3f}s ({seconds / before:5.2f}x)')
+
+		for stage, peak_mb in result.get('peak_memory_mb', {}).items():
+			before = old['scales'][scale].get('peak_memory_mb', {}).get(stage)
+
+			if before:
+				print(f'{scale:>8} {stage:>10}: {before:8.1f} MiB peak -> {peak_mb:8.1f} MiB')
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Time every pipeline stage on synthetic data.')
+	parser.add_argument('-scales', type=str, nargs='+', choices=SCALES, default=['small', 'medium'])
+	parser.add_argument('-workers', type=int, default=None, help='tag reading processes for the library stage')
+	parser.add_argument('-out', type=str, default=None, help='results file, results/<commit>.json by default')
+	parser.add_argument('-compare', type=str, default=None, help='earlier results file to compare against')
+	args = parser.parse_args()
+
+	results = {
+		'commit': current_commit(),
+		'created': dt.datetime.now().isoformat(timespec='seconds'),
+		'python': platform.python_version(),
+		'platform': platform.platform(),
+		'scales': {},
+	}
+
+	for scale in args.scales:
+		with tempfile.TemporaryDirectory() as tmp:
+			result = run_scale(pathlib.Path(tmp), *SCALES[scale], workers=args.workers)
+
+		results['scales'][scale] = result
+		print(scale, ', '.join(f'{stage} {seconds:.3f}s' for stage, seconds in result['seconds'].items()),
+		      result['counts'])
+
+	out_file = pathlib.Path(args.out) if args.out else RESULTS_DIR.joinpath(results['commit'] + '.json')
+	out_file.parent.mkdir(parents=True, exist_ok=True)
+
+	with out_file.open(mode='w', encoding='utf-8') as f:
+		json.dump(results, f, indent=1)
+
+	print('results written to', out_file)
+
+	if args.compare:
+		with open(args.compare, mode='r', encoding='utf-8') as f:
+			compare(json.load(f), results)
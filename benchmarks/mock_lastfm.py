@@ -0,0 +1,105 @@
+import argparse
+import http.server
+import json
+import random
+import threading
+import time
+import urllib.parse
+from bisect import bisect_left, bisect_right
+from typing import List, Tuple
+
+from synthetic import MockScrobble, synthetic_history
+
+# local stand-in for ws.audioscrobbler.com/2.0, enough of user.getRecentTracks for the fetch and sync code
+
+
+class MockLastFM:
+
+	def __init__(self, history: List[MockScrobble], latency: float = 0.0, fail_rate: float = 0.0, seed: int = 0):
+		self.history = sorted(history)
+		self.timestamps = [s[0] for s in self.history]
+		self.latency = latency
+		self.fail_rate = fail_rate
+		self.requests = 0
+		self.rng = random.Random(seed)
+		self.lock = threading.Lock()
+
+	def recent_tracks(self, params: dict) -> Tuple[int, dict]:
+		with self.lock:
+			self.requests += 1
+			fail = self.rng.random() < self.fail_rate
+
+		if self.latency:
+			time.sleep(self.latency)
+
+		if fail:
+			return 500, {'error': 8, 'message': 'Operation failed - Most likely the backend service failed.'}
+
+		time_from = int(params.get('from', 0))
+		time_to = int(params.get('to', 2 ** 62))
+		limit = int(params.get('limit', 50))
+		page = int(params.get('page', 1))
+
+		lo = bisect_left(self.timestamps, time_from)
+		hi = bisect_right(self.timestamps, time_to)
+		total = hi - lo
+		total_pages = max(1, -(-total // limit))
+
+		# newest first, like the real thing
+		window = self.history[lo:hi][::-1][(page - 1) * limit:page * limit]
+		tracks = [{
+			'artist': {'#text': artist},
+			'album': {'#text': album},
+			'name': title,
+			'date': {'uts': str(timestamp)},
+		} for timestamp, artist, album, title in window]
+
+		return 200, {'recenttracks': {
+			'track': tracks,
+			'@attr': {'page': str(page), 'perPage': str(limit), 'totalPages': str(total_pages), 'total': str(total)},
+		}}
+
+
+def serve(mock: MockLastFM, port: int = 0) -> http.server.ThreadingHTTPServer:
+	class Handler(http.server.BaseHTTPRequestHandler):
+		protocol_version = 'HTTP/1.1'
+
+		def do_GET(self):
+			params = dict(urllib.parse.parse_qsl(urllib.parse.urlparse(self.path).query))
+
+			if params.get('method', '').lower() == 'user.getrecenttracks':
+				status, payload = mock.recent_tracks(params)
+			else:
+				status, payload = 400, {'error': 3, 'message': 'Invalid Method'}
+
+			body = json.dumps(payload).encode('utf-8')
+			self.send_response(status)
+			self.send_header('Content-Type', 'application/json')
+			self.send_header('Content-Length', str(len(body)))
+			self.end_headers()
+			self.wfile.write(body)
+
+		def log_message(self, *args):
+			pass
+
+	server = http.server.ThreadingHTTPServer(('127.0.0.1', port), Handler)
+	server.daemon_threads = True
+	threading.Thread(target=server.serve_forever, daemon=True).start()
+	return server
+
+
+def api_root(server: http.server.ThreadingHTTPServer) -> str:
+	return 'http://127.0.0.1:%d/2.0' % server.server_address[1]
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Serve a fake user.getRecentTracks for -api-root.')
+	parser.add_argument('-port', type=int, default=8000)
+	parser.add_argument('-scrobbles', type=int, default=50_000)
+	parser.add_argument('-latency', type=float, default=0.0, help='seconds added to every response')
+	parser.add_argument('-fail-rate', type=float, default=0.0, help='fraction of requests answered with an error')
+	args = parser.parse_args()
+
+	server = serve(MockLastFM(synthetic_history(args.scrobbles), args.latency, args.fail_rate), args.port)
+	print('serving on', api_root(server))
+	threading.Event().wait()
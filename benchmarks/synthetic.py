@@ -0,0 +1,219 @@
+import pathlib
+import random
+import unicodedata
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+# every generator the benchmarks use, seeded so two runs (or two commits) see the same data
+
+WORDS = ['the', 'black', 'midnight', 'orchestra', 'sound', 'river', 'ghost', 'electric', 'velvet', 'garden', 'band',
+         'machine', 'young', 'blue', 'fire', 'golden', 'echo', 'north', 'silver', 'club', 'sister', 'kings', 'moon']
+ACCENTED_WORDS = ['café', 'señor', 'über', 'björk', 'noël', 'déjà', 'mañana', 'forêt', 'sōl', 'smörgås']
+
+# MPEG1 layer 3, 128 kbps, 44.1 kHz, no padding -> 417 byte frames
+MPEG_FRAME = b'\xff\xfb\x90\x64' + bytes(413)
+
+# (timestamp, artist, album, title), what mock_lastfm serves
+MockScrobble = Tuple[int, str, str, str]
+
+
+def synthetic_names(n: int, seed: int = 0) -> list:
+	rng = random.Random(seed)
+	return sorted({' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 4))) + f' {i}' for i in range(n)})
+
+
+def misspell(name: str, rng: random.Random) -> str:
+	chars = list(name.upper() if rng.random() < 0.3 else name)
+	i = rng.randrange(len(chars))
+	chars[i] = rng.choice('aeiou')
+	return ''.join(chars)
+
+
+def strip_accents(name: str) -> str:
+	return ''.join(c for c in unicodedata.normalize('NFKD', name) if not unicodedata.combining(c))
+
+
+def synthetic_library(n_tracks: int, tracks_per_album: int = 10, albums_per_artist: int = 4) -> pd.DataFrame:
+	# a library log frame without any files behind it
+	rows = []
+
+	for i in range(n_tracks):
+		album_number = i // tracks_per_album
+		artist_number = album_number // albums_per_artist
+		rows.append({
+			'filepath': f'A:\\music\\M\\artist {artist_number}\\album {album_number}\\{i:02d} title {i}.mp3',
+			'artist': f'artist {artist_number}',
+			'album_artist': f'artist {artist_number}',
+			'album': f'album {album_number}',
+			'title': f'title {i}',
+			'time_secs': 180.0 + i % 120,
+		})
+
+	return pd.DataFrame(rows)
+
+
+def synthetic_scrobbles(mus_lib_df: pd.DataFrame, n_scrobbles: int, miss_rate: float = 0.05) -> list:
+	# (artist, album, title) keys, miss_rate of them not in the library
+	rng = random.Random(0)
+	keys = list(zip(mus_lib_df['artist'], mus_lib_df['album'], mus_lib_df['title']))
+	scrobbles = []
+
+	for i in range(n_scrobbles):
+		if rng.random() < miss_rate:
+			scrobbles.append(('unknown artist', 'unknown album', f'unknown title {i}'))
+		else:
+			scrobbles.append(rng.choice(keys))
+
+	return scrobbles
+
+
+def synthetic_listening(n_scrobbles: int, n_tracks: int, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+	# (timestamps, track ids), a year of listening in sessions of back to back tracks with hours between sessions
+	rng = np.random.default_rng(seed)
+	gaps = np.where(rng.random(n_scrobbles) < 0.05, rng.integers(3600, 36000, n_scrobbles),
+	                rng.integers(120, 420, n_scrobbles))
+	timestamps = 1_600_000_000 + np.cumsum(gaps)
+	track_ids = rng.integers(0, n_tracks, n_scrobbles)
+	return timestamps, track_ids
+
+
+def synthetic_history(n_scrobbles: int, start: int = 1577836800, spacing: int = 200, n_tracks: int = 5000,
+                      seed: int = 0) -> List[MockScrobble]:
+	rng = random.Random(seed)
+	history = []
+
+	for i in range(n_scrobbles):
+		track = rng.randrange(n_tracks)
+		history.append((start + i * spacing, f'artist {track // 40}', f'album {track // 10}', f'title {track}'))
+
+	return history
+
+
+def _text_frame(frame_id: bytes, text: str) -> bytes:
+	data = b'\x03' + text.encode('utf-8')
+	return frame_id + len(data).to_bytes(4, 'big') + b'\x00\x00' + data
+
+
+def _syncsafe(n: int) -> bytes:
+	return bytes([(n >> 21) & 0x7f, (n >> 14) & 0x7f, (n >> 7) & 0x7f, n & 0x7f])
+
+
+def synthetic_mp3(artist: str, album: str, title: str, track_num: int, track_total: int, n_frames: int = 200,
+                  padding: int = 256, album_artist: str = None, year: int = None) -> bytes:
+	frames = [
+		_text_frame(b'TPE1', artist),
+		_text_frame(b'TPE2', artist if album_artist is None else album_artist),
+		_text_frame(b'TALB', album),
+		_text_frame(b'TIT2', title),
+		_text_frame(b'TRCK', f'{track_num}/{track_total}'),
+		_text_frame(b'TPOS', '1/1'),
+	]
+
+	if year is not None:
+		frames.append(_text_frame(b'TYER', str(year)))
+
+	frames = b''.join(frames) + bytes(padding)
+	header = b'ID3\x03\x00\x00' + _syncsafe(len(frames))
+	return header + frames + MPEG_FRAME * n_frames
+
+
+def write_synthetic_library(root: pathlib.Path, n_artists: int, albums_per_artist: int = 3,
+                            tracks_per_album: int = 10) -> list:
+	filepaths = []
+
+	for a in range(n_artists):
+		for b in range(albums_per_artist):
+			album_dir = root.joinpath(f'Artist {a}', f'[2020] Album {a}-{b}')
+			album_dir.mkdir(parents=True, exist_ok=True)
+
+			for t in range(tracks_per_album):
+				filepath = album_dir.joinpath(f'{t + 1:02d} Title {t}.mp3')
+				filepath.write_bytes(synthetic_mp3(f'Artist {a}', f'Album {a}-{b}', f'Title {t}', t + 1, tracks_per_album))
+				filepaths.append(str(filepath))
+
+	return filepaths
+
+
+def _name(rng: random.Random, n_words: Tuple[int, int], accent_rate: float) -> str:
+	words = [rng.choice(ACCENTED_WORDS if rng.random() < accent_rate else WORDS) for _ in range(rng.randint(*n_words))]
+	return ' '.join(words).title()
+
+
+def synthetic_catalog(n_artists: int, albums_per_artist: int = 4, tracks_per_album: int = 10, seed: int = 0,
+                      accent_rate: float = 0.1, featuring_rate: float = 0.1) -> List[Dict]:
+	# one dict per track laid out like a real library: artist/[year] album/NN title.mp3. names carry accents now and
+	# then, and featuring_rate of the tracks have several artists in the artist tag joined by ' / '
+	rng = random.Random(seed)
+	artists = [f'{_name(rng, (1, 3), accent_rate)} {a}' for a in range(n_artists)]
+	catalog = []
+
+	for a, album_artist in enumerate(artists):
+		for b in range(albums_per_artist):
+			album = f'{_name(rng, (1, 4), accent_rate)} {a}-{b}'
+			year = rng.randint(1960, 2022)
+
+			for t in range(tracks_per_album):
+				artist = album_artist
+
+				if rng.random() < featuring_rate:
+					artist = ' / '.join([album_artist] + rng.sample(artists, rng.randint(1, 2)))
+
+				title = f'{_name(rng, (1, 5), accent_rate)} {t}'
+				catalog.append({
+					'artist': artist,
+					'album_artist': album_artist,
+					'album': album,
+					'title': title,
+					'track_num': t + 1,
+					'track_total': tracks_per_album,
+					'year': year,
+					'relative_path': (album_artist, f'[{year}] {album}', f'{t + 1:02d} {title}.mp3'),
+				})
+
+	return catalog
+
+
+def write_catalog(root: pathlib.Path, catalog: List[Dict], n_frames: int = 40) -> List[str]:
+	filepaths = []
+
+	for track in catalog:
+		filepath = root.joinpath(*track['relative_path'])
+		filepath.parent.mkdir(parents=True, exist_ok=True)
+		filepath.write_bytes(synthetic_mp3(track['artist'], track['album'], track['title'], track['track_num'],
+		                                   track['track_total'], n_frames, album_artist=track['album_artist'],
+		                                   year=track['year']))
+		filepaths.append(str(filepath))
+
+	return filepaths
+
+
+def catalog_history(catalog: List[Dict], n_scrobbles: int, start: int = 1577836800, seed: int = 0,
+                    noise_rate: float = 0.05, miss_rate: float = 0.03) -> List[MockScrobble]:
+	# scrobbles the way last.fm reports them: only the first artist, listening in sessions, a few popular tracks
+	# played much more than the rest. noise_rate of them differ from the tags by case or accents, miss_rate of them
+	# are tracks the library doesn't have
+	rng = random.Random(seed)
+	weights = [1 / (i + 1) ** 0.8 for i in range(len(catalog))]
+	rng.shuffle(weights)
+	tracks = rng.choices(catalog, weights, k=n_scrobbles)
+	history = []
+	timestamp = start
+
+	for i, track in enumerate(tracks):
+		timestamp += rng.randint(3600, 36000) if rng.random() < 0.05 else rng.randint(120, 420)
+
+		if rng.random() < miss_rate:
+			history.append((timestamp, f'Unknown Artist {i % 97}', f'Unknown Album {i % 89}', f'Unknown Title {i}'))
+			continue
+
+		artist, album, title = track['album_artist'], track['album'], track['title']
+
+		if rng.random() < noise_rate:
+			change = rng.choice((str.lower, str.upper, strip_accents))
+			artist, album, title = change(artist), change(album), change(title)
+
+		history.append((timestamp, artist, album, title))
+
+	return history
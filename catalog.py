@@ -0,0 +1,83 @@
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+# the library's artists, album names and titles interned into dense int ids, with every track pointing at its album
+# and every album at its album artist. the reports group and sort on these arrays and only look the names back up
+# for the rows they write.
+# ids are handed out in name order, missing names last, so sorting ids sorts names and np.unique over ids comes out in
+# the same order as a sorted groupby over the names
+
+
+def library_time_secs(mus_lib_df: pd.DataFrame) -> np.ndarray:
+	return pd.to_numeric(mus_lib_df['time_secs'], errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+
+
+def intern(*columns: pd.Series) -> Tuple[List[np.ndarray], np.ndarray]:
+	# one id table for all the columns, (ids of every column, value of every id). the library log keeps the repeated
+	# columns as categoricals, for those only the categories get sorted
+	values = [pd.Series(np.append(column.cat.categories.to_numpy(dtype=object), np.nan))
+	          if isinstance(column.dtype, pd.CategoricalDtype) else column for column in columns]
+	ids, names = pd.factorize(values[0] if len(values) == 1 else pd.concat(values, ignore_index=True), sort=True,
+	                          use_na_sentinel=False)
+	column_ids = np.split(ids.astype(np.int32), np.cumsum([len(v) for v in values])[:-1])
+
+	for i, column in enumerate(columns):
+		if isinstance(column.dtype, pd.CategoricalDtype):
+			# a missing value is code -1, the nan added after the categories
+			column_ids[i] = column_ids[i][column.cat.codes.to_numpy()]
+
+	return column_ids, np.asarray(names, dtype=object)
+
+
+class TrackCatalog:
+	# one per library frame, rows are positions in it and not index labels
+
+	def __init__(self, mus_lib_df: pd.DataFrame):
+		self.index = mus_lib_df.index
+
+		# artists and album artists share one table, album_stats names an album by its album artist
+		(self.track_artist, album_artist_ids), self.artists = intern(mus_lib_df['artist'], mus_lib_df['album_artist'])
+		(album_name_ids,), self.album_names = intern(mus_lib_df['album'])
+		self.track_album_name = album_name_ids
+
+		# an album is an (album artist, album name) pair, there are several albums titled exactly the same
+		pairs = album_artist_ids.astype(np.int64) * len(self.album_names) + album_name_ids
+		album_ids, album_pairs = pd.factorize(pairs, sort=True)
+		self.track_album = album_ids.astype(np.int32)
+		self.album_artist = (album_pairs // max(len(self.album_names), 1)).astype(np.int32)
+		self.album_name = (album_pairs % max(len(self.album_names), 1)).astype(np.int32)
+
+		# titles are nearly all different, only their order is worth keeping
+		(self.track_title,), titles = intern(mus_lib_df['title'])
+		self.n_titles = len(titles)
+		self.time_secs = library_time_secs(mus_lib_df)
+
+	def __len__(self):
+		return len(self.track_album)
+
+	def positions(self, match_indices: np.ndarray) -> np.ndarray:
+		# library index labels -> rows, -1 for labels not in the library
+		return self.index.get_indexer(np.asarray(match_indices, dtype=np.int64))
+
+	def track_order(self, rows: np.ndarray, by: np.ndarray = None) -> np.ndarray:
+		# the order track_stats writes rows in, artist, album then title. stable, so same named tracks keep library
+		# order. by is an extra leading key
+		keys = [self.track_artist[rows], self.track_album_name[rows], self.track_title[rows]]
+		sizes = [len(self.artists), len(self.album_names), self.n_titles]
+
+		if by is not None:
+			keys.insert(0, by)
+			sizes.insert(0, int(by.max()) + 1 if len(by) else 1)
+
+		# packed into one int64 when the ids fit, one stable sort instead of a pass per key
+		if sum(size.bit_length() for size in sizes) > 62:
+			return np.lexsort(keys[::-1])
+
+		packed = np.zeros(len(rows), dtype=np.int64)
+
+		for key, size in zip(keys, sizes):
+			packed = packed * size + key
+
+		return np.argsort(packed, kind='stable')
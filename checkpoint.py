@@ -0,0 +1,84 @@
+import json
+import os
+import pathlib
+import time
+from typing import Dict, List, Optional, Tuple
+
+TrackKey = Tuple[str, str, str]
+
+# seconds between checkpoints while tracks are being resolved, the last one always gets written
+CHECKPOINT_INTERVAL = 10.0
+
+# resolutions hold the lost and found filepath for a track or None when it went on the ignore list
+IGNORED_TRACK = None
+
+
+class Checkpoint:
+	# the hand-made part of a run: how unmatched tracks got resolved and which logs were already written. scrobbles
+	# don't need to be in here, every fetched page lands in the scrobble store together with how far back the
+	# unfinished sync got, and the next sync only fetches what is older than that, --resume or not. folder
+	# corrections go straight to the correction store
+
+	def __init__(self, path: pathlib.Path, run: Dict):
+		self.path = pathlib.Path(path)
+		self.run = run
+		self.resolutions: Dict[TrackKey, Optional[str]] = {}
+		self.logs_written: List[str] = []
+		self.saved = time.monotonic()
+		self.finished = False
+
+	@classmethod
+	def resume(cls, path: pathlib.Path, run: Dict) -> 'Checkpoint':
+		# picks up the saved state when it belongs to the same run (user, range, library), starts over otherwise
+		checkpoint = cls(path, run)
+
+		if not checkpoint.path.exists():
+			print('no checkpoint at', checkpoint.path, 'to resume from, starting over')
+			return checkpoint
+
+		with checkpoint.path.open(mode='r', encoding='utf-8') as f:
+			state = json.load(f)
+
+		if state['run'] != run:
+			print('the checkpoint at', checkpoint.path, 'is for a different run, starting over')
+			return checkpoint
+
+		checkpoint.resolutions = {tuple(key): filepath for key, filepath in state['resolutions']}
+		checkpoint.logs_written = state['logs_written']
+		print('resuming with', len(checkpoint.resolutions), 'tracks already resolved')
+		return checkpoint
+
+	def resolve(self, key: TrackKey, filepath: Optional[str]):
+		self.resolutions[key] = filepath
+		self.save(force=False)
+
+	def log_written(self, log_name: str):
+		self.logs_written.append(log_name)
+		self.save()
+
+	def save(self, force: bool = True):
+		if self.finished or not force and time.monotonic() - self.saved < CHECKPOINT_INTERVAL:
+			return
+
+		state = {
+			'run': self.run,
+			'resolutions': [[list(key), filepath] for key, filepath in self.resolutions.items()],
+			'logs_written': self.logs_written,
+		}
+
+		# written next to the real file and swapped in, a crash mid-write leaves the previous checkpoint intact
+		self.path.parent.mkdir(parents=True, exist_ok=True)
+		tmp_file = self.path.with_name(self.path.name + '.tmp')
+
+		with tmp_file.open(mode='w', encoding='utf-8') as f:
+			json.dump(state, f)
+
+		os.replace(tmp_file, self.path)
+		self.saved = time.monotonic()
+
+	def clear(self):
+		# the run finished, nothing left to resume
+		self.finished = True
+
+		if self.path.exists():
+			self.path.unlink()
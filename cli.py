@@ -0,0 +1,258 @@
+import argparse
+import pathlib
+import sys
+from typing import List
+
+from instrumentation import PROFILERS, Profile, RunReport
+from periods import CUBE_KINDS, PERIOD_KINDS, RANK_BY
+from tag_reader import TAG_READERS
+
+# the command line. nothing imported up here pulls in numpy, pandas, tkinter, pylast or the api key, every mode
+# imports what it needs once it has been picked so --help and the small modes start right away. options whose
+# defaults live in those modules default to None here and get filled in by pipeline.run
+
+
+def positive_int(value: str) -> int:
+	number = int(value)
+
+	if number <= 0:
+		raise argparse.ArgumentTypeError(''.join([value, ' is not a positive whole number']))
+
+	return number
+
+
+def build_parser() -> argparse.ArgumentParser:
+	parser = argparse.ArgumentParser(
+		description='''Bedevere's scrobble data requester, here's how to use it.''',
+		epilog='''Example: '''
+	)
+	parser.add_argument('-date-range', '-dr',
+	                    type=str, nargs='+', metavar='D',
+	                    help='''Provide a date or date range to track in YYYY[-MM][-DD][_hh][-mm][-ss] format. The range
+	                    is inclusive and accounts for limited information.''')
+	parser.add_argument('-library-dir',
+	                    type=str, metavar='d', default=r'A:\music\M',
+	                    help='The location of your music library on your machine.')
+	parser.add_argument('-library-log',
+	                    type=str, metavar='F', default=r'main-config\music_library.feather',
+	                    help='''The file where you want to store your music library information. The format follows the
+	                    extension: .feather, .parquet or .csv. An old .csv log next to it gets migrated automatically.''')
+	parser.add_argument('-migrate-library-log',
+	                    type=str, metavar='F', default=None,
+	                    help='Convert an existing library log (e.g. the old music_library.csv) into -library-log and exit.')
+	parser.add_argument('-export-library-csv',
+	                    type=str, metavar='F', default=None,
+	                    help='Write the library log out as a tab separated csv file and exit.')
+	parser.add_argument('--rebuild-library-log',
+	                    action='store_true',
+	                    help="Add this flag to manually rebuild the library log and exit afterward."
+	                    )
+	parser.add_argument('--skip-library-scan',
+	                    action='store_true',
+	                    help="Use the library log as-is instead of checking the library for new or changed files.")
+	parser.add_argument('-index-workers',
+	                    type=int, metavar='N', default=None,
+	                    help='Number of processes used to read tags while indexing the library.')
+	parser.add_argument('-tag-reader',
+	                    type=str, choices=TAG_READERS, default='fast',
+	                    help='fast only reads the tag frames the library log uses, eyed3 loads the whole file.')
+	parser.add_argument('-lost-and-found-log',
+	                    type=str, metavar='F', default=r'A:\pyprojects\music\lastfm_stats\main-config\lost_and_found_log.csv',
+	                    help='Where to store tracks in your library that are not automatically found from scrobble data')
+	parser.add_argument('-ignore-list',
+	                    type=str, metavar='F', default=r'main-config\ignore_list.csv',
+	                    help='''The location of an ignore list file, which can automatically ignore files not in your 
+	                    local library''')
+	parser.add_argument('--clean-logs',
+	                    action='store_true',
+	                    help="Enable to remove duplicate lines in the log csvs, this currently causes problems with the"
+	                         "logic, I should find a way to fix that of course."
+	                    )
+	parser.add_argument('-scrobble-db',
+	                    type=str, metavar='F', default=r'main-config\scrobbles.sqlite',
+	                    help='Local copy of your scrobble history, only scrobbles it does not have yet get fetched.')
+	parser.add_argument('--offline',
+	                    action='store_true',
+	                    help='Build the report from the local scrobble history without contacting Last.fm.')
+	parser.add_argument('-api-root',
+	                    type=str, metavar='URL', default=None,
+	                    help='Last.fm API endpoint, point it at a local stand-in for testing.')
+	parser.add_argument('-fetch-workers',
+	                    type=int, metavar='N', default=4,
+	                    help='Scrobble pages fetched at once, still held to the API rate limit.')
+	parser.add_argument('-http-cache',
+	                    type=str, metavar='F', default=r'main-config\http_cache.sqlite',
+	                    help='On-disk cache of Last.fm API responses.')
+	parser.add_argument('-http-cache-size',
+	                    type=float, metavar='MB', default=None,
+	                    help='Size cap for the response cache, least recently used responses go first.')
+	parser.add_argument('--no-http-cache',
+	                    action='store_true',
+	                    help='Always ask Last.fm instead of using cached responses.')
+	parser.add_argument('--batch',
+	                    action='store_true',
+	                    help='''Never prompt. Unmatched tracks with a confident library match get accepted, the rest go to
+	                    the review file for -resolve-review.''')
+	parser.add_argument('-confidence',
+	                    type=float, metavar='X', default=None,
+	                    help='Lowest candidate score (0-1) that --batch accepts without review.')
+	parser.add_argument('-review-file',
+	                    type=str, metavar='F', default=r'main-config\review.csv',
+	                    help='''Where --batch queues unmatched tracks and their candidates. Put y in the decision column of
+	                    the right candidate, or ignore on any row of a track to add it to the ignore list.''')
+	parser.add_argument('-resolve-review',
+	                    type=str, metavar='F', default=None,
+	                    help='Apply the decisions in a review file to the lost and found log and ignore list and exit.')
+	parser.add_argument('-periods',
+	                    type=str, nargs='+', choices=PERIOD_KINDS, default=None,
+	                    help='''Also write a report for every month, quarter and/or year in the date range, each in its
+	                    own folder next to the whole range reports. Scrobbles are fetched and matched only once.''')
+	parser.add_argument('--timeseries',
+	                    action='store_true',
+	                    help='''Also write listening over time to a timeseries folder next to the reports: plays per day
+	                    and hour, plays per weekday and hour, the top artists over rolling windows ending on every day
+	                    and the first and last listen of every track.''')
+	parser.add_argument('-rolling-windows',
+	                    type=positive_int, nargs='+', metavar='D', default=None,
+	                    help='Window lengths in days for the rolling top artists of --timeseries, 7 and 30 by default.')
+	parser.add_argument('-rolling-top',
+	                    type=positive_int, metavar='N', default=None,
+	                    help='Artists kept per day and window in the rolling top artists of --timeseries, 10 by default.')
+	parser.add_argument('-krobble-schemes',
+	                    type=str, nargs='*', metavar='S', default=None,
+	                    help='''How scrobbles get weighted into krobbles, the weights of every scheme given are multiplied.
+	                    duration: track length over -krobble-reference. recency: halves every -krobble-half-life days
+	                    before the end of the range. session: a track counts at most -krobble-session-cap times per
+	                    listening session. Give no schemes for plain scrobble counts, duration alone is the default.''')
+	parser.add_argument('-krobble-reference',
+	                    type=float, metavar='S', default=None,
+	                    help='Track length in seconds that counts as exactly one krobble.')
+	parser.add_argument('-krobble-half-life',
+	                    type=float, metavar='D', default=None,
+	                    help='Days for the recency weight to halve.')
+	parser.add_argument('-krobble-session-gap',
+	                    type=float, metavar='M', default=None,
+	                    help='Minutes without a scrobble that end a listening session.')
+	parser.add_argument('-krobble-session-cap',
+	                    type=int, metavar='N', default=None,
+	                    help='Plays of one track per listening session that count toward krobbles.')
+	parser.add_argument('-corrections-file',
+	                    type=str, metavar='F', default=r'main-config\corrections.json',
+	                    help='''Artist, album and track folders picked for misspelled Last.fm names, remembered between
+	                    runs.''')
+	parser.add_argument('-state-file',
+	                    type=str, metavar='F', default=r'main-config\run_state.json',
+	                    help='''Where the run keeps a checkpoint of resolved tracks and written logs.
+	                    It goes away once a run finishes.''')
+	parser.add_argument('--resume',
+	                    action='store_true',
+	                    help='''Pick up an interrupted run (same user, range and library log) from its checkpoint instead
+	                    of resolving every unmatched track again.''')
+	parser.add_argument('-cube-dir',
+	                    type=str, metavar='d', default=r'main-config\cubes',
+	                    help='''Where every report run keeps per user daily totals of the tracks it matched, what -top and
+	                    -rank-change answer from.''')
+	parser.add_argument('--no-cube',
+	                    action='store_true',
+	                    help='Leave the cube alone on this run.')
+	parser.add_argument('-top',
+	                    type=str, choices=CUBE_KINDS, default=None,
+	                    help='''Print the top -top-n tracks, albums or artists over -date-range from the cube and exit,
+	                    without fetching or matching anything. Only days a report run has covered are counted.''')
+	parser.add_argument('-rank-change',
+	                    type=str, choices=CUBE_KINDS, default=None,
+	                    help='''Like -top, with where each one ranked over -compare-range and how many places it
+	                    moved.''')
+	parser.add_argument('-compare-range',
+	                    type=str, nargs='+', metavar='D', default=None,
+	                    help='The earlier date range for -rank-change, written the same way as -date-range.')
+	parser.add_argument('-top-n',
+	                    type=positive_int, metavar='N', default=50,
+	                    help='Rows printed by -top and -rank-change.')
+	parser.add_argument('-rank-by',
+	                    type=str, choices=RANK_BY, default='play_count',
+	                    help='What -top and -rank-change rank by.')
+	parser.add_argument('-username',
+	                    type=str, default=None,
+	                    help='The LastFM username to report on, the first line of USER_INFO.txt by default.')
+	parser.add_argument('-users',
+	                    type=str, nargs='+', metavar='U', default=None,
+	                    help='''Report on several users over -date-range at once. The library is indexed once and shared
+	                    by every worker, unmatched tracks are handled like --batch and every user gets their own
+	                    output directory with its own review file.''')
+	parser.add_argument('-users-file',
+	                    type=str, metavar='F', default=None,
+	                    help='''Like -users, from a tab separated file with a username and a date_range column, the date
+	                    range written the same way as -date-range (e.g. 2021-01 2021-06).''')
+	parser.add_argument('-processes',
+	                    type=int, metavar='N', default=None,
+	                    help='Worker processes for -users and -users-file, one per core by default.')
+	parser.add_argument('-profile',
+	                    type=str, choices=PROFILERS, default=None,
+	                    help='''Profile the whole run and write the profile next to the reports. Every run writes
+	                    run_report.json there with the time, cpu and peak memory of each stage either way.''')
+
+	return parser
+
+
+def main(argv: List[str] = None) -> int:
+	parser = build_parser()
+	args = parser.parse_args(argv)
+	library_file = pathlib.Path(args.library_log)
+
+	if args.migrate_library_log:
+		from storage import migrate_library_log
+		migrate_library_log(pathlib.Path(args.migrate_library_log), library_file)
+		print('migrated', args.migrate_library_log, 'to', library_file)
+		return 0
+
+	if args.resolve_review:
+		from corrections import CorrectionStore
+		from resolution import apply_review
+		found, ignored, undecided = apply_review(pathlib.Path(args.resolve_review),
+		                                         pathlib.Path(args.lost_and_found_log),
+		                                         pathlib.Path(args.ignore_list),
+		                                         CorrectionStore(pathlib.Path(args.corrections_file)))
+		print(found, 'tracks added to the lost and found log,', ignored, 'to the ignore list,', undecided,
+		      'still undecided')
+		return 0
+
+	if args.export_library_csv:
+		from storage import migrate_library_log
+		migrate_library_log(library_file, pathlib.Path(args.export_library_csv))
+		print('exported', library_file, 'to', args.export_library_csv)
+		return 0
+
+	if args.top or args.rank_change:
+		if not args.date_range:
+			parser.error('-top and -rank-change need a -date-range')
+
+		if args.rank_change and not args.compare_range:
+			parser.error('-rank-change needs a -compare-range to compare against')
+
+		from credentials import default_username
+		from cube import AggregateCube, cube_file_for, query_days, rank_change, top
+		from dates import datetime_range
+
+		username = args.username or default_username()
+		cube = AggregateCube.load(cube_file_for(pathlib.Path(args.cube_dir), username), username)
+		days = query_days(*datetime_range(args.date_range))
+
+		if not cube.covers(*days):
+			print('the cube does not cover the whole range, run a report over it first', file=sys.stderr)
+
+		if args.top:
+			result_df = top(cube, args.top, *days, args.top_n, args.rank_by)
+		else:
+			result_df = rank_change(cube, args.rank_change, days, query_days(*datetime_range(args.compare_range)),
+			                        args.top_n, args.rank_by)
+
+		result_df.to_csv(sys.stdout, sep='\t', index=False)
+		return 0
+
+	# started before the pipeline import so a profile covers that too
+	run_report = RunReport(vars(args))
+	profile = Profile(args.profile) if args.profile else None
+
+	import pipeline
+	return pipeline.run(args, run_report, profile)
@@ -0,0 +1,81 @@
+import json
+import os
+import pathlib
+from typing import Dict, Optional, Sequence, Tuple
+
+from fuzzy_index import normalize
+
+TrackKey = Tuple[str, str, str]
+
+# albums are only looked up inside their artist folder and titles inside their album folder, the same album name
+# under two artists can point to two different folders
+KINDS = ('artists', 'albums', 'titles')
+delim_context = '\t'
+
+
+class CorrectionStore:
+	# last.fm name -> library folder (or file) picked for it in an earlier run. names are compared after normalize, so
+	# a correction made once covers every case and accent variant of the name
+
+	def __init__(self, path: pathlib.Path):
+		self.path = pathlib.Path(path)
+		self.corrections: Dict[str, Dict[str, str]] = {kind: {} for kind in KINDS}
+
+		if self.path.exists():
+			with self.path.open(mode='r', encoding='utf-8') as f:
+				self.corrections.update(json.load(f))
+
+	def __len__(self):
+		return sum(len(x) for x in self.corrections.values())
+
+	@staticmethod
+	def _key(*context: str) -> str:
+		*folders, name = context
+		return delim_context.join(folders + [normalize(name)])
+
+	def artist_folder(self, artist: str) -> Optional[str]:
+		return self.corrections['artists'].get(self._key(artist))
+
+	def album_folder(self, artist_folder: str, album: str) -> Optional[str]:
+		return self.corrections['albums'].get(self._key(artist_folder, album))
+
+	def track_file(self, artist_folder: str, album_folder: str, title: str) -> Optional[str]:
+		return self.corrections['titles'].get(self._key(artist_folder, album_folder, title))
+
+	def track_path(self, library_dir: pathlib.Path, key: TrackKey) -> Optional[pathlib.Path]:
+		# the whole way down from memory, None as soon as one level is missing
+		artist, album, title = key
+
+		if (artist_folder := self.artist_folder(artist)) is None:
+			return None
+
+		if (album_folder := self.album_folder(artist_folder, album)) is None:
+			return None
+
+		if (track_file := self.track_file(artist_folder, album_folder, title)) is None:
+			return None
+
+		return library_dir.joinpath(artist_folder, album_folder, track_file)
+
+	def learn(self, key: TrackKey, track_parts: Sequence[str], save: bool = True):
+		# track_parts is (artist folder, album folder, file name) of the file the track turned out to be. runs that
+		# learn a lot at once pass save=False and save once at the end
+		artist, album, title = key
+		artist_folder, album_folder, track_file = track_parts[-3:]
+
+		self.corrections['artists'][self._key(artist)] = artist_folder
+		self.corrections['albums'][self._key(artist_folder, album)] = album_folder
+		self.corrections['titles'][self._key(artist_folder, album_folder, title)] = track_file
+
+		if save:
+			self.save()
+
+	def save(self):
+		# written next to the real file and swapped in, a crash mid-write leaves the old corrections intact
+		self.path.parent.mkdir(parents=True, exist_ok=True)
+		tmp_file = self.path.with_name(self.path.name + '.tmp')
+
+		with tmp_file.open(mode='w', encoding='utf-8') as f:
+			json.dump(self.corrections, f, ensure_ascii=False)
+
+		os.replace(tmp_file, self.path)
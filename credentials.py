@@ -0,0 +1,29 @@
+import functools
+import pathlib
+from typing import Tuple
+
+# LASTFM API AND SESSION SETUP
+# nothing here gets read on import, the key file is only opened the first time something talks to last.fm, so --help,
+# --offline and the library modes run without one
+API_KEY_FILE = pathlib.Path(r'KEY_FILE.txt')
+API_AUTH_URL = r'http://www.last.fm/api/auth'
+
+USER_INFO = pathlib.Path(r'USER_INFO.txt')  # two line file containing username & password
+
+
+@functools.lru_cache(maxsize=None)
+def api_credentials() -> Tuple[str, str]:
+	# (api key, api secret)
+	with API_KEY_FILE.open(mode='r', encoding='utf-8') as f:
+		user_info_gen = (row for row in f)
+		return next(user_info_gen).strip(), next(user_info_gen).strip()
+
+
+def api_key() -> str:
+	return api_credentials()[0]
+
+
+def default_username() -> str:
+	with USER_INFO.open(mode='r', encoding='utf-8') as f:
+		return next(row for row in f).strip()
+
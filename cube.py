@@ -0,0 +1,259 @@
+import datetime as dt
+import json
+import os
+import pathlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from aggregate import library_time_secs
+from dates import LOCAL_TIMEZONE_NAME, local_buckets
+from periods import CUBE_KINDS, RANK_BY
+from scrobble_store import ScrobbleStore
+
+# daily partials of every track a user played, (track, local day) -> plays and seconds, kept sorted by track then day
+# with running totals over the whole array. a track's totals over any range of days are the running totals at the two
+# ends of its stretch of the array, so a query costs two searchsorted calls per track and never touches a scrobble
+
+# track and day packed into one sortable key, days since 1970 fit in 20 bits until the year 4840
+DAY_BITS = 20
+
+# what a report row is keyed by, the same as track_stats, album_stats and artist_stats
+GROUP_COLUMNS = {
+	'tracks': ['artist', 'album', 'title'],
+	'albums': ['album_artist', 'album'],
+	'artists': ['artist'],
+}
+TRACK_COLUMNS = ['filepath', 'artist', 'album_artist', 'album', 'title']
+
+
+def day_number(d: dt.date) -> int:
+	return (d - dt.date(1970, 1, 1)).days
+
+
+def _uncovered(timestamps: np.ndarray, coverage: List[List[int]]) -> np.ndarray:
+	# mask of the timestamps outside every covered [from, to] interval, the intervals never overlap
+	if not coverage:
+		return np.ones(len(timestamps), dtype=bool)
+
+	starts = np.array([c[0] for c in coverage], dtype=np.int64)
+	ends = np.array([c[1] for c in coverage], dtype=np.int64)
+	interval = np.searchsorted(starts, timestamps, side='right') - 1
+	inside = interval >= 0
+	inside[inside] = timestamps[inside] <= ends[interval[inside]]
+	return ~inside
+
+
+def _merge_coverage(coverage: List[List[int]], time_from: int, time_to: int) -> List[List[int]]:
+	merged = []
+
+	for start, end in sorted(coverage + [[time_from, time_to]]):
+		if merged and start <= merged[-1][1] + 1:
+			merged[-1][1] = max(merged[-1][1], end)
+		else:
+			merged.append([start, end])
+
+	return merged
+
+
+def synced_range(store: ScrobbleStore, username: str, time_from: int, time_to: int) -> Optional[Tuple[int, int]]:
+	# the part of [time_from, time_to] the scrobble store has synced, None when it doesn't reach back to time_from.
+	# whatever lies past it, the rest of today or an offline run on a stale store, stays out of the cube's coverage so a
+	# later run still adds the plays that show up there
+	coverage = store.coverage(username)
+
+	if coverage is None:
+		return None
+
+	time_to = min(time_to, coverage[1])
+	return (time_from, time_to) if time_from <= time_to and store.covers(username, time_from, time_to) else None
+
+
+class AggregateCube:
+	# one per user, a report run adds the scrobbles it matched for whatever part of its range the cube hasn't seen yet.
+	# a track matched differently later on keeps the plays it was first counted under. scrobbles of a covered range
+	# nothing matched yet are kept as pending by timestamp (unique per user in the scrobble store), a later run that
+	# matches them, say after -resolve-review, still adds them
+
+	def __init__(self, path: pathlib.Path, username: str, timezone_name: str = LOCAL_TIMEZONE_NAME):
+		self.path = pathlib.Path(path)
+		self.username = username
+		self.timezone_name = timezone_name
+		self.coverage: List[List[int]] = []
+		self.tracks = pd.DataFrame(columns=TRACK_COLUMNS)
+		self.keys = np.empty(0, dtype=np.int64)
+		self.plays_prefix = np.zeros(1, dtype=np.int64)
+		self.seconds_prefix = np.zeros(1, dtype=np.float64)
+		self.pending = np.empty(0, dtype=np.int64)
+		# kind -> (group of every cube track, the groups' names), see groups()
+		self._groups: Dict[str, Tuple[np.ndarray, pd.DataFrame]] = {}
+
+	def __len__(self):
+		return len(self.keys)
+
+	@classmethod
+	def load(cls, path: pathlib.Path, username: str) -> 'AggregateCube':
+		# an empty cube when there is none yet, a cube of another user is an error rather than something to add to
+		cube = cls(path, username)
+
+		if not cube.path.exists():
+			return cube
+
+		with np.load(cube.path) as arrays:
+			meta = json.loads(arrays['meta'].tobytes().decode('utf-8'))
+
+			if meta['username'] != username:
+				raise ValueError(''.join(['the cube at ', str(cube.path), ' belongs to ', meta['username'], ', not ',
+				                          username]))
+
+			cube.keys = arrays['keys']
+			cube.plays_prefix = arrays['plays_prefix']
+			cube.seconds_prefix = arrays['seconds_prefix']
+
+			if 'pending' in arrays.files:
+				cube.pending = arrays['pending']
+
+		cube.timezone_name = meta['timezone']
+		cube.coverage = meta['coverage']
+		cube.tracks = pd.DataFrame(meta['tracks'], columns=TRACK_COLUMNS)
+		return cube
+
+	def save(self):
+		meta = {'username': self.username, 'timezone': self.timezone_name, 'coverage': self.coverage,
+		        'tracks': {column: self.tracks[column].tolist() for column in TRACK_COLUMNS}}
+
+		# np.savez adds .npz to a name without it, the tmp name keeps the suffix so the replace finds the file
+		self.path.parent.mkdir(parents=True, exist_ok=True)
+		tmp_file = self.path.with_name(self.path.stem + '.tmp.npz')
+		np.savez(tmp_file, keys=self.keys, plays_prefix=self.plays_prefix, seconds_prefix=self.seconds_prefix,
+		         pending=self.pending, meta=np.frombuffer(json.dumps(meta, ensure_ascii=False).encode('utf-8'), dtype=np.uint8))
+		os.replace(tmp_file, self.path)
+
+	def _unseen(self, timestamps: np.ndarray, time_from: int, time_to: int) -> np.ndarray:
+		# mask of the timestamps in [time_from, time_to] that aren't counted yet, uncovered or pending
+		in_range = (time_from <= timestamps) & (timestamps <= time_to)
+		return in_range & (_uncovered(timestamps, self.coverage) | np.isin(timestamps, self.pending))
+
+	def add(self, mus_lib_df: pd.DataFrame, match_indices: np.ndarray, timestamps: np.ndarray, time_from: int,
+	        time_to: int, unmatched_timestamps: np.ndarray = None) -> int:
+		# folds in the matched scrobbles of [time_from, time_to] the cube doesn't count yet, returns how many.
+		# unmatched_timestamps are the range's scrobbles left without a library row, they become pending
+		positions = mus_lib_df.index.get_indexer(np.asarray(match_indices, dtype=np.int64))
+		timestamps = np.asarray(timestamps, dtype=np.int64)
+		new = (positions >= 0) & self._unseen(timestamps, time_from, time_to)
+		positions, timestamps = positions[new], timestamps[new]
+
+		# pending ones of the range are either added now or in unmatched_timestamps again
+		unmatched = np.asarray([] if unmatched_timestamps is None else unmatched_timestamps, dtype=np.int64)
+		unmatched = unmatched[self._unseen(unmatched, time_from, time_to)]
+		outside = (self.pending < time_from) | (self.pending > time_to)
+		self.pending = np.union1d(self.pending[outside], unmatched)
+
+		# library rows -> cube tracks by filepath, the library log gets renumbered when it is rebuilt
+		rows, row_of_scrobble = np.unique(positions, return_inverse=True)
+		played_df = mus_lib_df.iloc[rows][TRACK_COLUMNS].reset_index(drop=True)
+		track_ids = dict(zip(self.tracks['filepath'], range(len(self.tracks))))
+		cube_tracks = np.array([track_ids.setdefault(filepath, len(track_ids)) for filepath in played_df['filepath']],
+		                       dtype=np.int64)
+
+		# tags may have been fixed since, the latest library log wins
+		tracks = self.tracks.reindex(range(len(track_ids)))
+		tracks.iloc[cube_tracks] = played_df.values
+		self.tracks = tracks
+		self._groups.clear()
+
+		keys = (cube_tracks[row_of_scrobble] << DAY_BITS) | local_buckets(timestamps, 'day', self.timezone_name)
+		seconds = library_time_secs(mus_lib_df)[positions]
+
+		all_keys, inverse = np.unique(np.concatenate([self.keys, keys]), return_inverse=True)
+		plays = np.bincount(inverse, weights=np.concatenate([np.diff(self.plays_prefix), np.ones(len(keys))]),
+		                    minlength=len(all_keys))
+		seconds = np.bincount(inverse, weights=np.concatenate([np.diff(self.seconds_prefix), seconds]),
+		                      minlength=len(all_keys))
+
+		self.keys = all_keys
+		self.plays_prefix = np.concatenate([[0], np.cumsum(plays)]).astype(np.int64)
+		self.seconds_prefix = np.concatenate([[0.0], np.cumsum(seconds)])
+		self.coverage = _merge_coverage(self.coverage, int(time_from), int(time_to))
+		return len(timestamps)
+
+	def covers(self, first_day: int, last_day: int) -> bool:
+		# whether every local day of the range is covered, the first and last day only as far as they were reported
+		return any(start <= first_day and last_day <= end for start, end in self.day_coverage())
+
+	def day_coverage(self) -> List[Tuple[int, int]]:
+		if not self.coverage:
+			return []
+
+		days = local_buckets(np.array(self.coverage, dtype=np.int64).ravel(), 'day', self.timezone_name)
+		return list(zip(days[::2].tolist(), days[1::2].tolist()))
+
+	def track_totals(self, first_day: int, last_day: int) -> Tuple[np.ndarray, np.ndarray]:
+		# (plays, seconds) of every cube track over [first_day, last_day], both ends inclusive
+		track_keys = np.arange(len(self.tracks), dtype=np.int64) << DAY_BITS
+		lo = np.searchsorted(self.keys, track_keys + first_day, side='left')
+		hi = np.searchsorted(self.keys, track_keys + last_day, side='right')
+		return self.plays_prefix[hi] - self.plays_prefix[lo], self.seconds_prefix[hi] - self.seconds_prefix[lo]
+
+	def groups(self, kind: str) -> Tuple[np.ndarray, pd.DataFrame]:
+		if kind not in GROUP_COLUMNS:
+			raise ValueError(''.join(['unknown kind ', kind, ', pick from ', ', '.join(CUBE_KINDS)]))
+
+		if kind not in self._groups:
+			grouped = self.tracks.groupby(GROUP_COLUMNS[kind], sort=False, dropna=False, observed=True)
+			self._groups[kind] = (grouped.ngroup().to_numpy(), grouped.size().reset_index()[GROUP_COLUMNS[kind]])
+
+		return self._groups[kind]
+
+	def totals(self, kind: str, first_day: int, last_day: int) -> pd.DataFrame:
+		# play_count and time_played per track, album or artist over the range, only the ones played in it
+		plays, seconds = self.track_totals(first_day, last_day)
+		codes, groups = self.groups(kind)
+		totals_df = groups.copy()
+		totals_df['play_count'] = np.bincount(codes, weights=plays, minlength=len(groups)).astype(np.int64)
+		# the difference of two running totals picks up float noise, a millisecond is plenty for track lengths
+		totals_df['time_played'] = np.bincount(codes, weights=seconds, minlength=len(groups)).round(3)
+		return totals_df.loc[totals_df['play_count'] > 0].rename(columns={'album_artist': 'artist'})
+
+
+def ranked(totals_df: pd.DataFrame, rank_by: str) -> pd.DataFrame:
+	# rank 1 is the most played, ties go in name order
+	if rank_by not in RANK_BY:
+		raise ValueError(''.join(['unknown rank_by ', rank_by, ', pick from ', ', '.join(RANK_BY)]))
+
+	names = [c for c in totals_df.columns if c not in RANK_BY]
+	ranked_df = totals_df.sort_values([rank_by] + names, ascending=[False] + [True] * len(names), kind='mergesort')
+	ranked_df = ranked_df.reset_index(drop=True)
+	ranked_df.insert(0, 'rank', np.arange(1, len(ranked_df) + 1))
+	return ranked_df
+
+
+def top(cube: AggregateCube, kind: str, first_day: int, last_day: int, n: int,
+        rank_by: str = 'play_count') -> pd.DataFrame:
+	return ranked(cube.totals(kind, first_day, last_day), rank_by).head(n)
+
+
+def rank_change(cube: AggregateCube, kind: str, days: Tuple[int, int], earlier_days: Tuple[int, int], n: int,
+                rank_by: str = 'play_count') -> pd.DataFrame:
+	# the top n of days next to where each one stood over earlier_days. movement is how many places it climbed,
+	# empty for ones not played at all back then
+	now_df = ranked(cube.totals(kind, *days), rank_by).head(n)
+	before_df = ranked(cube.totals(kind, *earlier_days), rank_by)
+	names = [c for c in now_df.columns if c not in RANK_BY and c != 'rank']
+
+	before_df = before_df[names + ['rank', rank_by]].rename(columns={'rank': 'earlier_rank',
+	                                                                  rank_by: 'earlier_' + rank_by})
+	change_df = now_df.merge(before_df, on=names, how='left')
+	change_df['earlier_rank'] = change_df['earlier_rank'].astype('Int64')
+	change_df['movement'] = change_df['earlier_rank'] - change_df['rank']
+	return change_df
+
+
+def cube_file_for(cube_dir: pathlib.Path, username: str) -> pathlib.Path:
+	return pathlib.Path(cube_dir).joinpath(username + '.npz')
+
+
+def query_days(start: dt.datetime, end: dt.datetime) -> Tuple[int, int]:
+	# the cube only knows whole local days, a range given to the hour covers the days it touches
+	return day_number(start.date()), day_number(end.date())
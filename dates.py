@@ -0,0 +1,161 @@
+import calendar
+import datetime as dt
+import re
+import zoneinfo
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Destination (preferred) datetime formatting strings
+# Destination is YYYY-MM-dd_hh_mm, 24 hour clock
+# %Y    Year with century as a decimal number
+# %m    Month as a zero-padded decimal number
+# %d    Day of the month as a decimal number [01,31]
+# %H    Hour (24-hour clock) as a zero-padded decimal number
+# %M    Minute as a decimal number [00,59]
+# %S    Second as a zero-padded decimal number [00,59]
+dt_fmt = r'%Y-%m-%d_%H-%M'
+
+LOCAL_TIMEZONE_NAME = 'America/Chicago'
+LOCAL_TIMEZONE = zoneinfo.ZoneInfo(LOCAL_TIMEZONE_NAME)
+
+# local time buckets a scrobble can be put in. hour and weekday repeat (0-23, 0-6 from monday), day, week and month
+# codes are counted from 1970-01-01 so they sort in time order: day is the local date as a day number, week is the
+# day number of the monday it starts on and month is months since 1970-01
+BUCKETS = ('hour', 'weekday', 'day', 'week', 'month')
+WEEKDAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+SECS_PER_DAY = 86400
+
+
+def convert_local_datetime_to_unix_timestamp(d: dt.datetime) -> int:
+	# a naive datetime is wall clock time in LOCAL_TIMEZONE_NAME, not in whatever zone the machine is set to. zoneinfo
+	# picks the offset in force on that date, a wall time that happens twice when dst ends means the first one
+	if d.tzinfo is None:
+		d = d.replace(tzinfo=LOCAL_TIMEZONE)
+
+	return int(d.timestamp())
+
+
+def convert_timestamp_to_local_datetime(t: int) -> dt.datetime:
+	return dt.datetime.fromtimestamp(t, LOCAL_TIMEZONE)
+
+
+def replace_with_last_day_of_month(d: dt.datetime) -> dt.datetime:
+	return d.replace(day=calendar.monthrange(d.year, d.month)[1])
+
+
+def local_wall_seconds(timestamps: np.ndarray, timezone_name: str = LOCAL_TIMEZONE_NAME) -> np.ndarray:
+	# unix timestamps -> seconds since 1970-01-01 00:00 on the local wall clock. pandas looks every timestamp up in the
+	# zone's transitions in one go, so each scrobble gets the offset that was in force when it happened
+	utc = pd.DatetimeIndex(np.asarray(timestamps, dtype=np.int64).astype('datetime64[s]'), tz='UTC')
+	local = utc.tz_convert(timezone_name).tz_localize(None)
+	return local.to_numpy().astype('datetime64[s]').astype(np.int64)
+
+
+def local_buckets(timestamps: np.ndarray, bucket: str, timezone_name: str = LOCAL_TIMEZONE_NAME) -> np.ndarray:
+	# the BUCKETS code of every timestamp, see bucket_labels for turning codes into names
+	return wall_buckets(local_wall_seconds(timestamps, timezone_name), bucket)
+
+
+def wall_buckets(wall: np.ndarray, bucket: str) -> np.ndarray:
+	# local_buckets from local_wall_seconds, for several kinds of bucket out of one timezone conversion
+	days = wall // SECS_PER_DAY
+
+	if bucket == 'hour':
+		return wall % SECS_PER_DAY // 3600
+
+	elif bucket == 'weekday':
+		# 1970-01-01 was a thursday
+		return (days + 3) % 7
+
+	elif bucket == 'day':
+		return days
+
+	elif bucket == 'week':
+		return days - (days + 3) % 7
+
+	elif bucket == 'month':
+		return wall.astype('datetime64[s]').astype('datetime64[M]').astype(np.int64)
+
+	raise ValueError(''.join(['unknown bucket ', bucket, ', pick from ', ', '.join(BUCKETS)]))
+
+
+def bucket_labels(codes: np.ndarray, bucket: str) -> List[str]:
+	# 00-23 for hours, weekday names, YYYY-MM-DD for days and weeks (the monday), YYYY-MM for months
+	codes = np.asarray(codes, dtype=np.int64)
+
+	if bucket == 'hour':
+		return [f'{code:02d}' for code in codes.tolist()]
+
+	elif bucket == 'weekday':
+		return [WEEKDAYS[code] for code in codes.tolist()]
+
+	elif bucket in ('day', 'week'):
+		return np.datetime_as_string(codes.astype('datetime64[D]')).tolist()
+
+	elif bucket == 'month':
+		return np.datetime_as_string(codes.astype('datetime64[M]')).tolist()
+
+	raise ValueError(''.join(['unknown bucket ', bucket, ', pick from ', ', '.join(BUCKETS)]))
+
+
+def datetime_range(x: List[str]) -> Tuple[dt.datetime, dt.datetime]:
+	re_cmd_input = re.compile(r'(\d{4})(-(\d{2}))?(-(\d{2}))?(_(\d{2}))?(-(\d{2}))?(-(\d{2}))?')
+
+	try:
+		start_datestring, end_datestring = x
+		y0, _, m0, _, d0, _, H0, _, M0, _, S0 = re_cmd_input.match(start_datestring).groups()
+		y0 = int(y0)
+		m0 = int(m0) if m0 else 1
+		d0 = int(d0) if d0 else 1
+		H0 = int(H0) if H0 else 0
+		M0 = int(M0) if M0 else 0
+		S0 = int(S0) if S0 else 0
+		start = dt.datetime(y0, m0, d0, H0, M0, S0)
+
+		y1, _, m1, _, d1, _, H1, _, M1, _, S1 = re_cmd_input.match(end_datestring).groups()
+		y1 = int(y1)
+		m1 = int(m1) if m1 else 12
+		# not d1
+		H1 = int(H1) if H1 else 23
+		M1 = int(M1) if M1 else 59
+		S1 = int(S1) if S1 else 59
+
+		if d1:
+			d1 = int(d1)
+			end = dt.datetime(y1, m1, d1, H1, M1, S1)
+
+		else:
+			end = replace_with_last_day_of_month(dt.datetime(y1, m1, 1, H1, M1, S1))
+
+	except ValueError as E:
+
+		try:
+			datestring = x if type(x) == str else x[0]
+			y, _, m, _, d, _, H, _, M, _, S = re_cmd_input.match(datestring).groups()
+			y = int(y)
+
+			if not m:
+				start = dt.datetime(y, 1, 1, 0, 0, 0)
+				end = dt.datetime(y, 12, 31, 23, 59, 59)
+
+			elif not d:
+				m = int(m)
+				start = dt.datetime(y, m, 1, 0, 0, 0)
+				end = replace_with_last_day_of_month(dt.datetime(y, m, 1, 23, 59, 59))
+
+			else:
+				m = int(m)
+				d = int(d)
+				start = dt.datetime(y, m, d, 0, 0, 0)
+				end = dt.datetime(y, m, d, 23, 59, 59)
+
+		except AttributeError as E:
+			raise E
+
+	except AttributeError as E:
+		raise Exception('The datestring entered does not fit the format')
+
+	return start, end
@@ -0,0 +1,95 @@
+import json
+import os
+import pathlib
+from typing import Dict, List, Optional, Tuple
+
+# directory -> (its mtime, sub directory names, file names). a directory's mtime moves whenever something in it is
+# added, removed or renamed, which is all a listing can go stale on
+Listing = Tuple[int, List[str], List[str]]
+
+# library is artist/album/track
+LIBRARY_DEPTH = 2
+
+
+def list_directory(directory: str) -> Tuple[List[str], List[str]]:
+	dirs, files = [], []
+
+	with os.scandir(directory) as entries:
+		for entry in entries:
+			(dirs if entry.is_dir() else files).append(entry.name)
+
+	return sorted(dirs), sorted(files)
+
+
+class DirectorySnapshot:
+	# every folder listing under the library in memory. the lost track search asks this instead of the drive, which
+	# on a network mount saves a round trip per listing
+
+	def __init__(self, library_dir: pathlib.Path, listings: Dict[str, Listing] = None):
+		self.library_dir = pathlib.Path(library_dir)
+		self.listings: Dict[str, Listing] = {} if listings is None else listings
+
+	def __len__(self):
+		return len(self.listings)
+
+	def add(self, directory: str, mtime_ns: int, dirs: List[str], files: List[str]):
+		self.listings[directory] = (mtime_ns, sorted(dirs), sorted(files))
+
+	def listing(self, directory: pathlib.Path) -> Optional[Tuple[List[str], List[str]]]:
+		# (sub directory names, file names), None for a directory the snapshot doesn't know about
+		entry = self.listings.get(str(directory))
+		return None if entry is None else (entry[1], entry[2])
+
+	def refresh(self) -> int:
+		# one stat per known directory, only the ones whose mtime moved get listed again. new folders get picked up on
+		# the way down, removed ones drop out. returns how many directories were listed
+		listings, relisted = {}, 0
+		pending = [(str(self.library_dir), 0)]
+
+		while pending:
+			directory, depth = pending.pop()
+
+			try:
+				mtime_ns = os.stat(directory).st_mtime_ns
+			except (FileNotFoundError, NotADirectoryError):
+				continue
+
+			old = self.listings.get(directory)
+
+			if old is not None and old[0] == mtime_ns:
+				listings[directory] = old
+			else:
+				listings[directory] = (mtime_ns, *list_directory(directory))
+				relisted += 1
+
+			if depth < LIBRARY_DEPTH:
+				pending.extend((os.path.join(directory, name), depth + 1) for name in listings[directory][1])
+
+		self.listings = listings
+		return relisted
+
+	@classmethod
+	def load(cls, library_dir: pathlib.Path, snapshot_file: pathlib.Path) -> 'DirectorySnapshot':
+		# a snapshot of some other library (or none at all) starts empty, refresh() fills it in
+		snapshot = cls(library_dir)
+
+		if snapshot_file.exists():
+			with snapshot_file.open(mode='r', encoding='utf-8') as f:
+				state = json.load(f)
+
+			if state['library_dir'] == str(snapshot.library_dir):
+				snapshot.listings = {directory: tuple(listing) for directory, listing in state['listings'].items()}
+
+		return snapshot
+
+	def save(self, snapshot_file: pathlib.Path):
+		tmp_file = snapshot_file.with_name(snapshot_file.name + '.tmp')
+
+		with tmp_file.open(mode='w', encoding='utf-8') as f:
+			json.dump({'library_dir': str(self.library_dir), 'listings': self.listings}, f, ensure_ascii=False)
+
+		os.replace(tmp_file, snapshot_file)
+
+
+def snapshot_file_for(music_library_log_file: pathlib.Path) -> pathlib.Path:
+	return music_library_log_file.with_name(music_library_log_file.stem + '.snapshot.json')
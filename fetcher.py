@@ -0,0 +1,115 @@
+import concurrent.futures
+import threading
+import time
+from typing import Callable, Iterator, List, Tuple
+
+import requests
+import requests.adapters
+
+from http_cache import ResponseCache
+from instrumentation import count
+from lastfm_api import API_ROOT_URL, LastFMError, Scrobble, get_recent_tracks_page, new_session
+
+# last.fm asks for no more than 5 requests per second averaged over 5 minutes
+API_RATE_LIMIT = 5.0
+API_BURST = 5
+
+# last.fm errors worth another try: operation failed, service offline, temporarily unavailable and rate limit exceeded.
+# anything else (bad key, unknown user, bad parameters) fails the same way every time
+TRANSIENT_ERRORS = {8, 11, 16, 29}
+
+
+class TokenBucket:
+
+	def __init__(self, rate: float = API_RATE_LIMIT, capacity: int = API_BURST):
+		self.rate = rate
+		self.capacity = capacity
+		self.tokens = float(capacity)
+		self.updated = time.monotonic()
+		self.lock = threading.Lock()
+
+	def acquire(self):
+		while True:
+			with self.lock:
+				now = time.monotonic()
+				self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+				self.updated = now
+
+				if self.tokens >= 1:
+					self.tokens -= 1
+					return
+
+				wait = (1 - self.tokens) / self.rate
+
+			time.sleep(wait)
+
+
+def pooled_session(workers: int) -> requests.Session:
+	# one keep-alive connection per worker instead of a new handshake per page
+	session = new_session()
+	adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+	session.mount('http://', adapter)
+	session.mount('https://', adapter)
+	return session
+
+
+def is_transient(E: Exception) -> bool:
+	if isinstance(E, (requests.ConnectionError, requests.Timeout)):
+		return True
+
+	if isinstance(E, requests.HTTPError):
+		return E.response is not None and E.response.status_code >= 500
+
+	return isinstance(E, LastFMError) and E.code in TRANSIENT_ERRORS
+
+
+def with_retries(f: Callable, retries: int, backoff: float):
+	for attempt in range(retries + 1):
+		try:
+			return f()
+
+		except (requests.RequestException, LastFMError) as E:
+			if attempt == retries or not is_transient(E):
+				raise
+
+			print('page request failed, retrying:', E)
+			count('api_retries')
+			time.sleep(backoff * 2 ** attempt)
+
+
+def iter_recent_tracks(session: requests.Session, api_key: str, username: str, time_from: int = None,
+                       time_to: int = None, api_root: str = API_ROOT_URL, workers: int = 4,
+                       bucket: TokenBucket = None, retries: int = 3, backoff: float = 1.0,
+                       cache: ResponseCache = None) -> Iterator[List[Scrobble]]:
+	# one list of scrobbles per page, in page order, handed over as soon as each page is in
+	bucket = TokenBucket() if bucket is None else bucket
+
+	def fetch_page(page: int) -> Tuple[List[Scrobble], int]:
+		def request():
+			# cached pages don't use up any of the rate limit
+			return get_recent_tracks_page(session, api_key, username, page, time_from, time_to, api_root,
+			                              cache=cache, throttle=bucket.acquire)
+
+		# a failed page only retries itself, the rest of the range keeps going
+		return with_retries(request, retries, backoff)
+
+	scrobbles, total_pages = fetch_page(1)
+	yield scrobbles
+
+	if total_pages > 1:
+		print('fetching', total_pages, 'pages of scrobbles')
+
+	with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+		for page, (page_scrobbles, _) in enumerate(pool.map(fetch_page, range(2, total_pages + 1)), start=2):
+			yield page_scrobbles
+
+			if page % 50 == 0 or page == total_pages:
+				print('fetched page', page, 'of', total_pages)
+
+
+def fetch_recent_tracks(session: requests.Session, api_key: str, username: str, time_from: int = None,
+                        time_to: int = None, api_root: str = API_ROOT_URL, workers: int = 4,
+                        bucket: TokenBucket = None, retries: int = 3, backoff: float = 1.0,
+                        cache: ResponseCache = None) -> List[Scrobble]:
+	return [s for page in iter_recent_tracks(session, api_key, username, time_from, time_to, api_root, workers,
+	                                         bucket, retries, backoff, cache) for s in page]
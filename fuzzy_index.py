@@ -0,0 +1,169 @@
+import difflib
+import heapq
+import os
+import pathlib
+import unicodedata
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from dir_snapshot import DirectorySnapshot
+
+# Scorer: candidates are the PREFILTER names sharing the most character trigrams with the query (dice coefficient,
+# after normalize), plus any exact normalized match. Those get ranked by difflib's SequenceMatcher.ratio(), the same
+# number difflib.get_close_matches ranks by, but taken between the normalized names so case and accents don't cost
+# anything. Ties break like get_close_matches, higher name first. A query with no trigram overlap at all (one or two
+# characters) falls back to scoring every name.
+PREFILTER = 32
+
+
+def normalize(name: str) -> str:
+	# case, accents and spacing are the usual differences between last.fm names and folder names
+	decomposed = unicodedata.normalize('NFKD', name.casefold())
+	stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+	return ' '.join(stripped.split())
+
+
+def trigrams(key: str) -> set:
+	padded = ''.join(['  ', key, ' '])
+	return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def ratio(query: str, name: str) -> float:
+	s = difflib.SequenceMatcher()
+	s.set_seq2(normalize(query))
+	s.set_seq1(normalize(name))
+	return s.ratio()
+
+
+class TrigramIndex:
+
+	def __init__(self, names: List[str]):
+		self.names = list(names)
+		self.keys = [normalize(x) for x in self.names]
+		self.exact: Dict[str, List[int]] = defaultdict(list)
+		postings: Dict[str, List[int]] = defaultdict(list)
+		gram_counts = []
+
+		for i, key in enumerate(self.keys):
+			self.exact[key].append(i)
+			grams = trigrams(key)
+			gram_counts.append(len(grams))
+
+			for gram in grams:
+				postings[gram].append(i)
+
+		self.gram_counts = np.asarray(gram_counts, dtype=np.float64)
+		self.postings = {gram: np.asarray(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+	def __len__(self):
+		return len(self.names)
+
+	def _prefilter(self, key: str) -> List[int]:
+		query_grams = trigrams(key)
+		hits = [self.postings[gram] for gram in query_grams if gram in self.postings]
+
+		if not hits:
+			return list(range(len(self.names)))
+
+		overlap = np.bincount(np.concatenate(hits), minlength=len(self.names))
+
+		# dice coefficient on trigram sets, exact normalized matches always make the cut
+		dice = 2 * overlap / (len(query_grams) + self.gram_counts)
+
+		if len(dice) > PREFILTER:
+			best = np.argpartition(dice, -PREFILTER)[-PREFILTER:]
+			best = best[overlap[best] > 0]
+		else:
+			best = np.flatnonzero(overlap)
+
+		# best dice first so the cheap upper bounds in top() cut the rest short
+		best = best[np.argsort(-dice[best], kind='stable')].tolist()
+		return self.exact.get(key, []) + [i for i in best if self.keys[i] != key]
+
+	def top(self, query: str, k: int = 10) -> List[Tuple[float, str]]:
+		key = normalize(query)
+		s = difflib.SequenceMatcher()
+		s.set_seq2(key)
+		heap: List[Tuple[float, str]] = []
+
+		for i in self._prefilter(key):
+			s.set_seq1(self.keys[i])
+
+			# same short cuts get_close_matches takes, a name that can't beat the current k-th best isn't scored
+			if len(heap) == k and (s.real_quick_ratio() < heap[0][0] or s.quick_ratio() < heap[0][0]):
+				continue
+
+			entry = (s.ratio(), self.names[i])
+
+			if len(heap) < k:
+				heapq.heappush(heap, entry)
+			elif entry > heap[0]:
+				heapq.heapreplace(heap, entry)
+
+		return sorted(heap, reverse=True)
+
+	def close_matches(self, query: str, k: int = 10) -> List[str]:
+		return [name for _, name in self.top(query, k)]
+
+
+class LibraryFuzzyIndex:
+	# folder listings are read once per directory and kept, the library doesn't move around during a run. with a
+	# snapshot they come out of memory and only folders outside of it ever get listed
+
+	def __init__(self, library_dir: pathlib.Path, snapshot: DirectorySnapshot = None):
+		self.library_dir = pathlib.Path(library_dir)
+		self.snapshot = snapshot
+		self.listings: Dict[pathlib.Path, Tuple[List[str], List[str]]] = {}
+		self.indexes: Dict[Tuple[pathlib.Path, str], TrigramIndex] = {}
+
+	def listing(self, directory: pathlib.Path) -> Tuple[List[str], List[str]]:
+		# (sub directory names, file names)
+		if self.snapshot is not None and (snapshot_listing := self.snapshot.listing(directory)) is not None:
+			return snapshot_listing
+
+		if directory not in self.listings:
+			dirs, files = [], []
+
+			try:
+				with os.scandir(directory) as entries:
+					for entry in entries:
+						(dirs if entry.is_dir() else files).append(entry.name)
+
+			except (FileNotFoundError, NotADirectoryError):
+				pass
+
+			self.listings[directory] = (sorted(dirs), sorted(files))
+
+		return self.listings[directory]
+
+	def is_dir(self, directory: pathlib.Path) -> bool:
+		parent_dirs, _ = self.listing(directory.parent)
+		return directory.name in parent_dirs
+
+	def _index(self, directory: pathlib.Path, kind: str) -> TrigramIndex:
+		if (directory, kind) not in self.indexes:
+			dirs, files = self.listing(directory)
+			names = dirs if kind == 'dirs' else [x for x in files if pathlib.Path(x).suffix == '.mp3']
+			self.indexes[(directory, kind)] = TrigramIndex(names)
+
+		return self.indexes[(directory, kind)]
+
+	def artist_matches(self, artist: str, k: int = 10) -> List[str]:
+		return self._index(self.library_dir, 'dirs').close_matches(artist, k)
+
+	def album_matches(self, artist_dir: pathlib.Path, album: str, k: int = 10) -> List[str]:
+		return self._index(artist_dir, 'dirs').close_matches(album, k)
+
+	def track_matches(self, album_dir: pathlib.Path, title: str, k: int = 10) -> List[str]:
+		return self._index(album_dir, 'files').close_matches(title, k)
+
+	def album_folders(self, artist_dir: pathlib.Path) -> List[str]:
+		return self.listing(artist_dir)[0]
+
+	def audio_files(self, album_dir: pathlib.Path) -> List[str]:
+		return [x for x in self.listing(album_dir)[1] if pathlib.Path(x).suffix == '.mp3']
+
+	def top(self, directory: pathlib.Path, query: str, kind: str = 'dirs', k: int = 10) -> List[Tuple[float, str]]:
+		return self._index(directory, kind).top(query, k)
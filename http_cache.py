@@ -0,0 +1,114 @@
+import hashlib
+import json
+import pathlib
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+# scrobbles in a range that ended a while ago never change, a range that is still open can get new ones any minute.
+# the grace period covers scrobbles submitted late from an offline device.
+CLOSED_RANGE_GRACE = 24 * 60 * 60
+CLOSED_RANGE_TTL = None     # never expires, only evicted
+OPEN_RANGE_TTL = 5 * 60
+
+DEFAULT_MAX_BYTES = 256 * 2 ** 20
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS responses (
+	key TEXT PRIMARY KEY,
+	body BLOB NOT NULL,
+	size INTEGER NOT NULL,
+	expires REAL,
+	last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+'''
+
+
+def cache_key(url: str, params: dict, ignore: tuple = ('api_key', 'api_sig', 'sk')) -> str:
+	# credentials don't change the answer, leave them out so a new key doesn't throw the cache away
+	kept = sorted((k, str(v)) for k, v in params.items() if k not in ignore)
+	return hashlib.sha256(json.dumps([url, kept]).encode('utf-8')).hexdigest()
+
+
+def ttl_for_range(time_to: Optional[int], now: float = None) -> Optional[float]:
+	now = time.time() if now is None else now
+
+	if time_to is not None and time_to < now - CLOSED_RANGE_GRACE:
+		return CLOSED_RANGE_TTL
+
+	return OPEN_RANGE_TTL
+
+
+class ResponseCache:
+
+	def __init__(self, path: pathlib.Path, max_bytes: int = DEFAULT_MAX_BYTES):
+		self.path = pathlib.Path(path)
+		self.path.parent.mkdir(parents=True, exist_ok=True)
+		self.max_bytes = max_bytes
+		self.lock = threading.Lock()
+		self.connection = sqlite3.connect(str(self.path), check_same_thread=False, timeout=60)
+		self.connection.executescript(SCHEMA)
+
+		self.hits = 0
+		self.misses = 0
+		self.expired = 0
+		self.evictions = 0
+
+	def close(self):
+		with self.lock:
+			self.connection.close()
+
+	def get(self, key: str) -> Optional[bytes]:
+		now = time.time()
+
+		with self.lock, self.connection:
+			row = self.connection.execute('SELECT body, expires FROM responses WHERE key = ?', (key,)).fetchone()
+
+			if row is None:
+				self.misses += 1
+				return None
+
+			body, expires = row
+
+			if expires is not None and expires < now:
+				self.connection.execute('DELETE FROM responses WHERE key = ?', (key,))
+				self.expired += 1
+				self.misses += 1
+				return None
+
+			self.connection.execute('UPDATE responses SET last_used = ? WHERE key = ?', (now, key))
+			self.hits += 1
+			return body
+
+	def put(self, key: str, body: bytes, ttl: Optional[float]):
+		now = time.time()
+		expires = None if ttl is None else now + ttl
+
+		with self.lock, self.connection:
+			self.connection.execute(
+				'INSERT OR REPLACE INTO responses (key, body, size, expires, last_used) VALUES (?, ?, ?, ?, ?)',
+				(key, body, len(body), expires, now))
+			self._evict()
+
+	def _evict(self):
+		# drop least recently used responses until the cache fits again
+		total, = self.connection.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()
+
+		if total <= self.max_bytes:
+			return
+
+		for key, size in self.connection.execute('SELECT key, size FROM responses ORDER BY last_used').fetchall():
+			if total <= self.max_bytes:
+				break
+
+			self.connection.execute('DELETE FROM responses WHERE key = ?', (key,))
+			total -= size
+			self.evictions += 1
+
+	def report(self) -> str:
+		requests = self.hits + self.misses
+		hit_rate = 100 * self.hits / requests if requests else 0
+		return ''.join(['http cache: ', str(self.hits), ' hits, ', str(self.misses), ' misses (', str(self.expired),
+		                ' expired), ', str(self.evictions), ' evicted, ', f'{hit_rate:.0f}% hit rate'])
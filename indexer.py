@@ -0,0 +1,201 @@
+import concurrent.futures
+import json
+import logging
+import os
+import pathlib
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+import tag_reader
+from dir_snapshot import DirectorySnapshot
+from storage import open_store, legacy_csv_for, migrate_library_log
+
+TAG_DATA_COLUMNS = [
+	'album',
+	'album_artist',
+	'artist',
+	'title',
+	'disc_num',
+	'original_artist',
+	'release_date',
+	'track_num',
+]
+INFO_DATA_COLUMNS = [
+	'bit_rate',
+	'time_secs',
+]
+LIBRARY_COLUMNS = ['filepath'] + TAG_DATA_COLUMNS + INFO_DATA_COLUMNS
+TAG_READERS = tag_reader.TAG_READERS
+
+# (size, mtime_ns), if either changes the file gets re-read
+FileStamp = Tuple[int, int]
+
+
+def is_audio_file(x: pathlib.Path) -> bool:
+	return True if x.suffix == '.mp3' else False    # or x.suffix == '.flac' else False
+
+
+def _scan_directory(directory: str, mtime_ns: int, snapshot: Optional[DirectorySnapshot]) -> List[os.DirEntry]:
+	with os.scandir(directory) as entries:
+		entries = list(entries)
+
+	if snapshot is not None:
+		snapshot.add(directory, mtime_ns, [x.name for x in entries if x.is_dir()],
+		             [x.name for x in entries if not x.is_dir()])
+
+	return entries
+
+
+def scan_library_files(music_library_dir: pathlib.Path,
+                       snapshot: DirectorySnapshot = None) -> Dict[str, FileStamp]:
+	# library is artist/album/track, scandir hands back the stat info with the listing on most platforms. the listings
+	# go into snapshot on the way, when given one, so the lost track search never has to list a folder again
+	stamps = {}
+
+	def dir_mtime(entry: os.DirEntry) -> int:
+		return entry.stat().st_mtime_ns if snapshot is not None else 0
+
+	root = str(music_library_dir)
+	artist_entries = _scan_directory(root, os.stat(root).st_mtime_ns if snapshot is not None else 0, snapshot)
+
+	for artist_entry in (x for x in artist_entries if x.is_dir()):
+		album_entries = _scan_directory(artist_entry.path, dir_mtime(artist_entry), snapshot)
+
+		for album_entry in (x for x in album_entries if x.is_dir()):
+			for entry in _scan_directory(album_entry.path, dir_mtime(album_entry), snapshot):
+				if entry.is_file() and is_audio_file(pathlib.Path(entry.name)):
+					stat = entry.stat()
+					stamps[entry.path] = (stat.st_size, stat.st_mtime_ns)
+
+	return stamps
+
+
+def load_manifest(manifest_file: pathlib.Path) -> Dict[str, FileStamp]:
+	if not manifest_file.exists():
+		return {}
+
+	with manifest_file.open(mode='r', encoding='utf-8') as f:
+		return {path: tuple(stamp) for path, stamp in json.load(f).items()}
+
+
+def save_manifest(manifest: Dict[str, FileStamp], manifest_file: pathlib.Path):
+	tmp_file = manifest_file.with_name(manifest_file.name + '.tmp')
+
+	with tmp_file.open(mode='w', encoding='utf-8') as f:
+		json.dump(manifest, f)
+
+	os.replace(tmp_file, manifest_file)
+
+
+def manifest_file_for(music_library_log_file: pathlib.Path) -> pathlib.Path:
+	return music_library_log_file.with_name(music_library_log_file.stem + '.manifest.json')
+
+
+def _init_worker():
+	logging.getLogger('eyed3').setLevel(logging.ERROR)
+
+
+def read_track_record_eyed3(filepath: str) -> Optional[tuple]:
+	import eyed3
+
+	track = eyed3.load(filepath)
+
+	if track is None:
+		return None
+
+	track_data = [filepath]
+
+	for dc in TAG_DATA_COLUMNS:
+		try:
+			track_data.append(track.tag.__getattribute__(dc))
+		except AttributeError:
+			track_data.append(None)
+
+	for dc in INFO_DATA_COLUMNS:
+		try:
+			track_data.append(track.info.__getattribute__(dc))
+		except AttributeError:
+			track_data.append(None)
+
+	return tuple(track_data)
+
+
+def read_track_record_fast(filepath: str) -> Optional[tuple]:
+	record = tag_reader.read_track_record(filepath)
+	return None if record is None else record.as_tuple()
+
+
+def read_track_records(filepaths: List[str], workers: int = None, reader: str = 'fast') -> Iterator[tuple]:
+	if not filepaths:
+		return
+
+	read = read_track_record_fast if reader == 'fast' else read_track_record_eyed3
+	chunksize = max(1, min(256, len(filepaths) // (4 * (workers or os.cpu_count() or 1))))
+
+	with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+		for record in pool.map(read, filepaths, chunksize=chunksize):
+			if record is not None:
+				yield record
+
+
+def records_to_frame(records: Iterable[tuple]) -> pd.DataFrame:
+	# fill column lists as records stream in, nothing per-track sticks around besides the values themselves
+	columns = [[] for _ in LIBRARY_COLUMNS]
+
+	for record in records:
+		for column, value in zip(columns, record):
+			column.append(value)
+
+	return pd.DataFrame(dict(zip(LIBRARY_COLUMNS, columns)), columns=LIBRARY_COLUMNS)
+
+
+def index_library(music_library_dir: pathlib.Path, music_library_log_file: pathlib.Path, rebuild: bool = False,
+                  workers: int = None, reader: str = 'fast', snapshot: DirectorySnapshot = None) -> pd.DataFrame:
+	manifest_file = manifest_file_for(music_library_log_file)
+	store = open_store(music_library_log_file)
+	legacy_csv = legacy_csv_for(music_library_log_file)
+
+	if not store.exists() and legacy_csv.exists() and legacy_csv != store.path:
+		print('migrating', legacy_csv, 'to', store.path)
+		migrate_library_log(legacy_csv, store.path)
+
+	have_log = store.exists() and not rebuild
+
+	old_manifest = load_manifest(manifest_file) if have_log else {}
+	old_df = store.read() if have_log else pd.DataFrame(columns=LIBRARY_COLUMNS)
+
+	# a log without a manifest (written before the manifest existed) counts as unchanged for the paths it covers
+	if have_log and not old_manifest:
+		logged_paths = set(old_df['filepath'])
+	else:
+		logged_paths = set(old_manifest)
+
+	new_manifest = scan_library_files(music_library_dir, snapshot)
+
+	changed = [path for path, stamp in new_manifest.items()
+	           if path not in logged_paths or (old_manifest and old_manifest.get(path) != stamp)]
+	deleted = logged_paths.difference(new_manifest)
+
+	if not changed and not deleted and have_log and old_manifest:
+		print('library log is up to date,', len(old_df), 'tracks')
+		return old_df
+
+	print('reading tags for', len(changed), 'new or changed files,', len(deleted), 'removed')
+	new_df = records_to_frame(read_track_records(changed, workers, reader))
+
+	dropped_paths = deleted.union(changed)
+	kept_df = old_df.loc[~old_df['filepath'].isin(dropped_paths), LIBRARY_COLUMNS]
+
+	frames = [df for df in (kept_df, new_df) if not df.empty]
+	df_lib_data = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=LIBRARY_COLUMNS)
+
+	# files that could not be read stay out of the manifest, so they get another try next run instead of counting as
+	# indexed without a row in the log
+	unread = set(changed).difference(new_df['filepath']) if not new_df.empty else set(changed)
+
+	store.write(df_lib_data)
+	save_manifest({path: stamp for path, stamp in new_manifest.items() if path not in unread}, manifest_file)
+
+	# re-read so fresh rows come back with the same stored types as the kept ones
+	return store.read()
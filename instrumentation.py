@@ -0,0 +1,175 @@
+import collections
+import contextlib
+import datetime as dt
+import json
+import os
+import pathlib
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Dict, Optional
+
+PROFILERS = ('cprofile', 'pyinstrument')
+
+# how often the background thread looks at memory use
+MEMORY_SAMPLE_INTERVAL = 0.25
+
+# counters anything in the process can bump without being handed the report, see count()
+COUNTERS: Dict[str, int] = collections.Counter()
+_counter_lock = threading.Lock()
+
+
+def count(name: str, n: int = 1):
+	with _counter_lock:
+		COUNTERS[name] += n
+
+
+def current_rss() -> Optional[int]:
+	# resident memory in bytes, None where it can't be read without extra packages
+	try:
+		with open('/proc/self/statm', mode='r') as f:
+			return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+	except (OSError, ValueError, AttributeError):
+		pass
+
+	try:
+		import psutil
+		return psutil.Process().memory_info().rss
+
+	except ImportError:
+		return None
+
+
+class MemorySampler(threading.Thread):
+	# peak resident memory per stage, tracemalloc's peak of python allocations where rss isn't available
+
+	def __init__(self, interval: float = MEMORY_SAMPLE_INTERVAL):
+		super().__init__(daemon=True)
+		self.interval = interval
+		self.peak = 0
+		self.stopped = threading.Event()
+		self.lock = threading.Lock()
+		self.use_tracemalloc = current_rss() is None
+
+		if self.use_tracemalloc:
+			tracemalloc.start()
+
+	def sample(self) -> int:
+		if self.use_tracemalloc:
+			return tracemalloc.get_traced_memory()[1]
+
+		return current_rss() or 0
+
+	def take_peak(self) -> int:
+		# the peak since the last call
+		peak, self.peak = max(self.peak, self.sample()), 0
+
+		if self.use_tracemalloc:
+			tracemalloc.reset_peak()
+
+		return peak
+
+	def run(self):
+		while not self.stopped.wait(self.interval):
+			with self.lock:
+				self.peak = max(self.peak, self.sample())
+
+	@contextlib.contextmanager
+	def paused(self):
+		# no samples taken inside, for forking worker processes while the thread is around
+		with self.lock:
+			yield
+
+	def stop(self):
+		self.stopped.set()
+
+
+class RunReport:
+	# wall and cpu time per pipeline stage, the counters and peak memory, written as run_report.json next to the
+	# reports. begin() closes whatever stage was open, so stages can be marked without re-indenting main.py
+
+	def __init__(self, args: Dict = None):
+		self.args = args or {}
+		self.started = dt.datetime.now()
+		self.stages: Dict[str, Dict[str, float]] = {}
+		self.current: Optional[str] = None
+		self.wall_start = self.cpu_start = 0.0
+		self.memory = MemorySampler()
+		self.memory.start()
+
+	def begin(self, stage: str):
+		self.end()
+		self.current = stage
+		self.memory.take_peak()
+		self.wall_start, self.cpu_start = time.perf_counter(), time.process_time()
+
+	def end(self):
+		if self.current is None:
+			return
+
+		stage = self.stages.setdefault(self.current, {'wall_secs': 0.0, 'cpu_secs': 0.0, 'peak_memory_mb': 0.0})
+		stage['wall_secs'] += time.perf_counter() - self.wall_start
+		stage['cpu_secs'] += time.process_time() - self.cpu_start
+		stage['peak_memory_mb'] = max(stage['peak_memory_mb'], self.memory.take_peak() / 2 ** 20)
+		self.current = None
+
+	def as_dict(self) -> Dict:
+		return {
+			'started': self.started.isoformat(timespec='seconds'),
+			'wall_secs': round((dt.datetime.now() - self.started).total_seconds(), 3),
+			'python': sys.version.split()[0],
+			'args': self.args,
+			'stages': {name: {k: round(v, 4) for k, v in stage.items()} for name, stage in self.stages.items()},
+			'counters': dict(sorted(COUNTERS.items())),
+		}
+
+	def write(self, out_dir: pathlib.Path) -> pathlib.Path:
+		self.end()
+		self.memory.stop()
+		report_file = out_dir.joinpath('run_report.json')
+
+		with report_file.open(mode='w', encoding='utf-8') as f:
+			json.dump(self.as_dict(), f, indent=1, default=str)
+
+		return report_file
+
+
+class Profile:
+	# optional whole-run profile, cProfile from the standard library or pyinstrument when it is installed
+
+	def __init__(self, kind: str):
+		self.kind = kind
+
+		if kind == 'cprofile':
+			import cProfile
+			self.profiler = cProfile.Profile()
+			self.profiler.enable()
+
+		else:
+			try:
+				from pyinstrument import Profiler
+			except ImportError as E:
+				raise ImportError('pyinstrument is needed for -profile pyinstrument, use -profile cprofile instead or '
+				                  'pip install pyinstrument') from E
+
+			self.profiler = Profiler()
+			self.profiler.start()
+
+	def write(self, out_dir: pathlib.Path) -> pathlib.Path:
+		if self.kind == 'cprofile':
+			import pstats
+			self.profiler.disable()
+			profile_file = out_dir.joinpath('profile.pstats')
+			self.profiler.dump_stats(str(profile_file))
+
+			with out_dir.joinpath('profile.txt').open(mode='w', encoding='utf-8') as f:
+				pstats.Stats(self.profiler, stream=f).sort_stats('cumulative').print_stats(50)
+
+		else:
+			self.profiler.stop()
+			profile_file = out_dir.joinpath('profile.html')
+			profile_file.write_text(self.profiler.output_html(), encoding='utf-8')
+
+		return profile_file
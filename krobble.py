@@ -0,0 +1,88 @@
+from typing import Iterable
+
+import numpy as np
+
+# krobbles are scrobbles weighted by how much listening they stand for. each scheme gives every scrobble a weight and
+# the schemes picked get multiplied together:
+#   duration  track length over a reference length, a 12 minute track counts three times a 4 minute one
+#   recency   halves every half_life seconds before the end of the range
+#   session   a track only counts cap times per listening session, sessions end after gap seconds of silence
+SCHEMES = ('duration', 'recency', 'session')
+DEFAULT_SCHEMES = ('duration',)
+
+REFERENCE_SECS = 240.0
+HALF_LIFE_SECS = 30 * 24 * 60 * 60
+SESSION_GAP_SECS = 30 * 60
+SESSION_CAP = 3
+
+
+def duration_weights(durations: np.ndarray, reference_secs: float = REFERENCE_SECS) -> np.ndarray:
+	durations = np.nan_to_num(np.asarray(durations, dtype=np.float64), nan=0.0)
+	return durations / reference_secs
+
+
+def recency_weights(timestamps: np.ndarray, now: int, half_life_secs: float = HALF_LIFE_SECS) -> np.ndarray:
+	age = np.maximum(now - np.asarray(timestamps, dtype=np.float64), 0)
+	return np.exp2(-age / half_life_secs)
+
+
+def session_ids(timestamps: np.ndarray, gap_secs: float = SESSION_GAP_SECS) -> np.ndarray:
+	timestamps = np.asarray(timestamps, dtype=np.int64)
+	order = np.argsort(timestamps, kind='stable')
+	new_session = np.empty(len(order), dtype=bool)
+	new_session[:1] = True
+	new_session[1:] = np.diff(timestamps[order]) > gap_secs
+
+	ids = np.empty(len(order), dtype=np.int64)
+	ids[order] = np.cumsum(new_session) - 1
+	return ids
+
+
+def session_cap_weights(timestamps: np.ndarray, track_ids: np.ndarray, gap_secs: float = SESSION_GAP_SECS,
+                        cap: int = SESSION_CAP) -> np.ndarray:
+	timestamps = np.asarray(timestamps, dtype=np.int64)
+	track_ids = np.asarray(track_ids, dtype=np.int64)
+	time_order = np.argsort(timestamps, kind='stable')
+	sessions = session_ids(timestamps, gap_secs)[time_order]
+
+	# group by (session, track) in time order, then number the plays inside each group. one packed int64 key with a
+	# stable sort keeps the time order inside groups and is a lot quicker than lexsort
+	group_keys = sessions * (track_ids.max(initial=0) + 1) + track_ids[time_order]
+	by_group = np.argsort(group_keys, kind='stable')
+	order = time_order[by_group]
+	group_keys = group_keys[by_group]
+
+	group_start = np.empty(len(order), dtype=bool)
+	group_start[:1] = True
+	group_start[1:] = group_keys[1:] != group_keys[:-1]
+
+	positions = np.arange(len(order))
+	first_of_group = np.maximum.accumulate(np.where(group_start, positions, 0))
+
+	weights = np.empty(len(order), dtype=np.float64)
+	weights[order] = (positions - first_of_group) < cap
+	return weights
+
+
+def krobble_weights(timestamps: np.ndarray, track_ids: np.ndarray, durations: np.ndarray,
+                    schemes: Iterable[str] = DEFAULT_SCHEMES, now: int = None, reference_secs: float = REFERENCE_SECS,
+                    half_life_secs: float = HALF_LIFE_SECS, session_gap_secs: float = SESSION_GAP_SECS,
+                    session_cap: int = SESSION_CAP) -> np.ndarray:
+	# one weight per scrobble, all three arrays line up scrobble for scrobble
+	timestamps = np.asarray(timestamps, dtype=np.int64)
+	weights = np.ones(len(timestamps), dtype=np.float64)
+
+	for scheme in schemes:
+		if scheme == 'duration':
+			weights *= duration_weights(durations, reference_secs)
+
+		elif scheme == 'recency':
+			weights *= recency_weights(timestamps, timestamps.max(initial=0) if now is None else now, half_life_secs)
+
+		elif scheme == 'session':
+			weights *= session_cap_weights(timestamps, track_ids, session_gap_secs, session_cap)
+
+		else:
+			raise ValueError(''.join(['Unknown krobble scheme ', scheme, ', use one of ', ', '.join(SCHEMES)]))
+
+	return weights
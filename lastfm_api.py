@@ -0,0 +1,133 @@
+import json
+from collections import namedtuple
+from typing import Callable, List, Tuple
+
+import requests
+
+from http_cache import ResponseCache, cache_key, ttl_for_range
+from instrumentation import count
+
+API_ROOT_URL = r'http://ws.audioscrobbler.com/2.0'
+USER_AGENT = 'bedevere-test'
+FORMAT = 'json'
+
+HEADERS = {
+	'user-agent': USER_AGENT,
+}
+
+# most the api will hand back per page
+PAGE_LIMIT = 200
+
+# compact stand-in for pylast.PlayedTrack, just the parts the reports use
+Scrobble = namedtuple('Scrobble', 'timestamp, artist, album, title')
+
+
+class LastFMError(Exception):
+
+	def __init__(self, code: int, message: str = None):
+		super().__init__(''.join(['Last.fm error ', str(code), ': ', str(message)]))
+		self.code = code
+
+
+def new_session() -> requests.Session:
+	session = requests.Session()
+	session.headers.update(HEADERS)
+	return session
+
+
+def recent_tracks_params(api_key: str, username: str, page: int, time_from: int = None, time_to: int = None,
+                         limit: int = PAGE_LIMIT) -> dict:
+	params = {
+		'method': 'user.getrecenttracks',
+		'user': username,
+		'api_key': api_key,
+		'format': FORMAT,
+		'limit': limit,
+		'page': page,
+	}
+
+	if time_from is not None:
+		params['from'] = time_from
+
+	if time_to is not None:
+		params['to'] = time_to
+
+	return params
+
+
+def parse_recent_tracks(payload: dict) -> Tuple[List[Scrobble], int]:
+	if 'error' in payload:
+		raise LastFMError(int(payload['error']), payload.get('message'))
+
+	recent_tracks = payload['recenttracks']
+	tracks = recent_tracks.get('track', [])
+
+	# a single track comes back as a bare object instead of a list
+	if isinstance(tracks, dict):
+		tracks = [tracks]
+
+	scrobbles = []
+
+	for track in tracks:
+		# the currently playing track has no date and isn't a scrobble yet
+		if 'date' not in track:
+			continue
+
+		scrobbles.append(Scrobble(
+			timestamp=int(track['date']['uts']),
+			artist=track['artist']['#text'],
+			album=track['album']['#text'],
+			title=track['name'],
+		))
+
+	total_pages = int(recent_tracks.get('@attr', {}).get('totalPages', 1))
+	return scrobbles, total_pages
+
+
+def get_recent_tracks_page(session: requests.Session, api_key: str, username: str, page: int, time_from: int = None,
+                           time_to: int = None, api_root: str = API_ROOT_URL, timeout: float = 30,
+                           cache: ResponseCache = None,
+                           throttle: Callable[[], None] = None) -> Tuple[List[Scrobble], int]:
+	params = recent_tracks_params(api_key, username, page, time_from, time_to)
+	key = cache_key(api_root, params)
+
+	if cache is not None and (body := cache.get(key)) is not None:
+		count('api_pages_cached')
+		return parse_recent_tracks(json.loads(body))
+
+	if throttle is not None:
+		throttle()
+
+	response = session.get(api_root, params=params, timeout=timeout)
+	count('api_requests')
+
+	try:
+		payload = response.json()
+	except ValueError:
+		response.raise_for_status()
+		raise
+
+	if 'error' not in payload:
+		response.raise_for_status()
+
+	scrobbles, total_pages = parse_recent_tracks(payload)
+
+	# only good answers get cached, errors are worth asking again
+	if cache is not None:
+		cache.put(key, response.content, ttl_for_range(time_to))
+
+	return scrobbles, total_pages
+
+
+def get_recent_tracks(session: requests.Session, api_key: str, username: str, time_from: int = None,
+                      time_to: int = None, api_root: str = API_ROOT_URL,
+                      cache: ResponseCache = None) -> List[Scrobble]:
+	scrobbles, total_pages = get_recent_tracks_page(session, api_key, username, 1, time_from, time_to, api_root,
+	                                                cache=cache)
+
+	for page in range(2, total_pages + 1):
+		page_scrobbles, _ = get_recent_tracks_page(session, api_key, username, page, time_from, time_to, api_root,
+		                                           cache=cache)
+		scrobbles.extend(page_scrobbles)
+
+	return scrobbles
@@ -0,0 +1,123 @@
+import pathlib
+import re
+import tkinter.filedialog as fd
+from typing import Tuple
+
+import msg_box
+from corrections import CorrectionStore
+from fuzzy_index import LibraryFuzzyIndex
+from instrumentation import count
+
+# the interactive lost track search. only a run that can prompt imports this, it is what loads tkinter
+
+
+def equal_except_case(s1: str, s2: str) -> bool:
+	return s1.lower() == s2.lower()
+
+
+def search_for_lost_track(library_dir: pathlib.Path, lookup_tuple: Tuple[str, str, str],
+                          corrections: CorrectionStore = None,
+                          index: LibraryFuzzyIndex = None) -> Tuple[pathlib.Path, tuple, tuple, tuple]:
+	artist, album, title = lookup_tuple
+	index = LibraryFuzzyIndex(library_dir) if index is None else index
+
+	# names corrected in an earlier run go straight to their file, no folder gets listed for them
+	if corrections is not None and (track := corrections.track_path(library_dir, lookup_tuple)) is not None:
+		count('correction_hits')
+		return track, None, None, None
+
+	count('lost_track_searches')
+
+	expected_artist_folder = library_dir.joinpath(artist)
+	track_file = None
+
+	if index.is_dir(expected_artist_folder):
+		re_album_folder = re.compile(''.join([r'^\[(\d{4})(-(\d{2}))?(-(\d{2}))?\] ', re.escape(album)]))
+
+		potential_album_folders = list(filter(re_album_folder.match, index.album_folders(expected_artist_folder)))
+
+		if len(potential_album_folders) == 1:
+			album_folder = expected_artist_folder.joinpath(potential_album_folders[0])
+
+			re_track = re.compile(''.join([r'^((\d)-)?(\d{2}) ', re.escape(title)]))
+			potential_tracks = list(filter(re_track.match, index.audio_files(album_folder)))
+
+			if len(potential_tracks) == 1:
+				track = album_folder.joinpath(potential_tracks[0])
+				print(lookup_tuple, 'was somehow unable to be found but was rediscovered through the normal algorithm')
+
+				if True:  # msg_box.Confirm().show(msg=''.join(['Confirm the track: ', str(track), '?'])):
+					track_file = track
+
+	# if not track_file:
+	# a folder picked for this artist in an earlier run wins over whatever the fuzzy match says
+	artist_corrected = corrections.artist_folder(artist) if corrections is not None else None
+
+	if artist_corrected is not None:
+		artist_dir = library_dir.joinpath(artist_corrected)
+		artist_correction = None
+
+	else:
+		potential_artist_matches = index.artist_matches(artist)
+		print(artist, album, title)
+		if equal_except_case(artist, potential_artist_matches[0]):
+			artist_dir = library_dir.joinpath(potential_artist_matches[0])
+			artist_correction = (artist, potential_artist_matches[0])
+
+		elif len(potential_artist_matches) > 0 and msg_box.Confirm().show(
+				msg=''.join(['Correct artist folder for ', artist, ': ', potential_artist_matches[0], '?'])):
+			artist_dir = library_dir.joinpath(potential_artist_matches[0])
+			artist_correction = (artist, potential_artist_matches[0])
+
+		else:
+			artist_dir = library_dir.joinpath(fd.askdirectory(initialdir=library_dir))
+			artist_correction = (artist, artist_dir.stem)
+
+	album_corrected = corrections.album_folder(artist_dir.name, album) if corrections is not None else None
+
+	if album_corrected is not None:
+		album_dir = artist_dir.joinpath(album_corrected)
+		album_correction = None
+
+	else:
+		potential_album_matches = index.album_matches(artist_dir, album)
+
+		if equal_except_case(album, potential_album_matches[0]):
+			album_dir = artist_dir.joinpath(potential_album_matches[0])
+			album_correction = (album, potential_album_matches[0])
+
+		elif len(potential_album_matches) > 0 and msg_box.Confirm().show(
+				msg=''.join(['Correct album folder for ', album, ': ', potential_album_matches[0], '?'])):
+			album_dir = artist_dir.joinpath(potential_album_matches[0])
+			album_correction = (album, potential_album_matches[0])
+
+		else:
+			album_dir = artist_dir.joinpath(fd.askdirectory(initialdir=artist_dir))
+			album_correction = (album, album_dir.stem)
+
+	title_corrected = corrections.track_file(artist_dir.name, album_dir.name, title) if corrections is not None else None
+
+	if title_corrected is not None:
+		track = album_dir.joinpath(title_corrected)
+		track_correction = None
+
+	else:
+		potential_title_matches = index.track_matches(album_dir, title)
+		re_track_name_per_title = re.compile(''.join([r'^((\d)-)?(\d{2}) ', re.escape(title)]), re.IGNORECASE)
+
+		if re_track_name_per_title.match(potential_title_matches[0]) or equal_except_case(title, potential_title_matches[0]):
+			track = album_dir.joinpath(potential_title_matches[0])
+			track_correction = (title, potential_title_matches[0])
+
+		elif len(potential_title_matches) > 0 and msg_box.Confirm().show(
+				msg=''.join(['Correct track for ', title, ': ', potential_title_matches[0], '?'])):
+			track = album_dir.joinpath(potential_title_matches[0])
+			track_correction = (title, potential_title_matches[0])
+
+		else:
+			track = album_dir.joinpath(fd.askopenfilename(initialdir=album_dir))
+			track_correction = (title, track.stem)
+
+	track_file = track
+
+	return track_file, artist_correction, album_correction, track_correction
@@ -0,0 +1,160 @@
+from typing import Dict, Hashable, Iterable, List, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+# resolution status per scrobble, in the order main.py tries them
+UNMATCHED = 0
+MATCH_LIBRARY = 1
+MATCH_LOST_AND_FOUND = 2
+IGNORED = 3
+
+NO_MATCH = -1
+
+TrackKey = Tuple[str, str, str]
+
+
+def _track_keys(df: pd.DataFrame) -> List[TrackKey]:
+	# empty csv cells read back as NaN, scrobbles without an album come through as ''
+	columns = (df[column].astype(object).where(df[column].notna(), '') for column in ('artist', 'album', 'title'))
+	return list(zip(*columns))
+
+
+def _unique_key_lookup(df: pd.DataFrame, value_column: str = None) -> Dict[TrackKey, Hashable]:
+	# mirrors the old `assert len(matching_rows) == 1` check, keys that show up on more than one row never match
+	if df.empty:
+		return {}
+
+	keys = _track_keys(df)
+	values = df.index.values if value_column is None else df[value_column].values
+
+	lookup = {}
+	duplicates = set()
+
+	for key, value in zip(keys, values):
+		if key in lookup:
+			duplicates.add(key)
+		else:
+			lookup[key] = value
+
+	for key in duplicates:
+		del lookup[key]
+
+	return lookup
+
+
+def _first_index_lookup(df: pd.DataFrame, column: str) -> Dict[Hashable, Hashable]:
+	# same as `.loc[df[column] == value].index.values[0]`, the first row wins
+	lookup = {}
+
+	for value, index in zip(df[column].values, df.index.values):
+		lookup.setdefault(value, index)
+
+	return lookup
+
+
+class ScrobbleAccumulator:
+	# collapse_scrobbles one chunk at a time. each scrobble only leaves a key id and a timestamp behind, the scrobble
+	# tuples themselves can be dropped as soon as their chunk is added
+
+	def __init__(self):
+		self.key_ids: Dict[TrackKey, int] = {}
+		self.id_chunks: List[np.ndarray] = []
+		self.timestamp_chunks: List[np.ndarray] = []
+		self.count = 0
+
+	def __len__(self):
+		return self.count
+
+	def add(self, scrobbles: Iterable) -> int:
+		scrobbles = list(scrobbles)
+		key_ids = self.key_ids
+		ids = np.fromiter((key_ids.setdefault((s.artist, s.album, s.title), len(key_ids)) for s in scrobbles),
+		                  dtype=np.int64, count=len(scrobbles))
+		self.id_chunks.append(ids)
+		self.timestamp_chunks.append(np.fromiter((s.timestamp for s in scrobbles), dtype=np.int64,
+		                                         count=len(scrobbles)))
+		self.count += len(scrobbles)
+		return len(scrobbles)
+
+	def collapse(self) -> Tuple[List[TrackKey], np.ndarray, List[np.ndarray]]:
+		# one entry per distinct (artist, album, title), sorted, with how often and when it was played. timestamps keep
+		# the order they were added in
+		keys = sorted(self.key_ids)
+		rank = np.empty(len(keys), dtype=np.int64)
+		rank[[self.key_ids[key] for key in keys]] = np.arange(len(keys))
+
+		ranks = rank[np.concatenate(self.id_chunks or [np.empty(0, dtype=np.int64)])]
+		timestamps = np.concatenate(self.timestamp_chunks or [np.empty(0, dtype=np.int64)])
+		order = np.argsort(ranks, kind='stable')
+
+		counts = np.bincount(ranks, minlength=len(keys)).astype(np.int64)
+		per_key = np.split(timestamps[order], np.cumsum(counts)[:-1]) if keys else []
+		return keys, counts, per_key
+
+
+def collapse_scrobbles(scrobbles: Iterable) -> Tuple[List[TrackKey], np.ndarray, List[np.ndarray]]:
+	accumulator = ScrobbleAccumulator()
+	accumulator.add(scrobbles)
+	return accumulator.collapse()
+
+
+def expand_matches(match_indices: np.ndarray, counts: np.ndarray,
+                   timestamps: List[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+	# fan per-track matches from collapse_scrobbles back out to one (library index, timestamp) per matched scrobble
+	matched = np.asarray(match_indices) != NO_MATCH
+	indices = np.repeat(np.asarray(match_indices)[matched], np.asarray(counts)[matched])
+	matched_timestamps = np.concatenate([timestamps[i] for i in np.flatnonzero(matched)] or
+	                                    [np.empty(0, dtype=np.int64)])
+	return indices, matched_timestamps
+
+
+def unmatched_timestamps(match_indices: np.ndarray, match_statuses: np.ndarray,
+                         timestamps: List[np.ndarray]) -> np.ndarray:
+	# timestamps of the scrobbles still without a library row that aren't on the ignore list, what a later run might
+	# match yet
+	left = (np.asarray(match_indices) == NO_MATCH) & (np.asarray(match_statuses) != IGNORED)
+	return np.concatenate([timestamps[i] for i in np.flatnonzero(left)] or [np.empty(0, dtype=np.int64)])
+
+
+class LibraryMatcher:
+
+	def __init__(self, mus_lib_df: pd.DataFrame, lost_and_found_df: pd.DataFrame = None,
+	             ignore_list_df: pd.DataFrame = None):
+		lost_and_found_df = pd.DataFrame() if lost_and_found_df is None else lost_and_found_df
+		ignore_list_df = pd.DataFrame() if ignore_list_df is None else ignore_list_df
+
+		self.library_keys = _unique_key_lookup(mus_lib_df)
+		self.filepath_index = _first_index_lookup(mus_lib_df, 'filepath')
+		self.lost_and_found_keys = _unique_key_lookup(lost_and_found_df, 'filepath')
+
+		if ignore_list_df.empty:
+			self.ignored_keys: Set[TrackKey] = set()
+		else:
+			self.ignored_keys = set(_track_keys(ignore_list_df))
+
+	def index_of_filepath(self, filepath: str) -> int:
+		return self.filepath_index.get(filepath, NO_MATCH)
+
+	def match(self, key: TrackKey) -> Tuple[int, int]:
+		if (index := self.library_keys.get(key)) is not None:
+			return index, MATCH_LIBRARY
+
+		if (filepath := self.lost_and_found_keys.get(key)) is not None:
+			if (index := self.filepath_index.get(filepath)) is not None:
+				return index, MATCH_LOST_AND_FOUND
+
+		if key in self.ignored_keys:
+			return NO_MATCH, IGNORED
+
+		return NO_MATCH, UNMATCHED
+
+	def resolve(self, keys: Iterable[TrackKey]) -> Tuple[np.ndarray, np.ndarray]:
+		# one dict probe per scrobble instead of three full column scans
+		resolved: List[Tuple[int, int]] = [self.match(key) for key in keys]
+
+		if not resolved:
+			return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int8)
+
+		indices, statuses = zip(*resolved)
+		return np.asarray(indices, dtype=np.int64), np.asarray(statuses, dtype=np.int8)
@@ -2,6 +2,8 @@ import tkinter as tk
 import sys
 from typing import Tuple
 
+from instrumentation import count
+
 
 class Confirm:
 
@@ -10,6 +12,7 @@ class Confirm:
 		self.root = None
 
 	def show(self, msg: str, options: Tuple[str, str] = ('Yes', 'No')):
+		count('prompts')
 		self.root = tk.Tk()
 
 		prompt = tk.Label(self.root, text=msg, anchor="w")
@@ -0,0 +1,49 @@
+import datetime as dt
+from collections import namedtuple
+from typing import Callable, Iterable, List
+
+# kind is one of PERIOD_KINDS, label names the output folder, time_from and time_to are inclusive unix timestamps
+Period = namedtuple('Period', 'kind, label, time_from, time_to')
+
+PERIOD_KINDS = ('month', 'quarter', 'year')
+MONTHS_PER_PERIOD = {'month': 1, 'quarter': 3, 'year': 12}
+
+# what -top and -rank-change can rank and by what, here next to the period kinds so the command line can offer them
+# without importing the cube
+CUBE_KINDS = ('tracks', 'albums', 'artists')
+RANK_BY = ('play_count', 'time_played')
+
+
+def period_label(kind: str, d: dt.datetime) -> str:
+	if kind == 'month':
+		return d.strftime('%Y-%m')
+
+	elif kind == 'quarter':
+		return ''.join([str(d.year), '-Q', str((d.month - 1) // 3 + 1)])
+
+	return str(d.year)
+
+
+def add_months(d: dt.datetime, months: int) -> dt.datetime:
+	month = d.month - 1 + months
+	return d.replace(year=d.year + month // 12, month=month % 12 + 1)
+
+
+def split_range(start: dt.datetime, end: dt.datetime, kinds: Iterable[str],
+                to_timestamp: Callable[[dt.datetime], int]) -> List[Period]:
+	# every calendar month / quarter / year touching [start, end], the first and last ones cut down to the range
+	periods = []
+
+	for kind in kinds:
+		months = MONTHS_PER_PERIOD[kind]
+		first_month = (start.month - 1) // months * months + 1
+		period_start = start.replace(month=first_month, day=1, hour=0, minute=0, second=0, microsecond=0)
+
+		while period_start <= end:
+			next_start = add_months(period_start, months)
+			period_end = next_start - dt.timedelta(seconds=1)
+			periods.append(Period(kind, period_label(kind, period_start),
+			                      to_timestamp(max(period_start, start)), to_timestamp(min(period_end, end))))
+			period_start = next_start
+
+	return periods
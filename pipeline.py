@@ -0,0 +1,557 @@
+import atexit
+import datetime as dt
+import pathlib
+from typing import Iterator, List
+
+import pandas as pd
+
+from aggregate import build_period_reports, build_reports, library_krobble_weights, write_period_reports, \
+	write_reports
+from batch_runner import UserJob, run_users
+from catalog import TrackCatalog
+from checkpoint import IGNORED_TRACK, Checkpoint
+from corrections import CorrectionStore
+from credentials import api_key, default_username
+from cube import AggregateCube, cube_file_for, synced_range
+from dates import dt_fmt, convert_local_datetime_to_unix_timestamp, datetime_range
+from dir_snapshot import DirectorySnapshot, snapshot_file_for
+from fetcher import iter_recent_tracks, pooled_session
+from fuzzy_index import LibraryFuzzyIndex
+from http_cache import DEFAULT_MAX_BYTES, ResponseCache
+from indexer import index_library
+from instrumentation import Profile, RunReport, count
+from krobble import SCHEMES, DEFAULT_SCHEMES, REFERENCE_SECS, HALF_LIFE_SECS, SESSION_GAP_SECS, SESSION_CAP
+from lastfm_api import API_ROOT_URL, Scrobble
+from matcher import LibraryMatcher, NO_MATCH, IGNORED, UNMATCHED, MATCH_LIBRARY, MATCH_LOST_AND_FOUND, \
+	ScrobbleAccumulator, expand_matches, unmatched_timestamps
+from periods import split_range
+from resolution import DEFAULT_CONFIDENCE, LOST_AND_FOUND_COLUMNS, append_to_log, auto_resolve, write_review
+from scrobble_store import ScrobbleStore
+from storage import open_store
+from timeseries import ROLLING_TOP, ROLLING_WINDOWS, build_timeseries_reports, write_timeseries_reports
+
+# the report run itself, everything after the command line is parsed. cli.py only imports this once it knows a
+# report is wanted
+
+# logging.basicConfig(level=logging.DEBUG)
+
+# Track element delimiter
+delim_artist_mp3 = r' / '  # separates artists in the %ARTIST tag for mp3 tags
+delim_mp3_separator = r' / '  # same as delim_artist_mp3, but more generally true as well.
+delim_category = '\t'
+delim_listens = r'///'  # separates individual listens
+
+
+def get_first_artist(a) -> str:  # (a: eyed3.mp3.Mp3AudioFile) -> str:
+	return a.tag.artist.split(delim_mp3_separator)[0]
+
+
+def load_from_csv(csv_filepath: pathlib.Path) -> pd.DataFrame:
+	csv_df = pd.read_csv(
+		filepath_or_buffer=csv_filepath,
+		sep=delim_category,
+		encoding='utf-8'
+	)
+
+	return csv_df
+
+
+def request_tracks_from_date_range(store: ScrobbleStore, username: str, time_from: dt.datetime = None,
+                                   time_to: dt.datetime = None, api_root: str = API_ROOT_URL,
+                                   offline: bool = False, workers: int = 4,
+                                   cache: ResponseCache = None) -> Iterator[List[Scrobble]]:
+	time_from_timestamp = convert_local_datetime_to_unix_timestamp(time_from)
+	time_to_timestamp = convert_local_datetime_to_unix_timestamp(time_to)
+
+	print('range start:', time_from_timestamp)
+	print('range end:', time_to_timestamp)
+
+	# the local store keeps every scrobble it has seen, last.fm only gets asked for the ones it hasn't
+	if not offline:
+		session = pooled_session(workers)
+		fetched = store.sync(username,
+		                     lambda f, t: iter_recent_tracks(session, api_key(), username, f, t, api_root, workers,
+		                                                     cache=cache),
+		                     time_from_timestamp)
+		print('fetched', fetched, 'new scrobbles')
+
+	elif not store.covers(username, time_from_timestamp, time_to_timestamp):
+		print('the scrobble store does not cover the whole range yet, run once without --offline to sync it')
+
+	# read back a chunk at a time, the whole range never has to sit in memory as scrobble tuples
+	return store.iter_scrobbles(username, time_from_timestamp, time_to_timestamp)
+
+
+def run(args, run_report: RunReport, profile: Profile = None) -> int:
+	# defaults that live in modules the command line shouldn't have to import
+	defaults = {
+		'api_root': API_ROOT_URL,
+		'http_cache_size': DEFAULT_MAX_BYTES / 2 ** 20,
+		'confidence': DEFAULT_CONFIDENCE,
+		'krobble_schemes': list(DEFAULT_SCHEMES),
+		'krobble_reference': REFERENCE_SECS,
+		'krobble_half_life': HALF_LIFE_SECS / 86400,
+		'krobble_session_gap': SESSION_GAP_SECS / 60,
+		'krobble_session_cap': SESSION_CAP,
+		'rolling_windows': list(ROLLING_WINDOWS),
+		'rolling_top': ROLLING_TOP,
+	}
+
+	for name, default in defaults.items():
+		if getattr(args, name) is None:
+			setattr(args, name, default)
+
+	# checked up front, krobble_weights would only notice after the whole fetch
+	if unknown := sorted(set(args.krobble_schemes) - set(SCHEMES)):
+		raise ValueError(''.join(['unknown krobble schemes: ', ', '.join(unknown), ', pick from ', ', '.join(SCHEMES)]))
+
+	krobble_options = {
+		'schemes': args.krobble_schemes,
+		'reference_secs': args.krobble_reference,
+		'half_life_secs': args.krobble_half_life * 86400,
+		'session_gap_secs': args.krobble_session_gap * 60,
+		'session_cap': args.krobble_session_cap,
+	}
+
+	library_file = pathlib.Path(args.library_log)
+
+	# try:
+	# 	assert 0 < len(args.date_range) <= 2
+	# -users-file carries its own date ranges
+	if args.date_range or not args.users_file:
+		start_datetime, end_datetime = datetime_range(args.date_range)
+	else:
+		start_datetime, end_datetime = None, None
+
+	print('range start:', start_datetime)
+	print('range end:', end_datetime)
+	#
+	# except AssertionError:
+	# 	raise Exception('''Provide a date or date range to cover. If you provide limited information, like a year or a
+    #     year and month, the entirety of that duration will be included''')
+
+	run_report.begin('library')
+
+	try:
+		library_dir = pathlib.Path(args.library_dir)
+		assert library_dir.exists()
+
+	except AssertionError:
+		raise Exception('''The library directory you gave does not exist''')
+
+	# every folder listing of the library, kept next to the library log so the lost track search never lists a folder
+	snapshot_file = snapshot_file_for(library_file)
+
+	if args.rebuild_library_log:
+		print('starting library load')
+		snapshot = DirectorySnapshot(library_dir)
+		index_library(library_dir, library_file, rebuild=True, workers=args.index_workers, reader=args.tag_reader,
+		              snapshot=snapshot)
+		snapshot.save(snapshot_file)
+		print('finished library load')
+		return 0
+
+	elif args.skip_library_scan and library_file.exists():
+		mus_lib_df = open_store(library_file).read()
+
+		# a stat per folder instead of a listing, only folders that changed since the snapshot get listed
+		snapshot = DirectorySnapshot.load(library_dir, snapshot_file)
+		print('relisted', snapshot.refresh(), 'of', len(snapshot), 'library folders')
+		snapshot.save(snapshot_file)
+
+	else:
+		# only new or changed files get their tags read, see the manifest next to the library log
+		snapshot = DirectorySnapshot(library_dir)
+		mus_lib_df = index_library(library_dir, library_file, workers=args.index_workers,
+		                           reader=args.tag_reader, snapshot=snapshot)
+		snapshot.save(snapshot_file)
+
+	# the store already split off the first artist, the copy goes so the track reports keep their old columns
+	mus_lib_df['artist'] = mus_lib_df['first_artist']
+	mus_lib_df = mus_lib_df.drop(columns='first_artist')
+
+	lost_and_found_file = pathlib.Path(args.lost_and_found_log)
+
+	if lost_and_found_already_existed := lost_and_found_file.exists():
+		lost_and_found_df = load_from_csv(lost_and_found_file)
+
+		if args.clean_logs:
+			pass
+
+	else:
+		lost_and_found_df = pd.DataFrame()
+
+	ignore_list_file = pathlib.Path(args.ignore_list)
+
+	if ignore_list_already_existed := ignore_list_file.exists():
+		ignore_list_df = load_from_csv(ignore_list_file)
+
+	else:
+		ignore_list_df = pd.DataFrame()
+
+	lost_and_found_track_data = []
+	ignore_list_data = []
+
+	if args.users or args.users_file:
+		dt_fmt_write = r'%Y-%m-%d_%H-%M-%S'
+		run_dir = pathlib.Path.cwd().joinpath('--'.join(['output', dt.datetime.now().strftime(dt_fmt_write), 'users']))
+		user_ranges = [(username, (start_datetime, end_datetime)) for username in args.users or []]
+
+		if args.users_file:
+			users_df = load_from_csv(pathlib.Path(args.users_file))
+			user_ranges.extend((username, datetime_range(date_range.split()))
+			                   for username, date_range in zip(users_df['username'], users_df['date_range']))
+
+		jobs = [UserJob(username,
+		                convert_local_datetime_to_unix_timestamp(user_start),
+		                convert_local_datetime_to_unix_timestamp(user_end),
+		                run_dir.joinpath('--'.join([username, user_start.strftime(dt_fmt_write),
+		                                            user_end.strftime(dt_fmt_write)])),
+		                split_range(user_start, user_end, args.periods or [],
+		                            convert_local_datetime_to_unix_timestamp))
+		        for username, (user_start, user_end) in user_ranges]
+
+		run_report.begin('users')
+		corrections = CorrectionStore(pathlib.Path(args.corrections_file))
+		results = run_users(jobs, mus_lib_df, lost_and_found_df, ignore_list_df, snapshot, corrections, {
+			'api_key': None if args.offline else api_key(),
+			'api_root': args.api_root,
+			'offline': args.offline,
+			'fetch_workers': args.fetch_workers,
+			'scrobble_db': pathlib.Path(args.scrobble_db),
+			'http_cache': None if args.no_http_cache else pathlib.Path(args.http_cache),
+			'http_cache_size': int(args.http_cache_size * 2 ** 20),
+			'confidence': args.confidence,
+			'krobble_options': krobble_options,
+			'timeseries': (args.rolling_windows, args.rolling_top) if args.timeseries else None,
+			'cube_dir': None if args.no_cube else pathlib.Path(args.cube_dir),
+		}, processes=args.processes, memory=run_report.memory)
+
+		# workers never touch the shared logs, accepted matches from every user land in the lost and found log here
+		run_report.begin('logs')
+		found_rows = {tuple(row.values()): row for result in results for row in result['found_rows']}
+		append_to_log(list(found_rows.values()), LOST_AND_FOUND_COLUMNS, lost_and_found_file)
+
+		# the same goes for the corrections, saved once for the whole run
+		learned = [correction for result in results for correction in result['corrections']]
+
+		for key, filepath_parts in learned:
+			corrections.learn(key, filepath_parts, save=False)
+
+		if learned:
+			corrections.save()
+
+		# every user has their own report in their folder, this one is the parent's side of the whole run
+		run_dir.mkdir(parents=True, exist_ok=True)
+
+		if profile is not None:
+			print('profile written to', profile.write(run_dir))
+
+		print('run report written to', run_report.write(run_dir))
+		return 1 if any('error' in result for result in results) else 0
+
+	if args.username:
+		local_username = args.username
+
+	else:
+		local_username = default_username()
+
+	run_report.begin('fetch')
+	scrobble_store = ScrobbleStore(pathlib.Path(args.scrobble_db))
+	http_cache = None if args.no_http_cache else ResponseCache(pathlib.Path(args.http_cache),
+	                                                            max_bytes=int(args.http_cache_size * 2 ** 20))
+
+	scrobble_chunks = request_tracks_from_date_range(
+		store=scrobble_store,
+		username=local_username,
+		time_from=start_datetime,
+		time_to=end_datetime,
+		api_root=args.api_root,
+		offline=args.offline,
+		workers=args.fetch_workers,
+		cache=http_cache,
+	)
+	# every distinct track gets resolved once no matter how many times it was played, each scrobble only leaves its
+	# track and timestamp behind
+	scrobble_accumulator = ScrobbleAccumulator()
+
+	for chunk in scrobble_chunks:
+		scrobble_accumulator.add(chunk)
+		print('read', len(scrobble_accumulator), 'scrobbles', end='\r')
+
+	# ends the line the progress kept rewriting
+	print('read', len(scrobble_accumulator), 'scrobbles')
+
+	# only the part of the range the store has actually synced counts as seen by the cube
+	cube_range = None if args.no_cube else synced_range(scrobble_store, local_username,
+	                                                    convert_local_datetime_to_unix_timestamp(start_datetime),
+	                                                    convert_local_datetime_to_unix_timestamp(end_datetime))
+	scrobble_store.close()
+	number_of_scrobbles = len(scrobble_accumulator)
+	print('scrobble count:', number_of_scrobbles)
+
+	# scrobbles are already safe in the scrobble store, the checkpoint holds the work that cost a person their time
+	run = {'username': local_username, 'time_from': str(start_datetime), 'time_to': str(end_datetime),
+	       'library_log': str(library_file)}
+	state_file = pathlib.Path(args.state_file)
+	checkpoint = Checkpoint.resume(state_file, run) if args.resume else Checkpoint(state_file, run)
+
+	# exits from msg_box, errors and ctrl+c all still get the last answers saved
+	atexit.register(checkpoint.save)
+
+	batch_unresolved = {}
+	corrections = CorrectionStore(pathlib.Path(args.corrections_file))
+	print(len(corrections), 'remembered folder corrections')
+
+	run_report.begin('match')
+	count('scrobbles', len(scrobble_accumulator))
+	scrobble_keys, scrobble_counts, scrobble_timestamps = scrobble_accumulator.collapse()
+	del scrobble_accumulator
+	print('distinct tracks:', len(scrobble_keys))
+
+	matcher = LibraryMatcher(mus_lib_df, lost_and_found_df, ignore_list_df)
+	fuzzy_index = LibraryFuzzyIndex(library_dir, snapshot)
+	match_indices, match_statuses = matcher.resolve(scrobble_keys)
+
+	if not args.batch:
+		# prompts, folder pickers and the lost track search, a batch run never loads any of them
+		import tkinter.filedialog as fd
+		import msg_box
+		from lost_tracks import search_for_lost_track
+
+	count('distinct_tracks', len(scrobble_keys))
+	count('exact_matches', int((match_statuses == MATCH_LIBRARY).sum()))
+	count('lost_and_found_hits', int((match_statuses == MATCH_LOST_AND_FOUND).sum()))
+	count('ignored_tracks', int((match_statuses == IGNORED).sum()))
+	count('unmatched_tracks', int((match_statuses == UNMATCHED).sum()))
+
+	for key_position, ((artist, album, title), match_index, match_status) in enumerate(
+			zip(scrobble_keys, match_indices, match_statuses)):
+
+		if match_status == IGNORED:
+			continue
+
+		elif match_status == UNMATCHED and (artist, album, title) in checkpoint.resolutions:
+			# answered before the last run stopped
+			filepath = checkpoint.resolutions[(artist, album, title)]
+
+			if filepath is IGNORED_TRACK:
+				ignore_list_data.append({'artist': artist, 'album': album, 'title': title})
+				continue
+
+			lost_and_found_track_data.append((filepath, album, artist, title))
+			match_index = matcher.index_of_filepath(filepath)
+
+		elif match_status == UNMATCHED and args.batch:
+			# never stop for a person in batch mode, these get sorted out after the loop
+			batch_unresolved[(artist, album, title)] = key_position
+			continue
+
+		elif match_status == UNMATCHED:
+			try:
+				assert album
+				potential_track_filepath, artist_correction, album_correction, title_correction = search_for_lost_track(library_dir, (artist, album, title), corrections, fuzzy_index)
+
+			except Exception as E:
+				print(artist, album, title, ' was not found, either on purpose or accidentally -- skipping this track and adding to the ignore list')
+				ignore_list_data.append({'artist': artist, 'album': album, 'title': title})
+				checkpoint.resolve((artist, album, title), IGNORED_TRACK)
+				continue
+
+			potential_track_filename = str(potential_track_filepath)
+
+			requires_user_confirm = artist_correction or album_correction
+
+			if requires_user_confirm:
+				if msg_box.Confirm().show(msg=''.join(['Unable to find the track: \n',
+			                                                                 '\n'.join([artist, album, title]),
+			                                                                 '\n is this the right file:\n',
+										                                     potential_track_filename]),
+			                                                    options=('Yes', 'No, find it')):
+					filepath_parts = potential_track_filepath.parts
+					filepath = str(pathlib.Path(r'A:\music').joinpath(*filepath_parts[2:]))
+
+					# kept for every later run, the next time this name comes up it resolves without a prompt
+					corrections.learn((artist, album, title), potential_track_filepath.parts)
+
+				else:
+					filename = fd.askopenfilename()
+					filepath = pathlib.Path(filename)
+					filepath_parts = filepath.parts
+					filepath = str(pathlib.Path(r'A:\music').joinpath(*filepath_parts[2:]))
+
+			else:
+				filepath_parts = potential_track_filepath.parts
+				filepath = str(pathlib.Path(r'A:\music').joinpath(*filepath_parts[2:]))
+
+				if artist_correction or album_correction or title_correction:
+					corrections.learn((artist, album, title), potential_track_filepath.parts)
+
+			track_dict = {
+				'filepath': filepath,
+				'album': album,
+				'artist': artist,
+				'title': title,
+			}
+			track_tup = (filepath, album, artist, title)
+
+			lost_and_found_track_data.append(track_tup)
+			checkpoint.resolve((artist, album, title), filepath)
+			match_index = matcher.index_of_filepath(filepath)
+
+
+		# now that we have matched the scrobble data to a matching file / pandas dataframe row, keep it for the stats
+		match_indices[key_position] = match_index
+
+	if batch_unresolved:
+		accepted, pending = auto_resolve(fuzzy_index, batch_unresolved, args.confidence, corrections)
+
+		for (artist, album, title), filepath in accepted.items():
+			if (match_index := matcher.index_of_filepath(filepath)) == NO_MATCH:
+				pending[(artist, album, title)] = [(1.0, filepath)]
+				continue
+
+			lost_and_found_track_data.append((filepath, album, artist, title))
+			checkpoint.resolve((artist, album, title), filepath)
+			corrections.learn((artist, album, title), pathlib.Path(filepath).parts, save=False)
+			match_indices[batch_unresolved[(artist, album, title)]] = match_index
+
+		if accepted:
+			corrections.save()
+
+		queued = write_review(pending, pathlib.Path(args.review_file))
+		print(len(batch_unresolved), 'unmatched tracks:', len(accepted), 'accepted automatically,', queued,
+		      'new ones queued for review in', args.review_file)
+
+	checkpoint.save()
+
+	run_report.begin('aggregate')
+
+	# the match stage's lookup tables go before the catalog and the reports are built, they hold a tuple per library
+	# track and per distinct scrobble
+	del matcher, fuzzy_index, scrobble_keys
+
+	# fan the per-track matches back out to one entry per scrobble
+	matched_indices, matched_timestamps = expand_matches(match_indices, scrobble_counts, scrobble_timestamps)
+
+	if cube_range is not None:
+		# only the part of the range the cube hasn't seen goes in, -top and -rank-change answer from it later
+		cube = AggregateCube.load(cube_file_for(pathlib.Path(args.cube_dir), local_username), local_username)
+		added = cube.add(mus_lib_df, matched_indices, matched_timestamps, *cube_range,
+		                 unmatched_timestamps(match_indices, match_statuses, scrobble_timestamps))
+		cube.save()
+		print(added, 'scrobbles added to the cube at', cube.path)
+
+	elif not args.no_cube:
+		print('the scrobble store has not synced the start of the range, the cube is left as it is')
+
+	matched_weights = library_krobble_weights(mus_lib_df, matched_indices, matched_timestamps,
+	                                          now=convert_local_datetime_to_unix_timestamp(end_datetime),
+	                                          **krobble_options)
+
+	# the whole range and the period reports group and sort on the same interned ids
+	catalog = TrackCatalog(mus_lib_df)
+	mus_lib_df, title_stats_df, artist_stats_df, album_stats_df = build_reports(mus_lib_df, matched_indices,
+	                                                                            matched_weights, catalog)
+
+	dt_fmt_write = r'%Y-%m-%d_%H-%M-%S'
+	out_dir = pathlib.Path.cwd().joinpath('--'.join(['output', dt.datetime.now().strftime(dt_fmt_write),
+	                                                 start_datetime.strftime(dt_fmt_write),
+	                                                 end_datetime.strftime(dt_fmt_write)]))
+	run_report.begin('write')
+	write_reports(out_dir, title_stats_df, artist_stats_df, album_stats_df)
+
+	if args.periods:
+		# krobble weights are the whole range ones, recency counts back from the end of the whole range
+		periods = split_range(start_datetime, end_datetime, args.periods, convert_local_datetime_to_unix_timestamp)
+		write_period_reports(out_dir, build_period_reports(mus_lib_df, matched_indices, matched_timestamps,
+		                                                   matched_weights, periods, catalog))
+
+	if args.timeseries:
+		write_timeseries_reports(out_dir.joinpath('timeseries'),
+		                         build_timeseries_reports(mus_lib_df, matched_indices, matched_timestamps,
+		                                                  args.rolling_windows, args.rolling_top))
+
+	run_report.begin('logs')
+	lost_and_found_track_data = list(set(lost_and_found_track_data))
+
+	lost_and_found_track_dicts = []
+
+	for filepath, album, artist, title in lost_and_found_track_data:
+		lost_and_found_track_dicts.append({
+			'filepath': filepath,
+			'album': album,
+			'artist': artist,
+			'title': title,
+		})
+
+	# a resumed run doesn't append the same rows twice
+	if lost_and_found_track_dicts and 'lost_and_found' not in checkpoint.logs_written:
+		df = pd.DataFrame(lost_and_found_track_dicts)
+
+		while True:
+			try:
+				if lost_and_found_already_existed:
+					header = False
+					mode = 'a'
+				else:
+					header = True
+					mode = 'w'
+
+				df.to_csv(path_or_buf=lost_and_found_file,
+				          sep=delim_category,
+				          header=header,
+				          mode=mode,
+				          encoding='utf-8',
+				          date_format=dt_fmt,
+				          )
+				break
+
+			except PermissionError as E:
+				print('this will only work in debug mode but close the file you dumbo')
+
+		checkpoint.log_written('lost_and_found')
+
+	if ignore_list_data and 'ignore_list' not in checkpoint.logs_written:
+		df = pd.DataFrame(ignore_list_data)
+
+		while True:
+
+			try:
+				if ignore_list_already_existed:
+					header = False
+					mode = 'a'
+
+				else:
+					header = True
+					mode = 'w'
+
+				df.to_csv(path_or_buf=ignore_list_file,
+				          sep=delim_category,
+				          header=header,
+				          mode=mode,
+				          encoding='utf-8',
+				          date_format=dt_fmt,
+				          )
+
+				break
+
+			except PermissionError as E:
+				print('this will only work in debug mode but close the file you dumbo')
+
+		checkpoint.log_written('ignore_list')
+
+	checkpoint.clear()
+
+	if http_cache is not None:
+		print(http_cache.report())
+		count('http_cache_hits', http_cache.hits)
+		count('http_cache_misses', http_cache.misses)
+		http_cache.close()
+
+	if profile is not None:
+		print('profile written to', profile.write(out_dir))
+
+	print('run report written to', run_report.write(out_dir))
+	return 0
+
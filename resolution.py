@@ -0,0 +1,177 @@
+import pathlib
+import re
+from typing import Dict, Iterable, List, Tuple
+
+import pandas as pd
+
+from corrections import CorrectionStore
+from fuzzy_index import LibraryFuzzyIndex, ratio
+from instrumentation import count
+
+# same formatting as the rest of the csv logs in main.py
+delim_category = '\t'
+dt_fmt = r'%Y-%m-%d_%H-%M'
+
+REVIEW_COLUMNS = ['artist', 'album', 'title', 'rank', 'score', 'filepath', 'decision']
+LOST_AND_FOUND_COLUMNS = ['filepath', 'album', 'artist', 'title']
+IGNORE_LIST_COLUMNS = ['artist', 'album', 'title']
+
+# what goes in the decision column of the review file
+ACCEPT_DECISIONS = {'y', 'yes', 'accept'}
+IGNORE_DECISIONS = {'ignore', 'skip'}
+
+DEFAULT_CONFIDENCE = 0.9
+CANDIDATES_PER_LEVEL = 3
+
+re_album_prefix = re.compile(r'^\[(\d{4})(-(\d{2}))?(-(\d{2}))?\] ')
+re_track_prefix = re.compile(r'^((\d)-)?(\d{2}) ')
+
+TrackKey = Tuple[str, str, str]
+Candidate = Tuple[float, str]
+
+
+def album_folder_title(folder_name: str) -> str:
+	return re_album_prefix.sub('', folder_name)
+
+
+def track_file_title(file_name: str) -> str:
+	return re_track_prefix.sub('', pathlib.Path(file_name).stem)
+
+
+def rank_candidates(index: LibraryFuzzyIndex, key: TrackKey, k: int = 5, per_level: int = CANDIDATES_PER_LEVEL,
+                    artist_folder: str = None) -> List[Candidate]:
+	# every artist x album x track combination of the nearest few at each level, scored by the product of the three
+	# ratios with the date and track number prefixes stripped, best first. artist_folder is one picked for this artist
+	# before, it is taken as right instead of the nearest few artists
+	artist, album, title = key
+	library_dir = index.library_dir
+	candidates = []
+	count('fuzzy_searches')
+
+	if artist_folder is None:
+		artist_matches = [(ratio(artist, name), name) for _, name in index.top(library_dir, artist, 'dirs', per_level)]
+	else:
+		artist_matches = [(1.0, artist_folder)]
+
+	for artist_score, artist_name in artist_matches:
+		artist_dir = library_dir.joinpath(artist_name)
+
+		for _, album_folder in index.top(artist_dir, album, 'dirs', per_level):
+			album_score = ratio(album, album_folder_title(album_folder))
+			album_dir = artist_dir.joinpath(album_folder)
+
+			for _, track_file in index.top(album_dir, title, 'files', per_level):
+				score = artist_score * album_score * ratio(title, track_file_title(track_file))
+				if score > 0:
+					candidates.append((score, str(album_dir.joinpath(track_file))))
+
+	return sorted(candidates, reverse=True)[:k]
+
+
+def append_to_log(rows: List[dict], columns: List[str], log_file: pathlib.Path):
+	if not rows:
+		return
+
+	already_existed = log_file.exists()
+
+	pd.DataFrame(rows, columns=columns).to_csv(path_or_buf=log_file,
+	                                           sep=delim_category,
+	                                           header=not already_existed,
+	                                           mode='a' if already_existed else 'w',
+	                                           encoding='utf-8',
+	                                           date_format=dt_fmt,
+	                                           )
+
+
+def read_review(review_file: pathlib.Path) -> pd.DataFrame:
+	if not review_file.exists():
+		return pd.DataFrame(columns=REVIEW_COLUMNS)
+
+	return pd.read_csv(review_file, sep=delim_category, encoding='utf-8', keep_default_na=False, dtype=str)
+
+
+def write_review(pending: Dict[TrackKey, List[Candidate]], review_file: pathlib.Path) -> int:
+	# one row per candidate, keys already waiting in the file are left alone so earlier decisions survive
+	review_df = read_review(review_file)
+	waiting = set(zip(review_df['artist'], review_df['album'], review_df['title']))
+	rows = []
+
+	for (artist, album, title), candidates in sorted(pending.items()):
+		if (artist, album, title) in waiting:
+			continue
+
+		if not candidates:
+			candidates = [(0.0, '')]
+
+		for rank, (score, filepath) in enumerate(candidates, start=1):
+			rows.append({'artist': artist, 'album': album, 'title': title, 'rank': rank, 'score': f'{score:.3f}',
+			             'filepath': filepath, 'decision': ''})
+
+	review_df = pd.concat([review_df, pd.DataFrame(rows, columns=REVIEW_COLUMNS)], ignore_index=True)
+	review_df.to_csv(review_file, sep=delim_category, header=True, index=False, mode='w', encoding='utf-8')
+	return len({(r['artist'], r['album'], r['title']) for r in rows})
+
+
+def apply_review(review_file: pathlib.Path, lost_and_found_file: pathlib.Path, ignore_list_file: pathlib.Path,
+                 corrections: CorrectionStore = None) -> Tuple[int, int, int]:
+	# accepted rows go to the lost and found log, ignored keys to the ignore list, undecided keys stay in the file.
+	# accepted files are remembered in corrections too, so the same names resolve without a review next time
+	review_df = read_review(review_file)
+	found_rows, ignore_rows, undecided = [], [], []
+
+	for (artist, album, title), rows in review_df.groupby(['artist', 'album', 'title'], sort=False):
+		decisions = rows['decision'].str.strip().str.lower()
+		accepted = rows.loc[decisions.isin(ACCEPT_DECISIONS)]
+
+		if not accepted.empty:
+			found_rows.append({'filepath': accepted['filepath'].iloc[0], 'album': album, 'artist': artist,
+			                   'title': title})
+
+			# a bare file name, typed in by hand, has no folders to remember
+			if corrections is not None and len(filepath_parts := pathlib.Path(found_rows[-1]['filepath']).parts) >= 3:
+				corrections.learn((artist, album, title), filepath_parts, save=False)
+
+		elif decisions.isin(IGNORE_DECISIONS).any():
+			ignore_rows.append({'artist': artist, 'album': album, 'title': title})
+
+		else:
+			undecided.append(rows)
+
+	append_to_log(found_rows, LOST_AND_FOUND_COLUMNS, lost_and_found_file)
+	append_to_log(ignore_rows, IGNORE_LIST_COLUMNS, ignore_list_file)
+
+	remaining = pd.concat(undecided) if undecided else pd.DataFrame(columns=REVIEW_COLUMNS)
+	remaining.to_csv(review_file, sep=delim_category, header=True, index=False, mode='w', encoding='utf-8')
+
+	if corrections is not None and found_rows:
+		corrections.save()
+
+	return len(found_rows), len(ignore_rows), len(undecided)
+
+
+def auto_resolve(index: LibraryFuzzyIndex, keys: Iterable[TrackKey], confidence: float = DEFAULT_CONFIDENCE,
+                 corrections: CorrectionStore = None) -> Tuple[Dict[TrackKey, str], Dict[TrackKey, List[Candidate]]]:
+	# (accepted key -> filepath, everything else -> its ranked candidates for the review file). a file remembered in
+	# corrections is accepted as it is, as long as it is still there, and a remembered artist folder narrows the search
+	accepted, pending = {}, {}
+
+	for key in keys:
+		if corrections is not None and (track := corrections.track_path(index.library_dir, key)) is not None \
+				and track.name in index.audio_files(track.parent):
+			count('correction_hits')
+			accepted[key] = str(track)
+			continue
+
+		artist_folder = corrections.artist_folder(key[0]) if corrections is not None else None
+
+		try:
+			candidates = rank_candidates(index, key, artist_folder=artist_folder) if key[1] else []
+		except (OSError, IndexError):
+			candidates = []
+
+		if candidates and candidates[0][0] >= confidence:
+			accepted[key] = candidates[0][1]
+		else:
+			pending[key] = candidates
+
+	return accepted, pending
@@ -0,0 +1,156 @@
+import pathlib
+import sqlite3
+import time
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from lastfm_api import Scrobble
+
+# the open end of a sync gets rounded down to this, so running the same report twice in a row asks last.fm nothing
+SYNC_GRANULARITY = 5 * 60
+
+# fetch(time_from, time_to) -> scrobbles in that range a page at a time, both ends inclusive unix timestamps
+Fetcher = Callable[[int, int], Iterable[List[Scrobble]]]
+
+# scrobbles read back per round trip when streaming them out of the store
+CHUNK_SIZE = 50_000
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS scrobbles (
+	user TEXT NOT NULL,
+	timestamp INTEGER NOT NULL,
+	artist TEXT NOT NULL,
+	album TEXT NOT NULL,
+	title TEXT NOT NULL,
+	PRIMARY KEY (user, timestamp)
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+	user TEXT PRIMARY KEY,
+	synced_from INTEGER NOT NULL,
+	synced_to INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS partial_sync (
+	user TEXT PRIMARY KEY,
+	range_from INTEGER NOT NULL,
+	range_to INTEGER NOT NULL,
+	fetched_from INTEGER NOT NULL
+);
+'''
+
+
+class ScrobbleStore:
+
+	def __init__(self, path: pathlib.Path):
+		self.path = pathlib.Path(path)
+		self.path.parent.mkdir(parents=True, exist_ok=True)
+		self.connection = sqlite3.connect(str(self.path), timeout=60)
+		self.connection.executescript(SCHEMA)
+
+	def close(self):
+		self.connection.close()
+
+	def coverage(self, username: str) -> Optional[Tuple[int, int]]:
+		# (synced_from, synced_to), every scrobble in between is known to be stored
+		row = self.connection.execute('SELECT synced_from, synced_to FROM sync_state WHERE user = ?',
+		                              (username,)).fetchone()
+		return tuple(row) if row else None
+
+	def covers(self, username: str, time_from: int, time_to: int) -> bool:
+		coverage = self.coverage(username)
+		return coverage is not None and coverage[0] <= time_from and time_to <= coverage[1]
+
+	def _insert(self, username: str, scrobbles: Iterable[Scrobble]):
+		self.connection.executemany(
+			'INSERT OR IGNORE INTO scrobbles (user, timestamp, artist, album, title) VALUES (?, ?, ?, ?, ?)',
+			((username, s.timestamp, s.artist, s.album, s.title) for s in scrobbles))
+
+	def insert(self, username: str, scrobbles: Iterable[Scrobble]):
+		with self.connection:
+			self._insert(username, scrobbles)
+
+	def _extend(self, username: str, synced_from: int, synced_to: int):
+		coverage = self.coverage(username)
+
+		if coverage:
+			synced_from, synced_to = min(coverage[0], synced_from), max(coverage[1], synced_to)
+
+		self.connection.execute(
+			'INSERT OR REPLACE INTO sync_state (user, synced_from, synced_to) VALUES (?, ?, ?)',
+			(username, synced_from, synced_to))
+
+	def add(self, username: str, scrobbles: Iterable[Scrobble], synced_from: int, synced_to: int):
+		# scrobbles and the coverage they extend land together or not at all
+		with self.connection:
+			self._insert(username, scrobbles)
+			self._extend(username, synced_from, synced_to)
+
+	def iter_scrobbles(self, username: str, time_from: int, time_to: int,
+	                   chunk_size: int = CHUNK_SIZE) -> Iterator[List[Scrobble]]:
+		# oldest first, chunk_size at a time
+		cursor = self.connection.execute(
+			'SELECT timestamp, artist, album, title FROM scrobbles '
+			'WHERE user = ? AND timestamp BETWEEN ? AND ? ORDER BY timestamp',
+			(username, time_from, time_to))
+
+		while rows := cursor.fetchmany(chunk_size):
+			yield [Scrobble(*row) for row in rows]
+
+	def scrobbles(self, username: str, time_from: int, time_to: int) -> List[Scrobble]:
+		return [s for chunk in self.iter_scrobbles(username, time_from, time_to) for s in chunk]
+
+	def partial(self, username: str) -> Optional[Tuple[int, int, int]]:
+		# (range_from, range_to, fetched_from) of a sync that died partway, [fetched_from, range_to] is stored
+		row = self.connection.execute('SELECT range_from, range_to, fetched_from FROM partial_sync WHERE user = ?',
+		                              (username,)).fetchone()
+		return tuple(row) if row else None
+
+	def _fetch_range(self, username: str, fetch: Fetcher, range_from: int, range_to: int, fetch_to: int) -> int:
+		# [range_from, fetch_to] of the range [range_from, range_to], the rest of it is stored already. last.fm hands
+		# out pages newest first, each page lands together with how far back the stored part now reaches, so a sync
+		# that dies partway only has the older end left to fetch. the coverage moves once the whole range is in
+		fetched = 0
+
+		if range_from <= fetch_to:
+			for page in fetch(range_from, fetch_to):
+				with self.connection:
+					self._insert(username, page)
+
+					if page:
+						self.connection.execute(
+							'INSERT OR REPLACE INTO partial_sync (user, range_from, range_to, fetched_from) '
+							'VALUES (?, ?, ?, ?)', (username, range_from, range_to, min(s.timestamp for s in page)))
+
+				fetched += len(page)
+
+		with self.connection:
+			self.connection.execute('DELETE FROM partial_sync WHERE user = ?', (username,))
+			self._extend(username, range_from, range_to)
+
+		return fetched
+
+	def sync(self, username: str, fetch: Fetcher, time_from: int, now: int = None) -> int:
+		# only ask last.fm for what isn't stored yet, newer scrobbles and anything before the first sync
+		now = int(time.time()) if now is None else now
+		now -= now % SYNC_GRANULARITY
+		fetched = 0
+
+		# a sync that died partway is finished first, with the end it had back then
+		if partial := self.partial(username):
+			range_from, range_to, fetched_from = partial
+			print('resuming an unfinished sync,', fetched_from - range_from, 'seconds of scrobbles left to fetch')
+			fetched += self._fetch_range(username, fetch, range_from, range_to, fetched_from - 1)
+
+		coverage = self.coverage(username)
+
+		if coverage is None:
+			missing = [(time_from, now)]
+		else:
+			missing = [(time_from, coverage[0] - 1)] if time_from < coverage[0] else []
+			missing.append((coverage[1] + 1, now))
+
+		for range_from, range_to in missing:
+			if range_from > range_to:
+				continue
+
+			fetched += self._fetch_range(username, fetch, range_from, range_to, range_to)
+
+		return fetched
@@ -0,0 +1,150 @@
+import abc
+import os
+import pathlib
+
+import pandas as pd
+
+# same formatting as the rest of the csv logs in main.py
+delim_category = '\t'
+delim_artist_mp3 = r' / '
+dt_fmt = r'%Y-%m-%d_%H-%M'
+
+CATEGORICAL_COLUMNS = ['artist', 'first_artist', 'album', 'album_artist']
+# tuples from the tag readers, stored as their csv text so every format reads back the same values
+TEXT_COLUMNS = ['disc_num', 'track_num', 'bit_rate', 'release_date', 'original_artist']
+
+
+def _require_pyarrow():
+	try:
+		import pyarrow
+	except ImportError as E:
+		raise ImportError('pyarrow is needed for .feather and .parquet library logs, use a .csv log instead or '
+		                  'pip install pyarrow') from E
+
+	return pyarrow
+
+
+def prepare_library_frame(df: pd.DataFrame) -> pd.DataFrame:
+	df = df.drop(columns=[c for c in df.columns if str(c).startswith('Unnamed')])
+
+	if 'first_artist' not in df.columns and 'artist' in df.columns:
+		df['first_artist'] = [x.split(delim_artist_mp3)[0] if isinstance(x, str) else x for x in df['artist']]
+
+	for column in TEXT_COLUMNS:
+		if column in df.columns:
+			df[column] = [None if pd.isna(x) else str(x) for x in df[column]]
+
+	for column in CATEGORICAL_COLUMNS:
+		if column in df.columns:
+			df[column] = df[column].astype('category')
+
+	if 'time_secs' in df.columns:
+		df['time_secs'] = pd.to_numeric(df['time_secs'], errors='coerce')
+
+	return df
+
+
+class LibraryStore(abc.ABC):
+	# one subclass per file format, picked by suffix
+	suffix = None
+
+	def __init__(self, path: pathlib.Path):
+		self.path = pathlib.Path(path)
+
+	def exists(self) -> bool:
+		return self.path.exists()
+
+	@abc.abstractmethod
+	def read(self) -> pd.DataFrame:
+		...
+
+	@abc.abstractmethod
+	def _write(self, df: pd.DataFrame, path: pathlib.Path):
+		...
+
+	def write(self, df: pd.DataFrame):
+		# write next to the real file first so a crash never leaves half a library log behind
+		df = prepare_library_frame(df).reset_index(drop=True)
+		tmp_path = self.path.with_name(self.path.name + '.tmp')
+		self._write(df, tmp_path)
+		os.replace(tmp_path, self.path)
+
+
+class CsvStore(LibraryStore):
+	suffix = '.csv'
+
+	def read(self) -> pd.DataFrame:
+		df = pd.read_csv(
+			filepath_or_buffer=self.path,
+			sep=delim_category,
+			encoding='utf-8',
+		)
+
+		return prepare_library_frame(df)
+
+	def _write(self, df: pd.DataFrame, path: pathlib.Path):
+		df.to_csv(path_or_buf=path,
+		          sep=delim_category,
+		          header=True,
+		          mode='w',
+		          encoding='utf-8',
+		          date_format=dt_fmt,
+		          )
+
+
+class FeatherStore(LibraryStore):
+	suffix = '.feather'
+
+	def read(self) -> pd.DataFrame:
+		_require_pyarrow()
+		from pyarrow import feather
+
+		# uncompressed feather maps straight off the disk
+		return feather.read_table(self.path, memory_map=True).to_pandas()
+
+	def _write(self, df: pd.DataFrame, path: pathlib.Path):
+		_require_pyarrow()
+		from pyarrow import feather
+
+		feather.write_feather(df, path, compression='uncompressed')
+
+
+class ParquetStore(LibraryStore):
+	suffix = '.parquet'
+
+	def read(self) -> pd.DataFrame:
+		_require_pyarrow()
+		import pyarrow.parquet as pq
+
+		return pq.read_table(self.path, memory_map=True).to_pandas()
+
+	def _write(self, df: pd.DataFrame, path: pathlib.Path):
+		_require_pyarrow()
+		import pyarrow.parquet as pq
+		import pyarrow as pa
+
+		pq.write_table(pa.Table.from_pandas(df, preserve_index=False), path)
+
+
+STORES = {store.suffix: store for store in (CsvStore, FeatherStore, ParquetStore)}
+
+
+def open_store(path: pathlib.Path) -> LibraryStore:
+	path = pathlib.Path(path)
+
+	try:
+		return STORES[path.suffix.lower()](path)
+
+	except KeyError:
+		raise Exception(''.join(['Unknown library log format ', path.suffix, ', use one of ', ', '.join(STORES)]))
+
+
+def migrate_library_log(source: pathlib.Path, destination: pathlib.Path) -> pd.DataFrame:
+	df = open_store(source).read()
+	open_store(destination).write(df)
+	return df
+
+
+def legacy_csv_for(path: pathlib.Path) -> pathlib.Path:
+	# where the old tab separated library log would sit before moving to a binary format
+	return pathlib.Path(path).with_suffix('.csv')
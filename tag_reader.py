@@ -0,0 +1,339 @@
+import os
+import re
+from collections import namedtuple
+from typing import Iterable, Iterator, Optional, Tuple
+
+# reads just the ID3v2 text frames and the first mpeg frame header that the library log needs, so nothing like a full
+# eyed3 AudioFile ever gets built. values come out shaped the same way eyed3 hands them to the csv writer.
+
+# fast is this module, eyed3 loads the whole file through eyed3
+TAG_READERS = ('fast', 'eyed3')
+
+# same name and fields as eyed3.core.CountAndTotalTuple so the library log reads the same either way
+CountAndTotalTuple = namedtuple('CountAndTotalTuple', 'count, total')
+
+RECORD_FIELDS = (
+	'filepath',
+	'album',
+	'album_artist',
+	'artist',
+	'title',
+	'disc_num',
+	'original_artist',
+	'release_date',
+	'track_num',
+	'bit_rate',
+	'time_secs',
+)
+
+# frame id -> record field, v2.3/v2.4 ids first then the three letter v2.2 ids
+TEXT_FRAMES = {
+	b'TALB': 'album',
+	b'TPE2': 'album_artist',
+	b'TPE1': 'artist',
+	b'TIT2': 'title',
+	b'TPOS': 'disc_num',
+	b'TOPE': 'original_artist',
+	b'TRCK': 'track_num',
+	b'TAL': 'album',
+	b'TP2': 'album_artist',
+	b'TP1': 'artist',
+	b'TT2': 'title',
+	b'TPA': 'disc_num',
+	b'TOA': 'original_artist',
+	b'TRK': 'track_num',
+}
+
+# eyed3 reads release_date from TDRL on v2.4 tags and falls back to the original release frames on v2.3
+RELEASE_DATE_FRAMES = {
+	(2, 2): (b'TOR',),
+	(2, 3): (b'XDOR', b'TORY'),
+	(2, 4): (b'TDRL',),
+}
+
+TEXT_ENCODINGS = {
+	0: 'latin-1',
+	1: 'utf-16',
+	2: 'utf-16-be',
+	3: 'utf-8',
+}
+
+# kbps by [mpeg1?][layer]
+BIT_RATES = {
+	(True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+	(True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+	(True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+	(False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+	(False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+	(False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+SAMPLE_RATES = {
+	1.0: (44100, 48000, 32000),
+	2.0: (22050, 24000, 16000),
+	2.5: (11025, 12000, 8000),
+}
+# samples per frame by [mpeg1 or cbr?][layer], eyed3 only uses the mpeg2 row for vbr files
+SAMPLES_PER_FRAME = {
+	True: {1: 384, 2: 1152, 3: 1152},
+	False: {1: 384, 2: 1152, 3: 576},
+}
+
+MPEG_SEARCH_BYTES = 64 * 1024
+re_vbr_header = re.compile(b'Xing|Info|VBRI')
+
+
+class TrackRecord:
+	__slots__ = RECORD_FIELDS
+
+	def __init__(self, filepath: str):
+		for field in RECORD_FIELDS:
+			setattr(self, field, None)
+
+		self.filepath = filepath
+
+	def as_tuple(self) -> tuple:
+		return tuple(getattr(self, field) for field in RECORD_FIELDS)
+
+	def as_dict(self) -> dict:
+		return {field: getattr(self, field) for field in RECORD_FIELDS}
+
+
+def _syncsafe(b: bytes) -> int:
+	return (b[0] << 21) | (b[1] << 14) | (b[2] << 7) | b[3]
+
+
+def _decode_text(data: bytes) -> Optional[str]:
+	if not data:
+		return None
+
+	encoding = TEXT_ENCODINGS.get(data[0], 'latin-1')
+
+	try:
+		text = data[1:].decode(encoding)
+	except UnicodeDecodeError:
+		text = data[1:].decode(encoding, errors='replace')
+
+	# v2.4 allows several null separated values, the library already uses ' / ' for that
+	values = [x for x in text.split('\x00') if x]
+	return ' / '.join(values) if values else None
+
+
+def _split_num(text: Optional[str]) -> CountAndTotalTuple:
+	first, second = None, None
+
+	if text:
+		n = text.split('/')
+
+		try:
+			first = int(n[0])
+			second = int(n[1]) if len(n) == 2 else None
+		except ValueError:
+			pass
+
+	return CountAndTotalTuple(first, second)
+
+
+def _read_id3v2(f, record: TrackRecord) -> int:
+	# returns the offset where the audio starts, 0 if there is no v2 tag
+	header = f.read(10)
+
+	if len(header) < 10 or header[:3] != b'ID3':
+		return 0
+
+	major = header[3]
+	flags = header[5]
+	tag_size = _syncsafe(header[6:10])
+	audio_start = 10 + tag_size + (10 if flags & 0x10 else 0)
+
+	if major not in (2, 3, 4):
+		return audio_start
+
+	body = f.read(tag_size)
+
+	# tag wide unsynchronisation, v2.4 does it per frame instead
+	if flags & 0x80 and major < 4:
+		body = body.replace(b'\xff\x00', b'\xff')
+
+	pos = 0
+
+	if flags & 0x40 and major > 2:
+		ext_size = _syncsafe(body[:4]) if major == 4 else int.from_bytes(body[:4], 'big') + 4
+		pos = ext_size
+
+	id_len, header_len = (3, 6) if major == 2 else (4, 10)
+	release_date_frames = RELEASE_DATE_FRAMES[(2, major)]
+	release_dates = {}
+	texts = {}
+
+	while pos + header_len <= len(body):
+		frame_id = body[pos:pos + id_len]
+
+		if not frame_id.strip(b'\x00'):
+			break   # padding
+
+		if major == 2:
+			frame_size = int.from_bytes(body[pos + 3:pos + 6], 'big')
+			frame_flags = 0
+		elif major == 3:
+			frame_size = int.from_bytes(body[pos + 4:pos + 8], 'big')
+			frame_flags = int.from_bytes(body[pos + 8:pos + 10], 'big')
+		else:
+			frame_size = _syncsafe(body[pos + 4:pos + 8])
+			frame_flags = int.from_bytes(body[pos + 8:pos + 10], 'big')
+
+		data = body[pos + header_len:pos + header_len + frame_size]
+		pos += header_len + frame_size
+
+		if frame_id not in TEXT_FRAMES and frame_id not in release_date_frames:
+			continue
+
+		# skip compressed or encrypted frames, unsync and data length indicators are cheap to undo
+		if major == 4:
+			if frame_flags & 0x000c:
+				continue
+
+			if frame_flags & 0x0001:
+				data = data[4:]
+
+			if frame_flags & 0x0002:
+				data = data.replace(b'\xff\x00', b'\xff')
+
+		elif major == 3 and frame_flags & 0x00c0:
+			continue
+
+		if frame_id in release_date_frames:
+			release_dates[frame_id] = _decode_text(data)
+		else:
+			texts.setdefault(TEXT_FRAMES[frame_id], _decode_text(data))
+
+	for field, text in texts.items():
+		setattr(record, field, text)
+
+	record.disc_num = _split_num(texts.get('disc_num'))
+	record.track_num = _split_num(texts.get('track_num'))
+
+	for frame_id in release_date_frames:
+		if release_dates.get(frame_id):
+			record.release_date = release_dates[frame_id]
+			break
+
+	return audio_start
+
+
+def _parse_mpeg_header(h: int) -> Optional[Tuple[float, int, int, int, int]]:
+	if (h >> 21) & 0x7ff != 0x7ff:
+		return None
+
+	version = (2.5, None, 2.0, 1.0)[(h >> 19) & 0x3]
+	layer = (None, 3, 2, 1)[(h >> 17) & 0x3]
+	bit_rate_index = (h >> 12) & 0xf
+	sample_rate_index = (h >> 10) & 0x3
+
+	if version is None or layer is None or bit_rate_index in (0, 15) or sample_rate_index == 3:
+		return None
+
+	bit_rate = BIT_RATES[(version == 1.0, layer)][bit_rate_index]
+	sample_freq = SAMPLE_RATES[version][sample_rate_index]
+	padding = (h >> 9) & 0x1
+
+	if layer == 1:
+		frame_length = int((((12 * bit_rate * 1000) / sample_freq) + padding * 4) * 4)
+	else:
+		frame_length = int(((144 * bit_rate * 1000) / sample_freq) + padding)
+
+	return version, layer, bit_rate, sample_freq, frame_length
+
+
+def _find_mpeg_frame(buffer: bytes) -> Tuple[int, Optional[tuple]]:
+	pos = buffer.find(b'\xff')
+
+	while 0 <= pos < len(buffer) - 4:
+		header = _parse_mpeg_header(int.from_bytes(buffer[pos:pos + 4], 'big'))
+
+		if header:
+			return pos, header
+
+		pos = buffer.find(b'\xff', pos + 1)
+
+	return -1, None
+
+
+def _read_audio_info(f, record: TrackRecord, audio_start: int, has_v2_tag: bool):
+	size_bytes = os.fstat(f.fileno()).st_size
+	f.seek(audio_start)
+	buffer = f.read(MPEG_SEARCH_BYTES)
+
+	pos, header = _find_mpeg_frame(buffer)
+
+	if header is None:
+		return
+
+	version, layer, bit_rate, sample_freq, frame_length = header
+	frame = buffer[pos:pos + frame_length]
+	vbr_frames, vbr_bytes = None, None
+
+	if (match := re_vbr_header.search(frame)) is not None:
+		tag_id = match.group()
+		data = frame[match.end():]
+
+		if tag_id == b'Xing' and len(data) >= 4:
+			xing_flags = int.from_bytes(data[:4], 'big')
+			offset = 4
+
+			if xing_flags & 0x1:
+				vbr_frames = int.from_bytes(data[offset:offset + 4], 'big')
+				offset += 4
+
+			if xing_flags & 0x2:
+				vbr_bytes = int.from_bytes(data[offset:offset + 4], 'big')
+
+		elif tag_id == b'VBRI' and len(data) >= 14 and int.from_bytes(data[:2], 'big') == 1:
+			vbr_bytes = int.from_bytes(data[6:10], 'big')
+			vbr_frames = int.from_bytes(data[10:14], 'big')
+
+	if vbr_frames:
+		time_per_frame = SAMPLES_PER_FRAME[version == 1.0][layer] / sample_freq
+		record.time_secs = time_per_frame * vbr_frames
+
+		if vbr_bytes:
+			record.bit_rate = (True, int((vbr_bytes * 8) / (time_per_frame * vbr_frames * 1000)))
+		else:
+			record.bit_rate = (False, bit_rate)
+
+	else:
+		time_per_frame = SAMPLES_PER_FRAME[True][layer] / sample_freq
+		length = size_bytes - audio_start
+
+		if not has_v2_tag:
+			f.seek(-128, os.SEEK_END)
+
+			if f.read(3) == b'TAG':
+				length -= 128
+
+		record.time_secs = (length / frame_length) * time_per_frame
+		record.bit_rate = (False, bit_rate)
+
+
+def read_track_record(filepath: str) -> Optional[TrackRecord]:
+	record = TrackRecord(filepath)
+
+	try:
+		with open(filepath, 'rb') as f:
+			audio_start = _read_id3v2(f, record)
+			_read_audio_info(f, record, audio_start, audio_start > 0)
+
+	except (OSError, IndexError, ValueError):
+		return None
+
+	# eyed3 truncates to hundredths
+	if record.time_secs is not None:
+		record.time_secs = int(record.time_secs * 100.0) / 100.0
+
+	return record
+
+
+def iter_track_records(filepaths: Iterable[str]) -> Iterator[TrackRecord]:
+	# one record alive at a time, callers decide what to keep
+	for filepath in filepaths:
+		if (record := read_track_record(filepath)) is not None:
+			yield record
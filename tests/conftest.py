@@ -0,0 +1,5 @@
+import pathlib
+import sys
+
+# the modules sit flat in the repository root, the same way main.py imports them
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+from batch_runner import UserJob, run_users
+from corrections import CorrectionStore
+from cube import AggregateCube, cube_file_for
+from dir_snapshot import DirectorySnapshot
+from lastfm_api import Scrobble
+from scrobble_store import ScrobbleStore
+
+JANUARY = 1_704_067_200
+FEBRUARY = JANUARY + 31 * 86400
+MARCH = FEBRUARY + 29 * 86400
+
+
+def test_two_ranges_of_one_user_both_land_in_the_cube(tmp_path):
+	library_df = pd.DataFrame({
+		'filepath': ['a.mp3', 'b.mp3'],
+		'artist': ['artist a', 'artist b'],
+		'album_artist': ['artist a', 'artist b'],
+		'album': ['album a', 'album b'],
+		'title': ['title a', 'title b'],
+		'time_secs': [200.0, 100.0],
+	})
+
+	store = ScrobbleStore(tmp_path.joinpath('scrobbles.sqlite'))
+	store.add('user', [Scrobble(JANUARY + 3600, 'artist a', 'album a', 'title a'),
+	                   Scrobble(FEBRUARY + 3600, 'artist b', 'album b', 'title b'),
+	                   Scrobble(FEBRUARY + 7200, 'artist b', 'album b', 'title b')], JANUARY, MARCH)
+	store.close()
+
+	jobs = [UserJob('user', time_from, time_to - 1, tmp_path.joinpath('out', str(time_from)))
+	        for time_from, time_to in ((JANUARY, FEBRUARY), (FEBRUARY, MARCH))]
+	settings = {
+		'api_key': None, 'api_root': None, 'offline': True, 'fetch_workers': 1,
+		'scrobble_db': tmp_path.joinpath('scrobbles.sqlite'), 'http_cache': None, 'http_cache_size': 0,
+		'confidence': 0.9, 'krobble_options': {}, 'timeseries': None, 'cube_dir': tmp_path.joinpath('cubes'),
+	}
+
+	results = run_users(jobs, library_df, pd.DataFrame(), pd.DataFrame(), DirectorySnapshot(tmp_path),
+	                    CorrectionStore(tmp_path.joinpath('corrections.json')), settings, processes=2)
+	assert [result.get('error') for result in results] == [None, None]
+
+	# one worker ran both ranges, neither cube save lost the other's scrobbles
+	cube = AggregateCube.load(cube_file_for(tmp_path.joinpath('cubes'), 'user'), 'user')
+	assert cube.coverage == [[JANUARY, MARCH - 1]]
+	assert cube.totals('artists', 0, 10 ** 6)['play_count'].tolist() == [1, 2]
+	assert np.all([job.out_dir.joinpath('run_report.json').exists() for job in jobs])
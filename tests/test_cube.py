@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+from cube import AggregateCube, cube_file_for, synced_range
+from lastfm_api import Scrobble
+from scrobble_store import SYNC_GRANULARITY, ScrobbleStore
+
+MONTH_FROM = 1_700_000_000
+MONTH_TO = MONTH_FROM + 30 * 86400 - 1
+
+
+def library():
+	return pd.DataFrame({
+		'filepath': ['a.mp3', 'b.mp3'],
+		'artist': ['artist a', 'artist b'],
+		'album_artist': ['artist a', 'artist b'],
+		'album': ['album a', 'album b'],
+		'title': ['title a', 'title b'],
+		'time_secs': [200.0, 100.0],
+	})
+
+
+def report_run(tmp_path, store, history, now, unmatched=()):
+	# what a report over the whole month does with the cube: sync, then add what the store holds for the range
+	store.sync('user', lambda f, t: [[s for s in history if f <= s.timestamp <= t]], MONTH_FROM, now=now)
+	scrobbles = store.scrobbles('user', MONTH_FROM, MONTH_TO)
+	matched = [s for s in scrobbles if s.title not in unmatched]
+	cube = AggregateCube.load(cube_file_for(tmp_path, 'user'), 'user')
+	added = cube.add(library(), np.array([0 if s.title == 'title a' else 1 for s in matched]),
+	                 np.array([s.timestamp for s in matched]), *synced_range(store, 'user', MONTH_FROM, MONTH_TO),
+	                 np.array([s.timestamp for s in scrobbles if s.title in unmatched]))
+	cube.save()
+	return added, cube
+
+
+def test_later_scrobbles_in_the_current_range_still_get_added(tmp_path):
+	store = ScrobbleStore(tmp_path.joinpath('scrobbles.sqlite'))
+	history = [Scrobble(MONTH_FROM + 3600, 'artist a', 'album a', 'title a'),
+	           Scrobble(MONTH_FROM + 7200, 'artist b', 'album b', 'title b')]
+	first_now = MONTH_FROM + 10 * 86400
+
+	added, cube = report_run(tmp_path, store, history, first_now)
+	assert added == 2
+	assert cube.coverage == [[MONTH_FROM, first_now - first_now % SYNC_GRANULARITY]]
+
+	# scrobbled after the first run, inside the same month
+	history.append(Scrobble(MONTH_FROM + 12 * 86400, 'artist a', 'album a', 'title a'))
+	added, cube = report_run(tmp_path, store, history, MONTH_FROM + 20 * 86400)
+	assert added == 1
+	assert cube.totals('artists', 0, 10 ** 6)['play_count'].tolist() == [2, 1]
+	store.close()
+
+
+def test_pending_scrobbles_are_added_once_they_match(tmp_path):
+	store = ScrobbleStore(tmp_path.joinpath('scrobbles.sqlite'))
+	history = [Scrobble(MONTH_FROM + 3600, 'artist a', 'album a', 'title a'),
+	           Scrobble(MONTH_FROM + 7200, 'artist b', 'album b', 'title b')]
+	now = MONTH_TO + 86400
+
+	added, cube = report_run(tmp_path, store, history, now, unmatched=('title b',))
+	assert added == 1
+	assert cube.pending.tolist() == [MONTH_FROM + 7200]
+
+	# the review decided where title b lives, the same range run again picks it up and nothing twice
+	added, cube = report_run(tmp_path, store, history, now)
+	assert added == 1
+	assert len(cube.pending) == 0
+	assert cube.totals('artists', 0, 10 ** 6)['play_count'].tolist() == [1, 1]
+	store.close()
+
+
+def test_nothing_is_covered_before_the_store_reaches_the_range(tmp_path):
+	store = ScrobbleStore(tmp_path.joinpath('scrobbles.sqlite'))
+	assert synced_range(store, 'user', MONTH_FROM, MONTH_TO) is None
+
+	store.add('user', [], MONTH_FROM + 86400, MONTH_FROM + 2 * 86400)
+	assert synced_range(store, 'user', MONTH_FROM, MONTH_TO) is None
+	store.close()
@@ -0,0 +1,42 @@
+import pytest
+import requests
+
+from fetcher import with_retries
+from lastfm_api import LastFMError
+
+
+def failing(*errors):
+	calls = []
+
+	def f():
+		calls.append(None)
+
+		if len(calls) <= len(errors):
+			raise errors[len(calls) - 1]
+
+		return 'page'
+
+	return f, calls
+
+
+def http_error(status: int) -> requests.HTTPError:
+	response = requests.Response()
+	response.status_code = status
+	return requests.HTTPError(response=response)
+
+
+def test_transient_errors_are_retried():
+	f, calls = failing(LastFMError(29, 'Rate limit exceeded'), requests.ConnectionError(), http_error(503))
+	assert with_retries(f, retries=3, backoff=0) == 'page'
+	assert len(calls) == 4
+
+
+@pytest.mark.parametrize('error', [LastFMError(6, 'User not found'), LastFMError(10, 'Invalid API key'),
+                                   http_error(404), ValueError('not json')])
+def test_other_errors_fail_at_once(error):
+	f, calls = failing(error)
+
+	with pytest.raises(type(error)):
+		with_retries(f, retries=3, backoff=0)
+
+	assert len(calls) == 1
@@ -0,0 +1,42 @@
+import pandas as pd
+
+from corrections import CorrectionStore
+from fuzzy_index import LibraryFuzzyIndex
+from resolution import REVIEW_COLUMNS, apply_review, auto_resolve
+
+
+def library(tmp_path):
+	album_dir = tmp_path.joinpath('library', 'Sigur Rós', '[2002] ( )')
+	album_dir.mkdir(parents=True)
+	album_dir.joinpath('01 Untitled 1.mp3').touch()
+	album_dir.joinpath('02 Untitled 2.mp3').touch()
+	return tmp_path.joinpath('library'), album_dir
+
+
+def test_a_remembered_artist_folder_narrows_the_search(tmp_path):
+	library_dir, album_dir = library(tmp_path)
+	corrections = CorrectionStore(tmp_path.joinpath('corrections.json'))
+	key = ('Jónsi & friends', '( )', 'Untitled 2')
+
+	accepted, pending = auto_resolve(LibraryFuzzyIndex(library_dir), [key], 0.9, corrections)
+	assert key in pending
+
+	corrections.learn(('Jónsi & friends', '( )', 'Untitled 1'), album_dir.joinpath('01 Untitled 1.mp3').parts)
+	accepted, pending = auto_resolve(LibraryFuzzyIndex(library_dir), [key], 0.9, corrections)
+	assert accepted == {key: str(album_dir.joinpath('02 Untitled 2.mp3'))}
+
+
+def test_accepted_review_rows_are_remembered(tmp_path):
+	library_dir, album_dir = library(tmp_path)
+	filepath = str(album_dir.joinpath('01 Untitled 1.mp3'))
+	key = ('sigur ros', 'untitled', 'track one')
+	pd.DataFrame([[*key, '1', '0.400', filepath, 'y']], columns=REVIEW_COLUMNS).to_csv(
+		tmp_path.joinpath('review.csv'), sep='\t', index=False)
+
+	corrections = CorrectionStore(tmp_path.joinpath('corrections.json'))
+	assert apply_review(tmp_path.joinpath('review.csv'), tmp_path.joinpath('lost_and_found.csv'),
+	                    tmp_path.joinpath('ignore.csv'), corrections) == (1, 0, 0)
+
+	# read back from disk, and the next run takes the file without a search
+	corrections = CorrectionStore(tmp_path.joinpath('corrections.json'))
+	assert auto_resolve(LibraryFuzzyIndex(library_dir), [key], 0.9, corrections) == ({key: filepath}, {})
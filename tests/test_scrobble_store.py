@@ -0,0 +1,45 @@
+import pytest
+
+from lastfm_api import Scrobble
+from scrobble_store import ScrobbleStore
+
+# a multiple of SYNC_GRANULARITY so the sync ends exactly there
+NOW = 1_699_999_800
+
+
+class Crash(Exception):
+	pass
+
+
+def pages(history, time_from, time_to, per_page, calls, fail_after=None):
+	# newest first like last.fm, optionally dying after fail_after pages
+	in_range = sorted((s for s in history if time_from <= s.timestamp <= time_to), key=lambda s: -s.timestamp)
+	calls.append((time_from, time_to))
+
+	for i in range(0, len(in_range), per_page):
+		if fail_after is not None and i // per_page == fail_after:
+			raise Crash()
+
+		yield in_range[i:i + per_page]
+
+
+def test_an_interrupted_sync_only_fetches_the_rest(tmp_path):
+	history = [Scrobble(NOW - 1000 + i * 10, 'artist', 'album', 'title ' + str(i)) for i in range(100)]
+	store = ScrobbleStore(tmp_path.joinpath('scrobbles.sqlite'))
+	calls = []
+
+	with pytest.raises(Crash):
+		store.sync('user', lambda f, t: pages(history, f, t, 10, calls, fail_after=9), NOW - 1000, now=NOW)
+
+	assert store.coverage('user') is None
+	assert store.partial('user') == (NOW - 1000, NOW, history[10].timestamp)
+
+	# resumed later, only the ten oldest scrobbles are asked for again with the end pinned to the first sync's
+	fetched = store.sync('user', lambda f, t: pages(history, f, t, 10, calls), NOW - 1000, now=NOW + 3600)
+	assert calls[1] == (NOW - 1000, history[10].timestamp - 1)
+	assert calls[2] == (NOW + 1, NOW + 3600)
+	assert fetched == 10
+	assert store.partial('user') is None
+	assert store.coverage('user') == (NOW - 1000, NOW + 3600)
+	assert store.scrobbles('user', NOW - 1000, NOW) == history
+	store.close()
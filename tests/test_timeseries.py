@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cli import build_parser
+from timeseries import build_timeseries_reports, rolling_top
+
+
+@pytest.mark.parametrize('argv', [['-rolling-windows', '0'], ['-rolling-windows', '7', '-3'], ['-rolling-top', '0'],
+                                  ['-rolling-top', 'ten']])
+def test_rolling_options_have_to_be_positive(argv):
+	with pytest.raises(SystemExit):
+		build_parser().parse_args(argv)
+
+
+def test_rolling_top_matches_counting_by_hand():
+	rng = np.random.default_rng(0)
+	days, keys = rng.integers(0, 40, 2_000), rng.integers(0, 25, 2_000)
+	args = build_parser().parse_args(['-rolling-windows', '1', '7', '-rolling-top', '3'])
+	top = rolling_top(days, keys, 40, 25, args.rolling_windows, args.rolling_top)
+
+	for window, (day, rank, key, plays) in top.items():
+		for d in (0, 20, 39):
+			in_window = (days > d - window) & (days <= d)
+			counts = np.bincount(keys[in_window], minlength=25)
+			expected = sorted(range(25), key=lambda k: (-counts[k], k))[:3]
+			assert key[day == d].tolist() == expected
+			assert plays[day == d].tolist() == counts[expected].tolist()
+
+
+def test_rolling_top_rejects_empty_windows():
+	with pytest.raises(ValueError):
+		rolling_top(np.zeros(3, dtype=np.int64), np.zeros(3, dtype=np.int64), 1, 1, [0], 10)
+
+
+def test_tied_artists_rank_alphabetically():
+	library_df = pd.DataFrame({
+		'artist': ['zebra', 'apple', 'mango'],
+		'album': ['z', 'a', 'm'],
+		'title': ['z', 'a', 'm'],
+	}, index=[10, 11, 12])
+	timestamps = np.full(3, 1_700_000_000, dtype=np.int64)
+	reports = build_timeseries_reports(library_df, np.array([10, 11, 12]), timestamps, windows=[1], top_n=3)
+	assert reports['rolling_top_artists.csv']['artist'].tolist() == ['apple', 'mango', 'zebra']
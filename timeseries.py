@@ -0,0 +1,152 @@
+import pathlib
+from typing import Dict, Iterable, Tuple
+
+import numpy as np
+import pandas as pd
+
+from catalog import intern
+from dates import LOCAL_TIMEZONE_NAME, bucket_labels, local_wall_seconds, wall_buckets
+
+delim_category = '\t'
+
+# listening over time instead of totals, written to a timeseries folder next to the reports:
+#   daily_hourly_plays    one row per local date in the range, one column per hour of the day
+#   weekday_hourly_plays  the same folded onto the days of the week
+#   rolling_top_artists   for every day, the top artists over the days up to and including it
+#   track_listen_dates    first and last listen of every track played in the range
+TIMESERIES_FILES = ('daily_hourly_plays.csv', 'weekday_hourly_plays.csv', 'rolling_top_artists.csv',
+                    'track_listen_dates.csv')
+
+ROLLING_WINDOWS = (7, 30)
+ROLLING_TOP = 10
+
+# days x artists cells held at once by rolling_top, artists are taken a block at a time so a long history with a lot
+# of artists stays around 32 MiB
+ROLLING_BLOCK_CELLS = 4_000_000
+
+
+def play_matrix(rows: np.ndarray, cols: np.ndarray, n_rows: int, n_cols: int) -> np.ndarray:
+	# plays per (row, col) bucket, rows and cols are already counted from 0
+	return np.bincount(rows * n_cols + cols, minlength=n_rows * n_cols).reshape(n_rows, n_cols)
+
+
+def rolling_top(days: np.ndarray, keys: np.ndarray, n_days: int, n_keys: int, windows: Iterable[int],
+                top_n: int) -> Dict[int, Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]:
+	# window -> (day, rank, key, plays) of the top_n keys by plays over the window days ending on each day. days and
+	# keys are one entry per scrobble counted from 0. ties go to the lower key, days with fewer than top_n keys played
+	# get fewer rows. every window comes out of the same running totals
+	windows = list(windows)
+
+	if min(windows + [top_n], default=1) <= 0:
+		raise ValueError('rolling windows and top_n have to be positive')
+
+	order = np.argsort(keys)
+	days, keys = days[order], keys[order]
+	block = max(1, ROLLING_BLOCK_CELLS // max(n_days, 1))
+	candidates = {window: [] for window in windows}
+
+	for start in range(0, n_keys, block):
+		stop = min(start + block, n_keys)
+		lo, hi = np.searchsorted(keys, [start, stop])
+		running = np.cumsum(play_matrix(days[lo:hi], keys[lo:hi] - start, n_days, stop - start), axis=0)
+		tiebreak = n_keys - 1 - np.arange(start, stop)
+		k = min(top_n, stop - start)
+
+		for window in windows:
+			plays = running.copy()
+			plays[window:] -= running[:-window]
+
+			# plays and key in one number, larger is better and no two keys tie
+			score = plays * n_keys + tiebreak
+			candidates[window].append(np.take_along_axis(score, np.argpartition(-score, k - 1, axis=1)[:, :k], axis=1)
+			                          if k < stop - start else score)
+
+	top = {}
+
+	for window, window_candidates in candidates.items():
+		if not window_candidates:
+			top[window] = (np.empty(0, dtype=np.int64),) * 4
+			continue
+
+		score = -np.sort(-np.concatenate(window_candidates, axis=1), axis=1)[:, :top_n]
+		plays, keys = score // n_keys, n_keys - 1 - score % n_keys
+		day, rank = np.nonzero(plays)
+		top[window] = (day, rank + 1, keys[day, rank], plays[day, rank])
+
+	return top
+
+
+def listen_dates(positions: np.ndarray, timestamps: np.ndarray, n_rows: int) -> Tuple[np.ndarray, np.ndarray]:
+	# (first, last) timestamp per library row, -1 for rows never played
+	first = np.full(n_rows, np.iinfo(np.int64).max)
+	last = np.full(n_rows, -1, dtype=np.int64)
+	np.minimum.at(first, positions, timestamps)
+	np.maximum.at(last, positions, timestamps)
+	first[last < 0] = -1
+	return first, last
+
+
+def build_timeseries_reports(mus_lib_df: pd.DataFrame, match_indices: np.ndarray, timestamps: np.ndarray,
+                             windows: Iterable[int] = ROLLING_WINDOWS, top_n: int = ROLLING_TOP,
+                             timezone_name: str = LOCAL_TIMEZONE_NAME) -> Dict[str, pd.DataFrame]:
+	# every TIMESERIES_FILES frame out of the matched scrobbles, one timezone conversion for all of them
+	positions = mus_lib_df.index.get_indexer(np.asarray(match_indices, dtype=np.int64))
+	found = positions >= 0
+	positions = positions[found]
+	timestamps = np.asarray(timestamps, dtype=np.int64)[found]
+
+	wall = local_wall_seconds(timestamps, timezone_name)
+	hours = wall_buckets(wall, 'hour')
+	days = wall_buckets(wall, 'day')
+	first_day = int(days.min()) if len(days) else 0
+	days -= first_day
+	n_days = int(days.max()) + 1 if len(days) else 0
+	hour_labels = bucket_labels(np.arange(24), 'hour')
+
+	daily_df = pd.DataFrame(play_matrix(days, hours, n_days, 24), columns=hour_labels)
+	daily_df.insert(0, 'day', bucket_labels(np.arange(first_day, first_day + n_days), 'day'))
+
+	weekday_df = pd.DataFrame(play_matrix(wall_buckets(wall, 'weekday'), hours, 7, 24), columns=hour_labels)
+	weekday_df.insert(0, 'weekday', bucket_labels(np.arange(7), 'weekday'))
+
+	# artists as in artist_stats, by the first artist of each library row. ids go in name order, so tied artists come
+	# out alphabetically like in the sorted reports
+	(artist_codes,), artists = intern(mus_lib_df['artist'])
+	rolling_dfs = []
+
+	for window, (day, rank, artist, plays) in rolling_top(days, artist_codes[positions], n_days, len(artists),
+	                                                      windows, top_n).items():
+		rolling_dfs.append(pd.DataFrame({
+			'window_days': window,
+			'day': bucket_labels(day + first_day, 'day'),
+			'rank': rank,
+			'artist': np.asarray(artists, dtype=object)[artist],
+			'play_count': plays,
+		}))
+
+	first, last = listen_dates(positions, timestamps, len(mus_lib_df))
+	played = np.flatnonzero(last >= 0)
+	listen_dates_df = mus_lib_df.iloc[played][['artist', 'album', 'title']].reset_index(drop=True)
+	listen_dates_df['play_count'] = np.bincount(positions, minlength=len(mus_lib_df))[played]
+	listen_dates_df['first_listen'] = np.datetime_as_string(local_wall_seconds(first[played], timezone_name)
+	                                                        .astype('datetime64[s]'))
+	listen_dates_df['last_listen'] = np.datetime_as_string(local_wall_seconds(last[played], timezone_name)
+	                                                       .astype('datetime64[s]'))
+	listen_dates_df = listen_dates_df.sort_values(['artist', 'album', 'title'], kind='mergesort')
+
+	return dict(zip(TIMESERIES_FILES, (daily_df, weekday_df,
+	                                   pd.concat(rolling_dfs, ignore_index=True) if rolling_dfs else pd.DataFrame(),
+	                                   listen_dates_df.reset_index(drop=True))))
+
+
+def write_timeseries_reports(out_dir: pathlib.Path, reports: Dict[str, pd.DataFrame]):
+	out_dir.mkdir(parents=True, exist_ok=True)
+
+	for filename, report_df in reports.items():
+		report_df.to_csv(path_or_buf=out_dir.joinpath(filename),
+		                 sep=delim_category,
+		                 header=True,
+		                 index=False,
+		                 mode='w',
+		                 encoding='utf-8',
+		                 )